@@ -1,22 +1,37 @@
+import logging
+import time
 import warnings
+from collections.abc import Iterator
 from functools import cache
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING, Any, cast
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 from django.dispatch import receiver
+from django.http import HttpRequest, JsonResponse
 from django.test.signals import setting_changed
+from django.urls import NoReverseMatch, reverse
 from django.utils.module_loading import import_string
+from django.utils.translation import gettext as _
+from django_ai_core.contrib.agents import Agent
+from django_ai_core.contrib.agents.views import (
+    AgentExecutionView as BaseAgentExecutionView,
+)
 from django_ai_core.llm import LLMService
 from wagtail.contrib.settings.models import BaseGenericSetting, BaseSiteSetting
 from wagtail.models import Site
 
 from wagtail_ai import ai
 from wagtail_ai.utils.deprecation import WagtailAISettingsDeprecationWarning
+from wagtail_ai.utils.server_sent_events import event_stream_response, server_sent_event
+
+from .jobs import JobStatus, get_agent_jobs
 
 if TYPE_CHECKING:
     from wagtail_ai.models import AgentSettingsMixin
 
+logger = logging.getLogger(__name__)
+
 _DEFAULT_MODEL_PROVIDER = "openai"
 DEFAULT_PROVIDER_ALIAS = "default"
 
@@ -90,18 +105,150 @@ def get_agent_settings_model() -> "type[BaseGenericSetting | BaseSiteSetting]":
     return import_string(model_path)
 
 
-def get_agent_settings() -> "AgentSettingsMixin":
+AGENT_SETTINGS_CACHE_TIMEOUT = 60
+
+# Agent settings by (model label, site ID), with the time they were loaded.
+# A site ID of None is used for the default site and for generic settings.
+_agent_settings_cache: dict[tuple[str, int | None], tuple[float, Any]] = {}
+
+
+def get_agent_settings(
+    request: HttpRequest | None = None, *, site: Site | None = None
+) -> "AgentSettingsMixin":
+    """
+    Get the agent settings for the site of the given request, or for the
+    given site. Without either, the settings for the default site are used.
+
+    Settings are cached on the request, and in each process for up to
+    ``AGENT_SETTINGS_CACHE_TIMEOUT`` seconds. Saving the settings or a site
+    clears the cache of the process that saved them straight away, but other
+    processes keep using the old settings until their cache expires.
+    """
     model = get_agent_settings_model()
+    attr_name = model.get_cache_attr_name()
+    if request is not None and hasattr(request, attr_name):
+        return getattr(request, attr_name)
+
     if issubclass(model, BaseSiteSetting):
-        # TODO: support multiple sites
-        settings = model.for_site(site=Site.objects.first())
+        if site is None and request is not None:
+            site = Site.find_for_request(request)
+        site_id = site.pk if site is not None else None
     else:
-        settings = model.load()
-
+        site_id = None
+
+    key = (model._meta.label, site_id)
+    cached = _agent_settings_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < (
+        AGENT_SETTINGS_CACHE_TIMEOUT
+    ):
+        settings = cached[1]
+    else:
+        if not issubclass(model, BaseSiteSetting):
+            settings = model.load()
+        elif site is not None:
+            settings = model.for_site(site=site)
+        else:
+            settings = model.for_site(site=_get_default_site())
+        _agent_settings_cache[key] = (time.monotonic(), settings)
+
+    if request is not None:
+        setattr(request, attr_name, settings)
     return cast("AgentSettingsMixin", settings)
 
 
+def _get_default_site() -> Site | None:
+    return Site.objects.filter(is_default_site=True).first() or Site.objects.first()
+
+
+def clear_agent_settings_cache() -> None:
+    _agent_settings_cache.clear()
+
+
+class AgentExecutionView(BaseAgentExecutionView):
+    """
+    Executes an agent with the current request, so that the agent can use the
+    settings for the request's site.
+
+    When ``WAGTAIL_AI["AGENT_JOBS"]`` is set, requests with a ``defer`` query
+    parameter run the agent in the background instead, and get a 202 response
+    with the URL to fetch the result from.
+
+    Requests with a ``stream`` query parameter to agents that have a ``stream``
+    method get the parts of the result as server-sent events, as they are
+    generated.
+    """
+
+    job_id: str | None = None
+    events: Iterator[tuple[str, Any]] | None = None
+
+    def post(self, request):
+        response = super().post(request)
+        if self.events is not None:
+            return event_stream_response(_agent_event_stream(self.events))
+        if self.job_id is None:
+            return response
+        return JsonResponse(
+            {
+                "status": JobStatus.PENDING,
+                "job_id": self.job_id,
+                "result_url": self._get_result_url(self.job_id),
+            },
+            status=202,
+        )
+
+    def _get_result_url(self, job_id: str) -> str:
+        # Only the async view waits for jobs to finish, so prefer it if the
+        # project includes ``wagtail_ai.async_urls``.
+        try:
+            return reverse("wagtail_ai_async:agent_job", args=[job_id])
+        except NoReverseMatch:
+            return reverse("wagtail_ai:agent_job", args=[job_id])
+
+    def _execute_agent(self, agent: Agent, arguments: dict[str, Any]) -> Any:
+        if "defer" in self.request.GET and (agent_jobs := get_agent_jobs()):
+            site = Site.find_for_request(self.request)
+            self.job_id = agent_jobs.create(
+                agent_slug=self.agent_slug,
+                arguments=arguments,
+                user_id=self.request.user.pk,
+                site_id=site.pk if site is not None else None,
+            )
+            return None
+
+        agent.request = self.request  # type: ignore[attr-defined]
+        if "stream" in self.request.GET and hasattr(agent, "stream"):
+            self.events = agent.stream(**arguments)
+            return None
+        return super()._execute_agent(agent, arguments)
+
+
+def _agent_event_stream(events: Iterator[tuple[str, Any]]) -> Iterator[str]:
+    """
+    Send a "message" event with the key and value of each part of an agent's
+    result, followed by either a "done" or an "error" event.
+    """
+    # Translate eagerly, the generator runs after the view has returned.
+    unexpected_error = _("An unexpected error occurred.")
+    try:
+        for key, value in events:
+            yield server_sent_event({"key": key, "value": value})
+    except Exception:
+        logger.exception("An unexpected error occurred.")
+        yield server_sent_event({"error": unexpected_error}, event="error")
+    else:
+        yield server_sent_event({}, event="done")
+
+
+def clear_agent_settings_cache_on_save(sender, **kwargs):
+    """
+    Connected to saving and deleting agent settings and sites in
+    ``wagtail_ai.signal_handlers``.
+    """
+    clear_agent_settings_cache()
+
+
 @receiver(setting_changed)
 def clear_caches_on_setting_change(sender, setting, **kwargs):
     if setting == "WAGTAIL_AI":
         get_llm_service.cache_clear()
+        clear_agent_settings_cache()
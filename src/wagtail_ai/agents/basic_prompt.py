@@ -8,9 +8,11 @@ from django.core.files import File
 from django.utils.translation import gettext_lazy as _
 from django_ai_core.contrib.agents import Agent, AgentParameter, registry
 
+from wagtail_ai.ai.response_cache import get_response_cache
 from wagtail_ai.context import PromptContext
 
 from .base import get_llm_service
+from .compaction import compact_html
 
 # Temporary drop-in for the Prompt model using prompts from AgentSettings
 
@@ -81,6 +83,10 @@ class BasicPromptAgent(Agent):
     def execute(self, prompt: str, context: dict[str, str]) -> str:
         self.prompt = prompt
         self.context = self.validate_context(prompt, context)
+        if isinstance(self.context.get("content_html"), str):
+            self.context["content_html"] = compact_html(
+                self.context["content_html"], agent_slug=self.slug
+            )
         if self.context.get("image"):
             ai_settings = getattr(settings, "WAGTAIL_AI", {})
             self.provider_alias = ai_settings.get(
@@ -109,8 +115,24 @@ class BasicPromptAgent(Agent):
 
     def _get_result(self, messages: list[dict]) -> str:
         llm_service = get_llm_service(alias=self.provider_alias)
+
+        cache = get_response_cache()
+        key = None
+        if cache is not None:
+            key = cache.make_key(
+                alias=self.provider_alias,
+                model_id=llm_service.model,
+                messages=messages,
+            )
+            if (cached := cache.get(key)) is not None:
+                return cached
+
         result = llm_service.completion(messages=messages)
-        return result.choices[0].message.content  # type: ignore
+        content = result.choices[0].message.content
+
+        if cache is not None and key is not None and content is not None:
+            cache.set(key, content)
+        return content  # type: ignore
 
     def validate_context(self, prompt: str, context: dict[str, str]) -> PromptContext:
         context = PromptContext(context)
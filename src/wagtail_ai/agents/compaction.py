@@ -0,0 +1,310 @@
+"""
+Compact the HTML of a page before it is sent to an agent, so that the model
+isn't billed for markup that doesn't affect its answer.
+"""
+
+import re
+from dataclasses import dataclass, field
+from functools import cache
+from html import escape
+from html.parser import HTMLParser
+from typing import NotRequired, Self, TypedDict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+
+from ..text_splitters.length import NaiveTextSplitterCalculator
+from ..types import TextSplitterLengthCalculatorProtocol
+
+DEFAULT_MAX_TOKENS = {
+    "wai_content_feedback": 128_000,
+    "wai_basic_prompt": 4_000,
+}
+
+# Elements that are kept, without their attributes.
+KEPT_ELEMENTS = frozenset(
+    {
+        *("h1", "h2", "h3", "h4", "h5", "h6", "p", "blockquote", "pre", "code"),
+        *("ul", "ol", "li", "dl", "dt", "dd"),
+        *("table", "thead", "tbody", "tfoot", "tr", "th", "td", "caption"),
+        *("a", "strong", "em", "b", "i", "u", "s", "mark", "sub", "sup", "q"),
+        *("abbr", "cite", "figure", "figcaption", "br", "hr", "img"),
+    }
+)
+# Elements that are dropped along with their content.
+DROPPED_ELEMENTS = frozenset(
+    {
+        *("head", "script", "style", "noscript", "template", "svg", "math"),
+        *("iframe", "object", "embed", "canvas", "video", "audio", "picture"),
+        *("form", "button", "input", "select", "textarea", "nav", "dialog"),
+    }
+)
+VOID_ELEMENTS = frozenset(
+    {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta"}
+    | {"source", "track", "wbr"}
+)
+# Kept elements that start a new line, so whitespace around them is dropped.
+KEPT_BLOCK_ELEMENTS = frozenset(
+    {
+        *("h1", "h2", "h3", "h4", "h5", "h6", "p", "blockquote", "pre"),
+        *("ul", "ol", "li", "dl", "dt", "dd"),
+        *("table", "thead", "tbody", "tfoot", "tr", "th", "td", "caption"),
+        *("figure", "figcaption", "br", "hr"),
+    }
+)
+# Other elements that separate words.
+BLOCK_ELEMENTS = frozenset(
+    {"div", "section", "article", "main", "header", "footer", "aside"}
+    | {"address", "details", "summary", "fieldset"}
+)
+# Elements whose end tag can be omitted, and the elements that end their
+# scope. For example, ``<li>`` closes an open ``<li>`` unless a ``<ul>`` or
+# ``<ol>`` was opened after it.
+IMPLICITLY_CLOSED_ELEMENTS = {
+    "p": {"blockquote", "li", "dd", "td", "th", "figure"},
+    "li": {"ul", "ol"},
+    "dt": {"dl"},
+    "dd": {"dl"},
+    "tr": {"table"},
+    "td": {"tr", "table"},
+    "th": {"tr", "table"},
+}
+# Start tags that close an open ``<p>`` in scope, as listed in the HTML spec,
+# so that unclosed paragraphs don't swallow the blocks after them.
+P_CLOSING_ELEMENTS = frozenset(
+    {
+        *("h1", "h2", "h3", "h4", "h5", "h6", "p", "blockquote", "pre", "hr"),
+        *("ul", "ol", "li", "dl", "dt", "dd", "menu", "table"),
+        *("div", "section", "article", "main", "header", "footer", "aside"),
+        *("address", "details", "summary", "fieldset", "figure", "figcaption"),
+        *("form", "nav", "dialog", "hgroup", "search"),
+    }
+)
+# Long text is split into pieces of this many words, so that it can be
+# truncated between them.
+WORDS_PER_PIECE = 50
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+class HTMLCompactionSettingsDict(TypedDict):
+    MAX_TOKENS: NotRequired[dict[str, int | None]]
+
+
+class _CompactingParser(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self.open_elements: list[str] = []
+        self.dropped_depth = 0
+        self.pre_depth = 0
+        # The position in ``parts`` and the open elements after each point
+        # the output can be truncated at.
+        self.checkpoints: list[tuple[int, tuple[str, ...]]] = []
+        # Whether whitespace was seen since the last text, and whether the
+        # output is at the start of a line, where it is dropped.
+        self.pending_space = False
+        self.at_line_start = True
+
+    def add_checkpoint(self) -> None:
+        self.checkpoints.append((len(self.parts), tuple(self.open_elements)))
+
+    def add_tag(self, tag: str, markup: str) -> None:
+        if tag in KEPT_BLOCK_ELEMENTS:
+            self.pending_space = False
+            self.at_line_start = True
+        elif self.pending_space and not self.at_line_start:
+            # Keep the space before inline start tags, and move it after
+            # inline end tags.
+            if not markup.startswith("</"):
+                self.parts.append(" ")
+                self.pending_space = False
+        self.parts.append(markup)
+
+    def close_elements(self, tag: str) -> None:
+        """Close the open elements up to and including ``tag``."""
+        while self.open_elements:
+            open_tag = self.open_elements.pop()
+            self.add_tag(open_tag, f"</{open_tag}>")
+            if open_tag == "pre":
+                self.pre_depth -= 1
+            if open_tag == tag:
+                break
+        if not self.open_elements and tag in KEPT_BLOCK_ELEMENTS:
+            # Put top-level blocks on separate lines, for text splitters.
+            self.parts.append("\n")
+        self.add_checkpoint()
+
+    def close_implicitly(self, tag: str) -> None:
+        """Close the open elements that a start tag ends, if they are in scope."""
+        if tag in P_CLOSING_ELEMENTS:
+            self.close_in_scope("p")
+        if tag in IMPLICITLY_CLOSED_ELEMENTS:
+            self.close_in_scope(tag)
+
+    def close_in_scope(self, tag: str) -> None:
+        scope = IMPLICITLY_CLOSED_ELEMENTS[tag]
+        for open_tag in reversed(self.open_elements):
+            if open_tag in scope:
+                return
+            if open_tag == tag:
+                self.close_elements(tag)
+                return
+
+    def handle_starttag(self, tag, attrs):
+        if not self.dropped_depth:
+            # Dropped and unwrapped elements can also end a paragraph.
+            self.close_implicitly(tag)
+        if self.dropped_depth or tag in DROPPED_ELEMENTS:
+            if tag not in VOID_ELEMENTS:
+                self.dropped_depth += 1
+            return
+        if tag in BLOCK_ELEMENTS:
+            self.pending_space = True
+        if tag not in KEPT_ELEMENTS:
+            return
+
+        if tag == "img":
+            alt = dict(attrs).get("alt")
+            if alt:
+                self.add_tag(tag, f'<img alt="{escape(alt)}">')
+            return
+        self.add_tag(tag, f"<{tag}>")
+        if tag == "pre":
+            self.pre_depth += 1
+        if tag not in VOID_ELEMENTS:
+            self.open_elements.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in VOID_ELEMENTS:
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if self.dropped_depth:
+            if tag not in VOID_ELEMENTS:
+                self.dropped_depth -= 1
+            return
+        if tag in BLOCK_ELEMENTS:
+            self.pending_space = True
+        if tag in self.open_elements:
+            self.close_elements(tag)
+
+    def handle_data(self, data):
+        if self.dropped_depth:
+            return
+        if self.pre_depth:
+            self.parts.append(escape(data, quote=False))
+            self.at_line_start = False
+            self.add_checkpoint()
+            return
+
+        words = WHITESPACE_RE.split(data)
+        if words[0] == "":
+            self.pending_space = self.pending_space or len(data) > 0
+            words = words[1:]
+        if not words:
+            return
+        trailing_space = words[-1] == ""
+        if trailing_space:
+            words = words[:-1]
+        if not words:
+            return
+
+        if self.pending_space and not self.at_line_start:
+            self.parts.append(" ")
+        for start in range(0, len(words), WORDS_PER_PIECE):
+            piece = " ".join(words[start : start + WORDS_PER_PIECE])
+            if start:
+                piece = " " + piece
+            self.parts.append(escape(piece, quote=False))
+            self.add_checkpoint()
+        self.pending_space = trailing_space
+        self.at_line_start = False
+
+    def handle_comment(self, data):
+        pass
+
+
+@dataclass(kw_only=True)
+class HTMLCompactor:
+    """
+    Reduces HTML to its content and semantic structure: headings, paragraphs,
+    lists, tables, links, emphasis and image alt text. Attributes, comments,
+    scripts, styles, forms and navigation are removed, wrapper elements are
+    unwrapped and whitespace is collapsed.
+
+    The result is truncated after the last complete piece of text that fits
+    in ``max_tokens`` for the agent, as estimated by ``length_calculator``.
+    """
+
+    max_tokens: dict[str, int | None]
+    length_calculator: TextSplitterLengthCalculatorProtocol = field(
+        default_factory=NaiveTextSplitterCalculator
+    )
+
+    @classmethod
+    def from_settings(cls, config: HTMLCompactionSettingsDict) -> Self:
+        max_tokens = {**DEFAULT_MAX_TOKENS, **config.get("MAX_TOKENS", {})}
+        for agent_slug, value in max_tokens.items():
+            if value is not None and (not isinstance(value, int) or value < 1):
+                raise ImproperlyConfigured(
+                    f'"MAX_TOKENS" for "{agent_slug}" must be a positive integer '
+                    f'or None, not "{value}".'
+                )
+        return cls(max_tokens=max_tokens)
+
+    def compact(self, html: str, *, agent_slug: str | None = None) -> str:
+        parser = _CompactingParser()
+        parser.feed(html)
+        parser.close()
+        # Close the elements that were left open at the end.
+        parser.parts.extend(f"</{tag}>" for tag in reversed(parser.open_elements))
+        compacted = "".join(parser.parts).rstrip()
+
+        max_tokens = self.max_tokens.get(agent_slug) if agent_slug else None
+        if max_tokens is None or (
+            self.length_calculator.get_splitter_length(compacted) <= max_tokens
+        ):
+            return compacted
+        return self._truncate(parser, max_tokens)
+
+    def _truncate(self, parser: _CompactingParser, max_tokens: int) -> str:
+        def render(checkpoint: int) -> str:
+            position, open_elements = parser.checkpoints[checkpoint]
+            closing_tags = "".join(f"</{tag}>" for tag in reversed(open_elements))
+            return "".join(parser.parts[:position]).rstrip() + closing_tags
+
+        # Find the last checkpoint that fits with a binary search, as longer
+        # output never has fewer tokens.
+        low, high = 0, len(parser.checkpoints)
+        while low < high:
+            middle = (low + high) // 2
+            if self.length_calculator.get_splitter_length(render(middle)) <= (
+                max_tokens
+            ):
+                low = middle + 1
+            else:
+                high = middle
+        return render(low - 1) if low else ""
+
+
+@cache
+def get_html_compactor() -> HTMLCompactor:
+    config = getattr(settings, "WAGTAIL_AI", {}).get("HTML_COMPACTION", {})
+    return HTMLCompactor.from_settings(config)
+
+
+def compact_html(html: str, *, agent_slug: str | None = None) -> str:
+    """
+    Compact the HTML of a page, and truncate it to the token budget of the
+    agent it is sent to.
+    """
+    return get_html_compactor().compact(html, agent_slug=agent_slug)
+
+
+@receiver(setting_changed)
+def clear_caches_on_setting_change(sender, setting, **kwargs):
+    if setting == "WAGTAIL_AI":
+        get_html_compactor.cache_clear()
@@ -1,10 +1,33 @@
 import json
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from enum import IntEnum
+from typing import Any
 
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpRequest
 from django_ai_core.contrib.agents import Agent, AgentParameter, registry
 from pydantic import BaseModel, Field
+from wagtail.models import Site
 
+from ..ai import BackendNotFound, get_backend
+from ..ai.base import DEFAULT_MAX_CONCURRENCY
+from ..text_splitters import split_text_spans
+from ..text_splitters.langchain import LangchainRecursiveCharacterTextSplitter
+from ..text_splitters.length import NaiveTextSplitterCalculator
+from ..types import TextSplitterLengthCalculatorProtocol, TextSplitterProtocol
+from ..utils.json_stream import IncrementalJSONParser
 from .base import get_agent_settings, get_llm_service
+from .compaction import compact_html
+from .feedback_cache import (
+    ContentFeedbackCache,
+    ParagraphReview,
+    assign_improvements,
+    get_content_feedback_cache,
+    get_hash,
+    split_paragraphs,
+)
 
 
 class QualityScore(IntEnum):
@@ -52,6 +75,23 @@ class ContentFeedbackSchema(BaseModel):
     )
 
 
+class CombinedFeedbackSchema(BaseModel):
+    quality_score: QualityScore = Field(
+        description=(
+            "Quality score of the whole content between 1 and 3 "
+            "(1=needs major improvement, 2=adequate, 3=excellent)"
+        ),
+    )
+    qualitative_feedback: list[str] = Field(
+        description=(
+            "3-5 bullet points of qualitative feedback on the whole content, "
+            "highlighting strengths and areas for improvement"
+        ),
+        min_length=3,
+        max_length=5,
+    )
+
+
 @registry.register()
 class ContentFeedbackAgent(Agent):
     slug = "wai_content_feedback"
@@ -81,7 +121,29 @@ class ContentFeedbackAgent(Agent):
         ),
     ]
     provider_alias = "default"
+    # Set by the view, or by background jobs, to use the agent settings for
+    # the request's site.
+    request: HttpRequest | None = None
+    site: Site | None = None
     _response_format = ContentFeedbackSchema
+    _combined_response_format = CombinedFeedbackSchema
+    # Content longer than this number of tokens is split into chunks that are
+    # reviewed separately, up to ``max_concurrency`` at a time, and the
+    # feedback on each chunk is then combined. By default, the concurrency is
+    # the ``MAX_CONCURRENCY`` of the text completion backend.
+    chunk_size = 8000
+    max_concurrency: int | None = None
+    # The share of paragraphs that content must have in common with the last
+    # review of other content for that review to be reused. Paragraph reviews
+    # aren't scoped by page, so this keeps boilerplate shared by many pages
+    # from reusing the review of another page.
+    min_review_overlap = 0.5
+    text_splitter_class: type[TextSplitterProtocol] = (
+        LangchainRecursiveCharacterTextSplitter
+    )
+    length_calculator_class: type[TextSplitterLengthCalculatorProtocol] = (
+        NaiveTextSplitterCalculator
+    )
 
     def execute(
         self,
@@ -90,7 +152,209 @@ class ContentFeedbackAgent(Agent):
         content_language: str,
         editor_language: str,
     ) -> dict:
-        settings = get_agent_settings()
+        content = self._prepare(
+            content_text, content_html, content_language, editor_language
+        )
+        feedback_cache = get_content_feedback_cache()
+        if feedback_cache is None:
+            return self._review(content)
+        return self._review_with_cache(content, feedback_cache)
+
+    def stream(
+        self,
+        content_text: str,
+        content_html: str,
+        content_language: str,
+        editor_language: str,
+    ) -> Iterator[tuple[str, Any]]:
+        """
+        Review the content like ``execute``, but yield ``(key, value)`` pairs
+        for the quality score, each qualitative feedback item and each
+        specific improvement as soon as the model has generated them.
+        """
+        content = self._prepare(
+            content_text, content_html, content_language, editor_language
+        )
+        feedback_cache = get_content_feedback_cache()
+        if feedback_cache is None:
+            chunks = self.split_content(content)
+            if len(chunks) <= 1:
+                yield from self._stream_result(self._get_messages(content))
+                return
+
+        # Cached and chunked reviews are combined from several responses, so
+        # they are only sent once complete.
+        if feedback_cache is None:
+            result = self._review(content, chunks=chunks)
+        else:
+            result = self._review_with_cache(content, feedback_cache)
+        for key, value in result.items():
+            if isinstance(value, list):
+                for item in value:
+                    yield key, item
+            else:
+                yield key, value
+
+    def _prepare(
+        self,
+        content_text: str,
+        content_html: str,
+        content_language: str,
+        editor_language: str,
+    ) -> str:
+        settings = get_agent_settings(self.request, site=self.site)
+        self.content_language = content_language
+        self.editor_language = editor_language
+        self.content_type = settings.content_feedback_content_type
+        self.prompt_messages = self._get_prompt_messages(settings)
+
+        match settings.content_feedback_content_type:
+            case settings.ContentFeedbackContentType.TEXT:
+                return content_text
+            case settings.ContentFeedbackContentType.HTML | _:
+                return compact_html(content_html, agent_slug=self.slug)
+
+    def split_content(self, content: str) -> list[str]:
+        length_function = self.length_calculator_class().get_splitter_length
+        if length_function(content) <= self.chunk_size:
+            return [content]
+        splitter = self.text_splitter_class(
+            chunk_size=self.chunk_size, length_function=length_function
+        )
+        return [
+            content[start:end] for start, end in split_text_spans(splitter, content)
+        ]
+
+    def get_max_concurrency(self) -> int:
+        if self.max_concurrency is not None:
+            return self.max_concurrency
+        try:
+            return get_backend().config.max_concurrency
+        except (KeyError, BackendNotFound, ImproperlyConfigured):
+            # Agents can be used with only ``PROVIDERS`` configured, so a
+            # missing or misconfigured legacy backend doesn't break them.
+            return DEFAULT_MAX_CONCURRENCY
+
+    def _review(
+        self,
+        content: str,
+        *,
+        chunks: list[str] | None = None,
+        changed: bool = False,
+    ) -> dict:
+        if chunks is None:
+            chunks = self.split_content(content)
+        if len(chunks) <= 1:
+            return self._get_result(self._get_messages(content, changed=changed))
+        return self._get_combined_result(chunks, changed=changed)
+
+    def _review_with_cache(
+        self, content: str, feedback_cache: ContentFeedbackCache
+    ) -> dict:
+        """
+        Return the cached review of the content if it was reviewed before.
+        Otherwise, only send the paragraphs that changed since the content was
+        last reviewed to the model, reuse the improvements to the other
+        paragraphs, and combine the feedback with the last review.
+        """
+        scope = feedback_cache.make_scope(
+            service_id=get_llm_service(alias=self.provider_alias).service_id,
+            prompt_messages=self.prompt_messages,
+            content_type=self.content_type,
+            content_language=self.content_language,
+            editor_language=self.editor_language,
+        )
+        content_hash = get_hash(content)
+        if (result := feedback_cache.get_review(scope, content_hash)) is not None:
+            return result
+
+        paragraphs = split_paragraphs(content)
+        paragraph_reviews = feedback_cache.get_paragraph_reviews(scope, paragraphs)
+        last_review = self._get_last_review(
+            feedback_cache, scope, paragraphs, paragraph_reviews
+        )
+        if last_review is None:
+            paragraph_reviews = {}
+        changed_paragraphs = [
+            paragraph for paragraph in paragraphs if paragraph not in paragraph_reviews
+        ]
+
+        if last_review is None:
+            result = self._review(content)
+        elif changed_paragraphs:
+            changes = self._review("\n".join(changed_paragraphs), changed=True)
+            result = {
+                **self._combine_feedback(
+                    "The content was edited since it was last reviewed, and only "
+                    "the changed paragraphs were reviewed again.",
+                    [
+                        ("Last review of the whole content", last_review),
+                        ("Review of the changed paragraphs", changes),
+                    ],
+                ),
+                "specific_improvements": changes["specific_improvements"],
+            }
+        else:
+            # Paragraphs were only removed or moved.
+            result = {**last_review, "specific_improvements": []}
+
+        assigned, unassigned = assign_improvements(
+            changed_paragraphs, result["specific_improvements"]
+        )
+        improvements_by_paragraph = dict(zip(changed_paragraphs, assigned, strict=True))
+        for paragraph, review in paragraph_reviews.items():
+            improvements_by_paragraph[paragraph] = review["improvements"]
+
+        improvements = []
+        seen_original_texts = set()
+        for paragraph in paragraphs:
+            for improvement in improvements_by_paragraph[paragraph]:
+                if improvement["original_text"] not in seen_original_texts:
+                    seen_original_texts.add(improvement["original_text"])
+                    improvements.append(improvement)
+        result = {**result, "specific_improvements": improvements + unassigned}
+
+        feedback_cache.set_review(
+            scope, content_hash, result, improvements_by_paragraph
+        )
+        return result
+
+    def _get_last_review(
+        self,
+        feedback_cache: ContentFeedbackCache,
+        scope: str,
+        paragraphs: list[str],
+        paragraph_reviews: dict[str, ParagraphReview],
+    ) -> dict | None:
+        """
+        Return the review that most of the unchanged paragraphs were last
+        reviewed in, if it has enough paragraphs in common with the content.
+        Most come from the previous revision, but some may have been reviewed
+        in an older one.
+        """
+        if not paragraph_reviews:
+            return None
+        counts = Counter(review["review"] for review in paragraph_reviews.values())
+        last_hash, shared = counts.most_common(1)[0]
+        last_paragraphs = next(
+            review["paragraphs"]
+            for review in paragraph_reviews.values()
+            if review["review"] == last_hash
+        )
+        if (
+            shared / max(len(set(paragraphs)), last_paragraphs)
+            < self.min_review_overlap
+        ):
+            return None
+        return feedback_cache.get_review(scope, last_hash)
+
+    def _get_messages(
+        self,
+        content: str,
+        *,
+        part: tuple[int, int] | None = None,
+        changed: bool = False,
+    ):
         messages = [
             {
                 "role": "system",
@@ -100,33 +364,109 @@ class ContentFeedbackAgent(Agent):
                 "role": "system",
                 "content": f"""Analyze the given content and provide:
 1. A quality score between 1 and 3 (1=needs major improvement, 2=adequate, 3=excellent)
-2. 3-5 bullet points of qualitative feedback highlighting strengths and areas for improvement in {editor_language}
-3. Specific text improvements with original text, suggested revised text in {content_language}, and a brief explanation
-   in {editor_language} for why each change would improve the content. Provide text
+2. 3-5 bullet points of qualitative feedback highlighting strengths and areas for improvement in {self.editor_language}
+3. Specific text improvements with original text, suggested revised text in {self.content_language}, and a brief explanation
+   in {self.editor_language} for why each change would improve the content. Provide text
    improvements in plain text, not HTML and not markdown.
 
 The language rules specified are IMPORTANT. Always ensure the feedback and improvements are in the correct language.
 
 Return JSON with the provided structure WITHOUT the markdown code block. Start immediately with a {{ character and end with a }} character.""",
             },
+            *self.prompt_messages,
         ]
-
-        messages += self._get_prompt_messages(settings)
-
-        match settings.content_feedback_content_type:
-            case settings.ContentFeedbackContentType.TEXT:
-                content = content_text
-            case settings.ContentFeedbackContentType.HTML | _:
-                content = content_html
-
+        if changed:
+            messages.append(
+                {
+                    "role": "system",
+                    "content": (
+                        "The content was edited since it was last reviewed. These "
+                        "are the changed paragraphs, other paragraphs are omitted."
+                    ),
+                }
+            )
+        if part is not None:
+            messages.append(
+                {
+                    "role": "system",
+                    "content": (
+                        f"The content is too long to review at once. This is "
+                        f"part {part[0]} of {part[1]}, it may start or end "
+                        "mid-sentence. Only suggest improvements to this part."
+                    ),
+                }
+            )
         messages.append(
             {
                 "role": "system",
                 "content": f"Content to review:\n\n{content}",
             }
         )
+        return messages
+
+    def _get_combined_result(self, chunks: list[str], *, changed: bool = False) -> dict:
+        """
+        Review each chunk concurrently, then combine the reviews: the
+        improvements are merged, and the scores and feedback are condensed
+        into feedback on the whole content with one more request.
+        """
 
-        return self._get_result(messages)
+        def review(numbered_chunk: tuple[int, str]) -> dict:
+            number, chunk = numbered_chunk
+            return self._get_result(
+                self._get_messages(chunk, part=(number, len(chunks)), changed=changed)
+            )
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.get_max_concurrency(), len(chunks))
+        ) as executor:
+            results = list(executor.map(review, enumerate(chunks, start=1)))
+
+        improvements = []
+        seen_original_texts = set()
+        for result in results:
+            for improvement in result["specific_improvements"]:
+                if improvement["original_text"] not in seen_original_texts:
+                    seen_original_texts.add(improvement["original_text"])
+                    improvements.append(improvement)
+
+        combined = self._combine_feedback(
+            "The content below was too long to review at once, so each part of "
+            "it was reviewed separately.",
+            [
+                (f"Part {number}", result)
+                for number, result in enumerate(results, start=1)
+            ],
+        )
+        return {**combined, "specific_improvements": improvements}
+
+    def _combine_feedback(self, context: str, reviews: list[tuple[str, dict]]) -> dict:
+        """
+        Condense the scores and feedback of several reviews into the score and
+        feedback on the whole content.
+        """
+        summaries = "\n\n".join(
+            f"{label}: quality score {result['quality_score']}\n"
+            + "\n".join(f"- {feedback}" for feedback in result["qualitative_feedback"])
+            for label, result in reviews
+        )
+        return self._get_result(
+            [
+                {
+                    "role": "system",
+                    "content": f"""{context} Combine the reviews into:
+1. A quality score between 1 and 3 for the whole content (1=needs major improvement, 2=adequate, 3=excellent)
+2. 3-5 bullet points of qualitative feedback on the whole content in {self.editor_language}, without repeating points
+
+Return JSON with the provided structure WITHOUT the markdown code block. Start immediately with a {{ character and end with a }} character.""",
+                },
+                {
+                    "role": "system",
+                    "content": f"Reviews:\n\n{summaries}",
+                },
+            ],
+            response_format=self._combined_response_format,
+        )
 
     def _get_prompt_messages(self, settings) -> list[dict]:
         messages = []
@@ -139,10 +479,36 @@ Return JSON with the provided structure WITHOUT the markdown code block. Start i
             )
         return messages
 
-    def _get_result(self, messages: list[dict]) -> dict:
+    def _get_result(
+        self, messages: list[dict], *, response_format: type[BaseModel] | None = None
+    ) -> dict:
         client = get_llm_service(alias=self.provider_alias)
         result = client.completion(
             messages=messages,
-            response_format=self._response_format,
+            response_format=response_format or self._response_format,
         )
         return json.loads(result.choices[0].message.content)  # type: ignore
+
+    def _stream_result(self, messages: list[dict]) -> Iterator[tuple[str, Any]]:
+        client = get_llm_service(alias=self.provider_alias)
+        chunks = client.completion(
+            messages=messages, response_format=self._response_format, stream=True
+        )
+        parser = IncrementalJSONParser()
+        for chunk in chunks:
+            if chunk.choices and (text := chunk.choices[0].delta.content):
+                for key, value in parser.feed(text):
+                    yield key, self._validate_item(key, value)
+        parser.close()
+
+    def _validate_item(self, key: str, value: Any) -> Any:
+        # The response is only validated against the schema by the provider
+        # once it is complete, so validate each item as it arrives.
+        match key:
+            case "quality_score":
+                return QualityScore(value)
+            case "qualitative_feedback":
+                return str(value)
+            case "specific_improvements":
+                return SpecificImprovement.model_validate(value).model_dump()
+        return value
@@ -0,0 +1,176 @@
+"""
+Cache content feedback, so that when an editor asks for feedback again after
+editing a page, only the paragraphs that changed are sent to the model.
+"""
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from functools import cache
+from html import unescape
+from typing import Any, NotRequired, Self, TypedDict
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+
+DEFAULT_CACHE_ALIAS = "default"
+DEFAULT_TIMEOUT = 60 * 60 * 24 * 7
+KEY_PREFIX = "wagtail_ai:content_feedback"
+
+TAG_RE = re.compile(r"<[^>]*>")
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+class ContentFeedbackCacheSettingsDict(TypedDict):
+    CACHE_ALIAS: NotRequired[str]
+    TIMEOUT: NotRequired[int | None]
+
+
+class ParagraphReview(TypedDict):
+    # The hash of the content the paragraph was last reviewed in, the number of
+    # paragraphs in that content, and the improvements that were suggested to
+    # the paragraph.
+    review: str
+    paragraphs: int
+    improvements: list[dict[str, Any]]
+
+
+def get_hash(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def split_paragraphs(content: str) -> list[str]:
+    """
+    Split content into paragraphs: the lines of plain text, or the top-level
+    blocks of compacted HTML, which are on separate lines.
+    """
+    return [line for line in (line.strip() for line in content.splitlines()) if line]
+
+
+def _normalize(text: str) -> str:
+    return WHITESPACE_RE.sub(" ", unescape(TAG_RE.sub(" ", text))).strip()
+
+
+def assign_improvements(
+    paragraphs: list[str], improvements: list[dict[str, Any]]
+) -> tuple[list[list[dict[str, Any]]], list[dict[str, Any]]]:
+    """
+    Assign each improvement to the first paragraph that contains its original
+    text. Returns the improvements of each paragraph, and the improvements that
+    couldn't be assigned to a paragraph.
+    """
+    texts = [_normalize(paragraph) for paragraph in paragraphs]
+    assigned: list[list[dict[str, Any]]] = [[] for _ in paragraphs]
+    unassigned = []
+    for improvement in improvements:
+        original_text = _normalize(improvement["original_text"])
+        for index, text in enumerate(texts):
+            if original_text and original_text in text:
+                assigned[index].append(improvement)
+                break
+        else:
+            unassigned.append(improvement)
+    return assigned, unassigned
+
+
+@dataclass(kw_only=True)
+class ContentFeedbackCache:
+    """
+    Stores content feedback in a cache for ``timeout`` seconds, both for the
+    whole content and for each of its paragraphs.
+
+    Entries are scoped by everything else that affects the feedback, such as
+    the model, the custom prompt and the languages.
+    """
+
+    cache_alias: str
+    timeout: int | None
+
+    @classmethod
+    def from_settings(cls, config: ContentFeedbackCacheSettingsDict) -> Self:
+        cache_alias = config.get("CACHE_ALIAS", DEFAULT_CACHE_ALIAS)
+        if cache_alias not in settings.CACHES:
+            raise ImproperlyConfigured(
+                f'"CACHE_ALIAS" ("{cache_alias}") is not a configured cache.'
+            )
+
+        # A timeout of None means that feedback never expires.
+        timeout = config.get("TIMEOUT", DEFAULT_TIMEOUT)
+        if timeout is not None:
+            try:
+                timeout = int(timeout)
+            except (TypeError, ValueError) as e:
+                raise ImproperlyConfigured(
+                    f'"TIMEOUT" is not an "int", it is a "{type(timeout)}".'
+                ) from e
+
+        return cls(cache_alias=cache_alias, timeout=timeout)
+
+    @property
+    def cache(self) -> BaseCache:
+        return caches[self.cache_alias]
+
+    def make_scope(self, **parts: Any) -> str:
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return get_hash(payload)
+
+    def get_review_key(self, scope: str, content_hash: str) -> str:
+        return f"{KEY_PREFIX}:{scope}:review:{content_hash}"
+
+    def get_paragraph_key(self, scope: str, paragraph: str) -> str:
+        return f"{KEY_PREFIX}:{scope}:paragraph:{get_hash(paragraph)}"
+
+    def get_review(self, scope: str, content_hash: str) -> dict[str, Any] | None:
+        return self.cache.get(self.get_review_key(scope, content_hash))
+
+    def get_paragraph_reviews(
+        self, scope: str, paragraphs: list[str]
+    ) -> dict[str, ParagraphReview]:
+        """Return the reviews of the paragraphs that were reviewed before."""
+        keys = {
+            self.get_paragraph_key(scope, paragraph): paragraph
+            for paragraph in paragraphs
+        }
+        return {keys[key]: review for key, review in self.cache.get_many(keys).items()}
+
+    def set_review(
+        self,
+        scope: str,
+        content_hash: str,
+        result: dict[str, Any],
+        paragraph_improvements: dict[str, list[dict[str, Any]]],
+    ) -> None:
+        self.cache.set(self.get_review_key(scope, content_hash), result, self.timeout)
+        self.cache.set_many(
+            {
+                self.get_paragraph_key(scope, paragraph): ParagraphReview(
+                    review=content_hash,
+                    paragraphs=len(paragraph_improvements),
+                    improvements=improvements,
+                )
+                for paragraph, improvements in paragraph_improvements.items()
+            },
+            self.timeout,
+        )
+
+
+@cache
+def get_content_feedback_cache() -> ContentFeedbackCache | None:
+    """
+    Return the content feedback cache, or None if it is not enabled with
+    ``WAGTAIL_AI["CONTENT_FEEDBACK_CACHE"]``.
+    """
+    config = getattr(settings, "WAGTAIL_AI", {}).get("CONTENT_FEEDBACK_CACHE")
+    if config is None:
+        return None
+    return ContentFeedbackCache.from_settings(config)
+
+
+@receiver(setting_changed)
+def clear_caches_on_setting_change(sender, setting, **kwargs):
+    if setting == "WAGTAIL_AI":
+        get_content_feedback_cache.cache_clear()
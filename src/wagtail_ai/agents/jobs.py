@@ -0,0 +1,245 @@
+"""
+Run agents in the background, so that a slow response from the AI provider
+doesn't hold a request worker for its whole duration.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cache
+from typing import Any, NotRequired, Protocol, Self, TypedDict
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_noop
+from django_ai_core.contrib.agents import registry
+from wagtail.models import Site
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_ALIAS = "default"
+DEFAULT_TIMEOUT = 60 * 60
+DEFAULT_WAIT_TIMEOUT = 20
+DEFAULT_EXECUTOR = "wagtail_ai.agents.jobs.ThreadPoolJobExecutor"
+DEFAULT_MAX_WORKERS = 4
+POLL_INTERVAL = 0.25
+KEY_PREFIX = "wagtail_ai:agent_job"
+
+
+class JobExecutorSettingsDict(TypedDict):
+    CLASS: str
+    CONFIG: NotRequired[dict[str, Any]]
+
+
+class AgentJobsSettingsDict(TypedDict):
+    EXECUTOR: NotRequired[JobExecutorSettingsDict]
+    CACHE_ALIAS: NotRequired[str]
+    TIMEOUT: NotRequired[int]
+    WAIT_TIMEOUT: NotRequired[float]
+
+
+class JobStatus:
+    PENDING = "pending"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class JobExecutor(Protocol):
+    """
+    Runs agent jobs. ``submit`` must return straight away and arrange for
+    ``run_agent_job(job_id)`` to be called, in this process or another one.
+    """
+
+    @classmethod
+    def from_settings(cls, config: dict[str, Any]) -> Self: ...
+
+    def submit(self, job_id: str) -> None: ...
+
+
+class ThreadPoolJobExecutor:
+    """
+    Runs agent jobs in a pool of ``MAX_WORKERS`` threads in the current
+    process. Jobs that haven't finished are lost when the process stops.
+    """
+
+    def __init__(self, *, max_workers: int) -> None:
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="wagtail_ai_agent_job"
+        )
+
+    @classmethod
+    def from_settings(cls, config: dict[str, Any]) -> Self:
+        max_workers = config.get("MAX_WORKERS", DEFAULT_MAX_WORKERS)
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ImproperlyConfigured(
+                f'"MAX_WORKERS" must be a positive integer, not "{max_workers}".'
+            )
+        return cls(max_workers=max_workers)
+
+    def submit(self, job_id: str) -> None:
+        self.pool.submit(self._run, job_id)
+
+    @staticmethod
+    def _run(job_id: str) -> None:
+        try:
+            run_agent_job(job_id)
+        finally:
+            connections.close_all()
+
+
+@dataclass(kw_only=True)
+class AgentJobs:
+    """
+    Stores agent jobs and their results in a cache, and submits them to an
+    executor. Results are kept for ``timeout`` seconds.
+    """
+
+    cache_alias: str
+    timeout: int
+    wait_timeout: float
+    executor: JobExecutor
+
+    @classmethod
+    def from_settings(cls, config: AgentJobsSettingsDict) -> Self:
+        cache_alias = config.get("CACHE_ALIAS", DEFAULT_CACHE_ALIAS)
+        if cache_alias not in settings.CACHES:
+            raise ImproperlyConfigured(
+                f'"CACHE_ALIAS" is set to "{cache_alias}", which is not in CACHES.'
+            )
+
+        executor_settings = config.get("EXECUTOR", {"CLASS": DEFAULT_EXECUTOR})
+        try:
+            executor_cls = import_string(executor_settings["CLASS"])
+        except (KeyError, ImportError) as e:
+            raise ImproperlyConfigured(
+                f'Invalid agent job executor: "{executor_settings.get("CLASS")}".'
+            ) from e
+
+        return cls(
+            cache_alias=cache_alias,
+            timeout=config.get("TIMEOUT", DEFAULT_TIMEOUT),
+            wait_timeout=config.get("WAIT_TIMEOUT", DEFAULT_WAIT_TIMEOUT),
+            executor=executor_cls.from_settings(executor_settings.get("CONFIG", {})),
+        )
+
+    @property
+    def cache(self) -> BaseCache:
+        return caches[self.cache_alias]
+
+    def get_key(self, job_id: str) -> str:
+        return f"{KEY_PREFIX}:{job_id}"
+
+    def create(
+        self,
+        *,
+        agent_slug: str,
+        arguments: dict[str, Any],
+        user_id: Any = None,
+        site_id: int | None = None,
+    ) -> str:
+        """
+        Store a new job and submit it to the executor. Returns the job ID.
+        """
+        job_id = uuid.uuid4().hex
+        self.cache.set(
+            self.get_key(job_id),
+            {
+                "status": JobStatus.PENDING,
+                "agent": agent_slug,
+                "arguments": arguments,
+                "user_id": user_id,
+                "site_id": site_id,
+            },
+            self.timeout,
+        )
+        self.executor.submit(job_id)
+        return job_id
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        return self.cache.get(self.get_key(job_id))
+
+    async def aget(self, job_id: str) -> dict[str, Any] | None:
+        return await self.cache.aget(self.get_key(job_id))
+
+    async def await_job(
+        self, job_id: str, timeout: float | None = None
+    ) -> dict[str, Any] | None:
+        """
+        Return the job once it has finished, or after ``timeout`` seconds
+        (``wait_timeout`` by default) if it hasn't. Only async views wait for
+        jobs, as waiting in a sync view would hold a request worker.
+        """
+        deadline = time.monotonic() + (
+            self.wait_timeout if timeout is None else timeout
+        )
+        job = await self.aget(job_id)
+        while (
+            job is not None
+            and job["status"] == JobStatus.PENDING
+            and time.monotonic() < deadline
+        ):
+            await asyncio.sleep(POLL_INTERVAL)
+            job = await self.aget(job_id)
+        return job
+
+    def claim(self, job_id: str) -> bool:
+        """
+        Mark the job as started. Returns False if it was already claimed, for
+        example when a task queue delivers the same job twice.
+        """
+        return self.cache.add(f"{self.get_key(job_id)}:claim", True, self.timeout)
+
+    def run(self, job_id: str) -> None:
+        job = self.get(job_id)
+        if job is None or job["status"] != JobStatus.PENDING:
+            return
+        if not self.claim(job_id):
+            return
+
+        try:
+            agent = registry.get(job["agent"])()
+            if job["site_id"] is not None:
+                agent.site = Site.objects.filter(pk=job["site_id"]).first()
+            job["data"] = agent.execute(**job["arguments"])
+            job["status"] = JobStatus.COMPLETED
+        except Exception:
+            logger.exception("Agent job %s failed", job_id)
+            job["status"] = JobStatus.FAILED
+            # Translated when it is returned, in the language of the request.
+            job["error"] = gettext_noop("The agent failed to complete the request.")
+        self.cache.set(self.get_key(job_id), job, self.timeout)
+
+
+@cache
+def get_agent_jobs() -> AgentJobs | None:
+    """
+    Return the agent jobs store, or None if deferred agent execution is not
+    enabled with ``WAGTAIL_AI["AGENT_JOBS"]``.
+    """
+    config = getattr(settings, "WAGTAIL_AI", {}).get("AGENT_JOBS")
+    if config is None:
+        return None
+    return AgentJobs.from_settings(config)
+
+
+def run_agent_job(job_id: str) -> None:
+    """
+    Run an agent job and store its result. Custom executors call this, for
+    example from a task queue worker.
+    """
+    if (agent_jobs := get_agent_jobs()) is not None:
+        agent_jobs.run(job_id)
+
+
+@receiver(setting_changed)
+def clear_caches_on_setting_change(sender, setting, **kwargs):
+    if setting == "WAGTAIL_AI":
+        get_agent_jobs.cache_clear()
@@ -1,3 +1,9 @@
+import math
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model
 from django_ai_core.contrib.agents import (
     Agent,
     AgentParameter,
@@ -5,11 +11,98 @@ from django_ai_core.contrib.agents import (
 from django_ai_core.contrib.agents import (
     registry as agent_registry,
 )
+from django_ai_core.contrib.index import VectorIndex
 from django_ai_core.contrib.index import registry as index_registry
 from django_ai_core.contrib.index.chunking import SimpleChunkTransformer
+from django_ai_core.contrib.index.query import DocumentResultMixin
+from django_ai_core.contrib.index.schema import Document
 from wagtail.admin.admin_url_finder import AdminURLFinder
+from wagtail.models import Page
 
 MAX_LIMIT = 100
+DEFAULT_MAX_CHUNKS = 8
+# Objects are usually split into several documents, so fetch more documents
+# than the number of objects needed.
+DOCUMENTS_PER_OBJECT = 3
+MAX_CHUNKS = 32
+
+
+def select_chunks(chunks: list[str], max_chunks: int) -> list[str]:
+    """
+    Pick up to ``max_chunks`` chunks, spread evenly over the content, so that
+    the query covers all of it while the cost of embedding is capped.
+    """
+    if len(chunks) <= max_chunks:
+        return chunks
+    if max_chunks == 1:
+        return chunks[:1]
+    step = (len(chunks) - 1) / (max_chunks - 1)
+    return [chunks[round(i * step)] for i in range(max_chunks)]
+
+
+def iter_pages(results, *, page_size: int, max_results: int | None = None):
+    """
+    Iterate over search results, querying the index for one page at a time.
+
+    Pages double in size, so that going through many excluded results takes
+    few queries, and the iteration stops once the index runs out of results.
+    """
+    offset = 0
+    while max_results is None or offset < max_results:
+        stop = offset + page_size
+        if max_results is not None:
+            stop = min(stop, max_results)
+        page = list(results[offset:stop])
+        yield from page
+        if len(page) < stop - offset:
+            return
+        offset = stop
+        page_size *= 2
+
+
+def get_query_model(model):
+    # Titles and edit URLs of all page types can be loaded from the base Page
+    # model, without joining the tables of the specific page types.
+    if issubclass(model, Page):
+        return Page
+    return model
+
+
+def get_model_key(model) -> str:
+    return get_query_model(model)._meta.label_lower
+
+
+def get_object_key(model, pk) -> str:
+    """
+    Identify an object in suggestions and exclusions, as
+    ``"<app_label>.<model_name>:<pk>"``. All page types share the key of the
+    base Page model, as their primary keys are unique across types.
+    """
+    return f"{get_model_key(model)}:{pk}"
+
+
+def parse_object_key(key: str) -> str | None:
+    """
+    Normalize an object key from a request, or return None if it isn't one.
+    """
+    model_label, _, pk = str(key).rpartition(":")
+    try:
+        model = apps.get_model(model_label)
+    except (LookupError, ValueError):
+        return None
+    return get_object_key(model, pk)
+
+
+def mean_vector(vectors: list[list[float]]) -> list[float]:
+    """
+    Average the vectors and scale the result to unit length, so that it can
+    be compared with the stored embeddings by cosine or dot product alike.
+    """
+    mean = [sum(values) / len(vectors) for values in zip(*vectors, strict=True)]
+    norm = math.sqrt(sum(value * value for value in mean))
+    if not norm:
+        return mean
+    return [value / norm for value in mean]
 
 
 @agent_registry.register()
@@ -22,10 +115,17 @@ class SuggestedContentAgent(Agent):
             type=str,
             description="ID of the VectorIndex to query",
         ),
+        AgentParameter(
+            name="exclude",
+            type=list[str],
+            description=(
+                'Objects to exclude from results, as "<app_label>.<model_name>:<pk>"'
+            ),
+        ),
         AgentParameter(
             name="exclude_pks",
             type=list[str],
-            description="PKs to exclude from results",
+            description="PKs to exclude from results, for objects of any model",
         ),
         AgentParameter(
             name="content",
@@ -42,23 +142,32 @@ class SuggestedContentAgent(Agent):
             type=int,
             description="Number of characters to embed from content",
         ),
+        AgentParameter(
+            name="max_chunks",
+            type=int,
+            description="Maximum number of content chunks to embed for the query",
+        ),
     ]
 
     def execute(
         self,
         vector_index: str,
-        exclude_pks: list[str],
         content: str,
+        exclude: list[str] | None = None,
+        exclude_pks: list[str] | None = None,
         limit: int = 3,
         chunk_size: int = 1000,
+        max_chunks: int = DEFAULT_MAX_CHUNKS,
     ) -> list:
         index_cls = index_registry.get(vector_index)
         index = index_cls()
-        finder = AdminURLFinder()
-        # Extend limit by the number of excluded PKs so we get enough responses
-        extended_limit = limit + len(exclude_pks)
+        limit = min(limit, MAX_LIMIT)
+        excluded_keys = {
+            key for key in map(parse_object_key, exclude or []) if key is not None
+        }
+        excluded_pks = {str(pk) for pk in exclude_pks or []}
 
-        if extended_limit > MAX_LIMIT:
+        if limit < 1:
             return []
 
         if not chunk_size:
@@ -70,12 +179,91 @@ class SuggestedContentAgent(Agent):
         if not chunks:
             return []
 
-        return [
-            {
-                "id": str(page.pk),
-                "title": page.title,
-                "editUrl": finder.get_edit_url(page),
-            }
-            for page in index.search_sources(chunks[0])[:extended_limit]
-            if str(page.pk) not in exclude_pks
-        ][:limit]
+        max_chunks = min(max(max_chunks or DEFAULT_MAX_CHUNKS, 1), MAX_CHUNKS)
+        results = self.search(index, select_chunks(chunks, max_chunks))
+
+        # Excluded objects are skipped as the results are paged through, so
+        # the first page is only sized for the objects needed.
+        documents = iter_pages(results, page_size=limit * DOCUMENTS_PER_OBJECT)
+        found = []
+        for document in documents:
+            model_label = document.metadata.get("model")
+            pk = document.metadata.get("pk")
+            if model_label is None or pk is None or str(pk) in excluded_pks:
+                continue
+            try:
+                model = get_query_model(apps.get_model(model_label))
+            except LookupError:
+                # The model was removed or renamed since it was indexed.
+                continue
+            key = get_object_key(model, pk)
+            if key in excluded_keys:
+                continue
+            excluded_keys.add(key)
+            found.append((model, str(pk)))
+            if len(found) == limit:
+                break
+        return self.get_suggestions(found)
+
+    def get_suggestions(self, found: list[tuple[type[Model], str]]) -> list[dict]:
+        """
+        Load the titles of the found objects, with one query per model (or a
+        single query for all page types), and build their edit URLs.
+        """
+        pks_by_model = defaultdict(list)
+        for model, pk in found:
+            pks_by_model[model].append(pk)
+
+        objects = {}
+        for model, pks in pks_by_model.items():
+            queryset = model._default_manager.filter(pk__in=pks)
+            try:
+                model._meta.get_field("title")
+            except FieldDoesNotExist:
+                pass
+            else:
+                queryset = queryset.only("pk", "title")
+            objects.update(((model, str(obj.pk)), obj) for obj in queryset)
+
+        finder = AdminURLFinder()
+        suggestions = []
+        for model, pk in found:
+            obj = objects.get((model, pk))
+            if obj is None:
+                # The object was deleted since it was indexed.
+                continue
+            suggestions.append(
+                {
+                    "id": pk,
+                    "key": get_object_key(model, pk),
+                    "title": getattr(obj, "title", str(obj)),
+                    "editUrl": finder.get_edit_url(obj),
+                }
+            )
+        return suggestions
+
+    def search(self, index: VectorIndex, chunks: list[str]):
+        """
+        Search the index for documents similar to all the chunks.
+
+        The chunks are embedded in one batch, and the search uses the mean of
+        their embeddings, so long content takes as many requests to the
+        embedding API and the index as short content. Chunks are embedded like
+        documents at index time, even when there is only one, so with a
+        ``CachedEmbeddingTransformer``, chunks that are unchanged since the
+        page was indexed are read from the embedding cache.
+        """
+        documents = [
+            Document(document_key=str(i), content=chunk, metadata={})
+            for i, chunk in enumerate(chunks)
+        ]
+        embedded_documents = index.embedding_transformer.embed_documents(
+            documents, batch_size=len(documents)
+        )
+        query_embedding = mean_vector(
+            [document.vector for document in embedded_documents]
+        )
+        queryset_cls = DocumentResultMixin.build(
+            sources=index.sources, storage_provider=index.storage_provider
+        )
+        return queryset_cls().filter(embedding=query_embedding)
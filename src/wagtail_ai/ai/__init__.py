@@ -1,3 +1,4 @@
+import threading
 import warnings
 from collections.abc import Mapping
 from dataclasses import dataclass
@@ -5,6 +6,8 @@ from typing import NotRequired, Required, TypedDict, cast
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django.dispatch import receiver
+from django.test.signals import setting_changed
 from django.utils.module_loading import import_string
 
 from ..text_splitters.langchain import LangchainRecursiveCharacterTextSplitter
@@ -134,7 +137,34 @@ def _get_text_splitter_config(
     )
 
 
+_backends: dict[str, AIBackend] = {}
+_backends_lock = threading.Lock()
+
+
 def get_ai_backend(alias: str) -> AIBackend:
+    """
+    Return the backend configured under ``alias``.
+
+    Backends are built once per alias and shared, the registry is cleared
+    when the ``WAGTAIL_AI`` setting changes.
+    """
+    try:
+        return _backends[alias]
+    except KeyError:
+        pass
+    with _backends_lock:
+        # Another thread may have built the backend while we were waiting.
+        if alias not in _backends:
+            _backends[alias] = _build_ai_backend(alias)
+        return _backends[alias]
+
+
+def clear_ai_backends() -> None:
+    with _backends_lock:
+        _backends.clear()
+
+
+def _build_ai_backend(alias: str) -> AIBackend:
     backend_dict = get_ai_backend_settings(alias)
 
     if "CLASS" not in backend_dict:
@@ -160,7 +190,7 @@ def get_ai_backend(alias: str) -> AIBackend:
         text_splitter_length_calculator_class=text_splitting.splitter_length_calculator_class,
     )
 
-    return ai_backend_cls(config=config)
+    return ai_backend_cls(config=config, alias=alias)
 
 
 class BackendNotFound(Exception):
@@ -180,3 +210,9 @@ def get_backend(feature: BackendFeature = BackendFeature.TEXT_COMPLETION) -> AIB
         raise BackendNotFound(f"No backend found for {feature.name}")
 
     return get_ai_backend(alias)
+
+
+@receiver(setting_changed)
+def clear_caches_on_setting_change(sender, setting, **kwargs):
+    if setting in ("WAGTAIL_AI", "WAGTAIL_AI_BACKENDS"):
+        clear_ai_backends()
@@ -1,4 +1,5 @@
 from abc import ABCMeta
+from collections.abc import AsyncIterator
 from dataclasses import dataclass
 from enum import Enum
 from typing import (
@@ -13,12 +14,14 @@ from typing import (
     TypeVar,
 )
 
+from asgiref.sync import sync_to_async
 from django.core.exceptions import ImproperlyConfigured
 from django.core.files import File
 
 from .. import tokens
 from ..types import (
     AIResponse,
+    AsyncAIResponse,
     TextSplitterLengthCalculatorProtocol,
     TextSplitterProtocol,
 )
@@ -29,9 +32,22 @@ class BackendFeature(Enum):
     IMAGE_DESCRIPTION = "IMAGE_DESCRIPTION"
 
 
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+def _to_int(key: str, value: Any) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError) as e:
+        raise ImproperlyConfigured(
+            f'"{key}" is not an "int", it is a "{type(value)}".'
+        ) from e
+
+
 class BaseAIBackendConfigSettings(TypedDict):
     MODEL_ID: Required[str]
     TOKEN_LIMIT: NotRequired[int | None]
+    MAX_CONCURRENCY: NotRequired[int | None]
 
 
 AIBackendConfigSettings = TypeVar(
@@ -48,6 +64,7 @@ class ConfigClassProtocol(Protocol[AIBackendConfigSettings]):
 class BaseAIBackendConfig(ConfigClassProtocol[AIBackendConfigSettings]):
     model_id: str
     token_limit: int
+    max_concurrency: int
     text_splitter_class: type[TextSplitterProtocol]
     text_splitter_length_calculator_class: type[TextSplitterLengthCalculatorProtocol]
 
@@ -66,9 +83,14 @@ class BaseAIBackendConfig(ConfigClassProtocol[AIBackendConfigSettings]):
             model_id=config["MODEL_ID"], custom_value=config.get("TOKEN_LIMIT")
         )
 
+        max_concurrency = cls.get_max_concurrency(
+            custom_value=config.get("MAX_CONCURRENCY")
+        )
+
         return cls(
             model_id=config["MODEL_ID"],
             token_limit=token_limit,
+            max_concurrency=max_concurrency,
             text_splitter_class=text_splitter_class,
             text_splitter_length_calculator_class=text_splitter_length_calculator_class,
             **kwargs,
@@ -90,20 +112,54 @@ class BaseAIBackendConfig(ConfigClassProtocol[AIBackendConfigSettings]):
                 f'"TOKEN_LIMIT" is not configured for model "{model_id}".'
             ) from e
 
+    @classmethod
+    def get_max_concurrency(cls, *, custom_value: int | None) -> int:
+        if custom_value is None:
+            return DEFAULT_MAX_CONCURRENCY
+        max_concurrency = _to_int("MAX_CONCURRENCY", custom_value)
+        if max_concurrency < 1:
+            raise ImproperlyConfigured('"MAX_CONCURRENCY" must be at least 1.')
+        return max_concurrency
+
 
 AIBackendConfig = TypeVar("AIBackendConfig", bound=BaseAIBackendConfig)
 
 
+class SyncToAsyncResponse(AsyncAIResponse):
+    """
+    Wraps a synchronous response so that it can be read from async code.
+
+    Each part of the response is read in a worker thread, so that reading it
+    does not block the event loop.
+    """
+
+    def __init__(self, response: AIResponse) -> None:
+        self.response = response
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        iterator = await sync_to_async(iter, thread_sensitive=False)(self.response)
+        read = sync_to_async(next, thread_sensitive=False)
+        sentinel = object()
+        while (part := await read(iterator, sentinel)) is not sentinel:
+            yield part
+
+    async def text(self) -> str:
+        return await sync_to_async(self.response.text, thread_sensitive=False)()
+
+
 class AIBackend(Generic[AIBackendConfig], metaclass=ABCMeta):
     config_cls: ClassVar[type[ConfigClassProtocol]]
     config: AIBackendConfig
+    alias: str | None
 
     def __init__(
         self,
         *,
         config: AIBackendConfig,
+        alias: str | None = None,
     ) -> None:
         self.config = config
+        self.alias = alias
 
     def prompt_with_context(
         self, *, pre_prompt: str, context: str, post_prompt: str | None = None
@@ -124,3 +180,31 @@ class AIBackend(Generic[AIBackendConfig], metaclass=ABCMeta):
 
     def describe_image(self, *, image_file: File, prompt: str) -> AIResponse:
         raise NotImplementedError("This backend does not support image description")
+
+    async def aprompt_with_context(
+        self, *, pre_prompt: str, context: str, post_prompt: str | None = None
+    ) -> AsyncAIResponse:
+        """
+        Async version of ``prompt_with_context``.
+
+        Backends without native async support run ``prompt_with_context`` in a
+        worker thread instead.
+        """
+        response = await sync_to_async(
+            self.prompt_with_context, thread_sensitive=False
+        )(pre_prompt=pre_prompt, context=context, post_prompt=post_prompt)
+        return SyncToAsyncResponse(response)
+
+    async def adescribe_image(
+        self, *, image_file: File, prompt: str
+    ) -> AsyncAIResponse:
+        """
+        Async version of ``describe_image``.
+
+        Backends without native async support run ``describe_image`` in a
+        worker thread instead.
+        """
+        response = await sync_to_async(self.describe_image, thread_sensitive=False)(
+            image_file=image_file, prompt=prompt
+        )
+        return SyncToAsyncResponse(response)
@@ -1,12 +1,14 @@
+import asyncio
 import random
 import time
-from collections.abc import Generator, Iterator
+from collections.abc import AsyncGenerator, AsyncIterator, Generator, Iterator
 from dataclasses import dataclass
 from typing import Any, NotRequired, Self
 
 from django.core.exceptions import ImproperlyConfigured
 from django.core.files import File
 
+from ..types import AsyncAIResponse
 from .base import (
     AIBackend,
     AIResponse,
@@ -28,7 +30,24 @@ class EchoResponse(AIResponse):
     def text(self) -> str:
         if self._text is not None:
             return self._text
-        self._text = " ".join(self.response_iterator)
+        self._text = "".join(self.response_iterator)
+        return self._text
+
+
+class AsyncEchoResponse(AsyncAIResponse):
+    _text: str | None = None
+    response_iterator: AsyncIterator[str]
+
+    def __init__(self, response_iterator: AsyncIterator[str]) -> None:
+        self.response_iterator = response_iterator
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self.response_iterator
+
+    async def text(self) -> str:
+        if self._text is not None:
+            return self._text
+        self._text = "".join([part async for part in self.response_iterator])
         return self._text
 
 
@@ -72,17 +91,46 @@ class EchoBackend(AIBackend[EchoBackendConfig]):
             ["This", "is", "an", "echo", "backend:", image_file.name]
         )
 
+    async def aprompt_with_context(
+        self, *, pre_prompt: str, context: str, post_prompt: str | None = None
+    ) -> AsyncAIResponse:
+        return self.get_async_response(
+            ["This", "is", "an", "echo", "backend:", *context.split()]
+        )
+
+    async def adescribe_image(
+        self, *, image_file: File, prompt: str
+    ) -> AsyncAIResponse:
+        return self.get_async_response(
+            ["This", "is", "an", "echo", "backend:", image_file.name]
+        )
+
+    def get_word_sleep_seconds(self) -> float:
+        if (
+            self.config.max_word_sleep_seconds is not None
+            and self.config.max_word_sleep_seconds > 0
+        ):
+            return random.random() * random.randint(
+                0, self.config.max_word_sleep_seconds
+            )
+        return 0
+
     def get_response(self, words):
         def response_iterator() -> Generator[str, None, None]:
-            for word in words:
-                if (
-                    self.config.max_word_sleep_seconds is not None
-                    and self.config.max_word_sleep_seconds > 0
-                ):
-                    time.sleep(
-                        random.random()
-                        * random.randint(0, self.config.max_word_sleep_seconds)
-                    )
-                yield word
+            for index, word in enumerate(words):
+                if sleep_seconds := self.get_word_sleep_seconds():
+                    time.sleep(sleep_seconds)
+                # Yield the words with their separators, so that joining the
+                # parts gives back the full text.
+                yield word if index == 0 else f" {word}"
 
         return EchoResponse(response_iterator())
+
+    def get_async_response(self, words):
+        async def response_iterator() -> AsyncGenerator[str, None]:
+            for index, word in enumerate(words):
+                if sleep_seconds := self.get_word_sleep_seconds():
+                    await asyncio.sleep(sleep_seconds)
+                yield word if index == 0 else f" {word}"
+
+        return AsyncEchoResponse(response_iterator())
@@ -5,7 +5,7 @@ from typing import Any, NotRequired, Self
 
 import llm
 
-from ..types import AIResponse
+from ..types import AIResponse, AsyncAIResponse
 from .base import AIBackend, BaseAIBackendConfig, BaseAIBackendConfigSettings
 
 
@@ -47,14 +47,53 @@ class LLMBackend(AIBackend[LLMBackendConfig]):
             parts.append(post_prompt)
 
         full_prompt = os.linesep.join(parts)
+        return model.prompt(full_prompt, **self.get_prompt_kwargs())
+
+    async def aprompt_with_context(
+        self, *, pre_prompt: str, context: str, post_prompt: str | None = None
+    ) -> AsyncAIResponse:
+        model = self.get_async_llm_model()
+        if model is None:
+            # Not every llm plugin provides an async model, use the sync one
+            # in a worker thread instead.
+            return await super().aprompt_with_context(
+                pre_prompt=pre_prompt, context=context, post_prompt=post_prompt
+            )
+        parts = [pre_prompt, context]
+
+        if post_prompt is not None:
+            parts.append(post_prompt)
+
+        full_prompt = os.linesep.join(parts)
+        return model.prompt(full_prompt, **self.get_prompt_kwargs())
+
+    def get_prompt_kwargs(self) -> dict[str, Any]:
         prompt_kwargs = {}
         if self.config.prompt_kwargs is not None:
             prompt_kwargs.update(self.config.prompt_kwargs)
-        return model.prompt(full_prompt, **prompt_kwargs)
+        return prompt_kwargs
 
     def get_llm_model(self) -> llm.Model:
         model = llm.get_model(self.config.model_id)
+        self.apply_init_kwargs(model)
+        return model
+
+    def get_async_llm_model(self) -> "llm.AsyncModel | None":
+        """
+        Return the async version of the model, or None if the installed llm
+        version or plugin does not provide one.
+        """
+        get_async_model = getattr(llm, "get_async_model", None)
+        if get_async_model is None:
+            return None
+        try:
+            model = get_async_model(self.config.model_id)
+        except llm.UnknownModelError:
+            return None
+        self.apply_init_kwargs(model)
+        return model
+
+    def apply_init_kwargs(self, model: Any) -> None:
         if self.config.init_kwargs is not None:
             for config_key, config_val in self.config.init_kwargs.items():
                 setattr(model, config_key, config_val)
-        return model
@@ -1,24 +1,43 @@
+import asyncio
 import base64
+import json
 import mimetypes
 import os
-from collections.abc import Iterator
+import threading
+import weakref
+from collections.abc import AsyncGenerator, AsyncIterator, Iterator
 from dataclasses import dataclass
 from typing import Any, NotRequired, Self
 
+import httpx
 import requests
+from asgiref.sync import sync_to_async
 from django.core.files import File
+from requests.adapters import HTTPAdapter
 
-from wagtail_ai.types import AIResponse
+from wagtail_ai.types import AIResponse, AsyncAIResponse
 
-from .base import AIBackend, BaseAIBackendConfig, BaseAIBackendConfigSettings
+from .base import (
+    AIBackend,
+    BaseAIBackendConfig,
+    BaseAIBackendConfigSettings,
+    _to_int,
+)
 
 DEFAULT_API_BASE = "https://api.openai.com/v1"
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
 
 
 class OpenAIBackendConfigSettingsDict(BaseAIBackendConfigSettings):
     TIMEOUT_SECONDS: NotRequired[int | None]
     OPENAI_API_KEY: NotRequired[str | None]
     API_BASE: NotRequired[str | None]
+    POOL_CONNECTIONS: NotRequired[int | None]
+    POOL_MAXSIZE: NotRequired[int | None]
+    POOL_BLOCK: NotRequired[bool | None]
+    KEEP_ALIVE: NotRequired[bool | None]
+    STREAM: NotRequired[bool | None]
 
 
 @dataclass(kw_only=True)
@@ -26,6 +45,11 @@ class OpenAIBackendConfig(BaseAIBackendConfig[OpenAIBackendConfigSettingsDict]):
     timeout_seconds: int
     openai_api_key: str | None
     api_base: str
+    pool_connections: int
+    pool_maxsize: int
+    pool_block: bool
+    keep_alive: bool
+    stream: bool
 
     @classmethod
     def from_settings(
@@ -39,9 +63,144 @@ class OpenAIBackendConfig(BaseAIBackendConfig[OpenAIBackendConfigSettingsDict]):
         kwargs.setdefault("openai_api_key", config.get("OPENAI_API_KEY"))
         kwargs.setdefault("api_base", config.get("API_BASE", DEFAULT_API_BASE))
 
+        pool_connections = config.get("POOL_CONNECTIONS")
+        if pool_connections is None:
+            pool_connections = DEFAULT_POOL_CONNECTIONS
+        kwargs.setdefault(
+            "pool_connections", _to_int("POOL_CONNECTIONS", pool_connections)
+        )
+
+        pool_maxsize = config.get("POOL_MAXSIZE")
+        if pool_maxsize is None:
+            pool_maxsize = DEFAULT_POOL_MAXSIZE
+        kwargs.setdefault("pool_maxsize", _to_int("POOL_MAXSIZE", pool_maxsize))
+
+        pool_block = config.get("POOL_BLOCK")
+        kwargs.setdefault("pool_block", bool(pool_block))
+
+        keep_alive = config.get("KEEP_ALIVE")
+        if keep_alive is None:
+            keep_alive = True
+        kwargs.setdefault("keep_alive", bool(keep_alive))
+
+        stream = config.get("STREAM")
+        kwargs.setdefault("stream", bool(stream))
+
         return super().from_settings(config, **kwargs)
 
 
+_sessions: dict[tuple[int, int, bool, bool], requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def _get_pool_key(config: OpenAIBackendConfig) -> tuple[int, int, bool, bool]:
+    return (
+        config.pool_connections,
+        config.pool_maxsize,
+        config.pool_block,
+        config.keep_alive,
+    )
+
+
+def get_session(config: OpenAIBackendConfig) -> requests.Session:
+    """
+    Return a shared ``requests.Session`` for the pool settings in ``config``.
+
+    Sessions are reused across backend instances with the same pool settings so
+    that TCP and TLS connections are kept alive between requests. The underlying
+    urllib3 connection pool is thread-safe.
+    """
+    key = _get_pool_key(config)
+    with _sessions_lock:
+        try:
+            return _sessions[key]
+        except KeyError:
+            pass
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=config.pool_connections,
+            pool_maxsize=config.pool_maxsize,
+            pool_block=config.pool_block,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if not config.keep_alive:
+            session.headers["Connection"] = "close"
+        _sessions[key] = session
+        return session
+
+
+_async_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[tuple[int, int, bool, bool], httpx.AsyncClient]
+] = weakref.WeakKeyDictionary()
+_async_client_closers: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, AsyncGenerator[None, None]
+] = weakref.WeakKeyDictionary()
+
+
+async def _close_on_shutdown(
+    clients: dict[tuple[int, int, bool, bool], httpx.AsyncClient],
+) -> AsyncGenerator[None, None]:
+    """
+    Stay suspended for as long as the event loop runs. Event loops close the
+    async generators that are still suspended when they shut down, for
+    example at the end of ``asyncio.run``, which closes the clients.
+    """
+    try:
+        yield
+    finally:
+        for client in clients.values():
+            await client.aclose()
+
+
+async def get_async_client(config: OpenAIBackendConfig) -> httpx.AsyncClient:
+    """
+    Return a shared ``httpx.AsyncClient`` for the pool settings in ``config``.
+
+    The async counterpart of ``get_session``. Async clients can't be shared
+    between event loops, so there is one client per event loop, which is
+    closed when the event loop shuts down.
+    """
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.get(loop)
+    if clients is None:
+        clients = _async_clients[loop] = {}
+        closer = _close_on_shutdown(clients)
+        await anext(closer)
+        _async_client_closers[loop] = closer
+    key = _get_pool_key(config)
+    try:
+        return clients[key]
+    except KeyError:
+        pass
+    limits = httpx.Limits(
+        # Unlike urllib3, httpx always waits for a free connection once the
+        # limit is reached, so only limit the connections if POOL_BLOCK is set.
+        max_connections=config.pool_maxsize if config.pool_block else None,
+        max_keepalive_connections=config.pool_maxsize if config.keep_alive else 0,
+    )
+    client = httpx.AsyncClient(limits=limits)
+    clients[key] = client
+    return client
+
+
+def _parse_stream_line(line: str) -> str | None:
+    """
+    Return the content delta from a line of a streamed chat completion, if any.
+    """
+    # Skip keep-alive blank lines, comments and other SSE fields.
+    if not line or not line.startswith("data:"):
+        return None
+    data = line.removeprefix("data:").strip()
+    # The last event is "[DONE]", after which the server ends the response.
+    if data == "[DONE]":
+        return None
+    chunk = json.loads(data)
+    if not chunk.get("choices"):
+        return None
+    return chunk["choices"][0].get("delta", {}).get("content") or None
+
+
 class OpenAIResponse(AIResponse):
     def __init__(self, response: requests.Response):
         self.response = response
@@ -57,12 +216,129 @@ class OpenAIResponse(AIResponse):
         return self.text()
 
 
+class OpenAIStreamingResponse(AIResponse):
+    """
+    A streamed chat completion.
+
+    Iterating over the response yields the content deltas as the server sends
+    them, without reading the whole body into memory first. The body can only
+    be read once, so iterate over the response or call ``text()``, not both.
+    """
+
+    def __init__(self, response: requests.Response):
+        self.response = response
+        self._text: str | None = None
+        self._consumed = False
+
+    def __iter__(self) -> Iterator[str]:
+        if self._text is not None:
+            yield self._text
+            return
+        if self._consumed:
+            raise RuntimeError("The streamed response has already been read.")
+        self._consumed = True
+
+        if self.response.encoding is None:
+            self.response.encoding = "utf-8"
+        try:
+            for line in self.response.iter_lines(decode_unicode=True):
+                if content := _parse_stream_line(line):
+                    yield content
+        finally:
+            self.response.close()
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "".join(self)
+        return self._text
+
+    def __str__(self):
+        return self.text()
+
+
+class AsyncOpenAIResponse(AsyncAIResponse):
+    def __init__(self, response: httpx.Response):
+        self.response = response
+        self._text = response.json()["choices"][0]["message"]["content"]
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        yield self._text
+
+    async def text(self) -> str:
+        return self._text
+
+
+class AsyncOpenAIStreamingResponse(AsyncAIResponse):
+    """
+    The async counterpart of ``OpenAIStreamingResponse``.
+    """
+
+    def __init__(self, response: httpx.Response):
+        self.response = response
+        self._text: str | None = None
+        self._consumed = False
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        if self._text is not None:
+            yield self._text
+            return
+        if self._consumed:
+            raise RuntimeError("The streamed response has already been read.")
+        self._consumed = True
+
+        try:
+            async for line in self.response.aiter_lines():
+                if content := _parse_stream_line(line):
+                    yield content
+        finally:
+            await self.response.aclose()
+
+    async def text(self) -> str:
+        if self._text is None:
+            self._text = "".join([part async for part in self])
+        return self._text
+
+
 class OpenAIBackend(AIBackend[OpenAIBackendConfig]):
     config_cls = OpenAIBackendConfig
 
     def prompt_with_context(
         self, *, pre_prompt: str, context: str, post_prompt: str | None = None
-    ) -> OpenAIResponse:
+    ) -> OpenAIResponse | OpenAIStreamingResponse:
+        return self.chat_completions(
+            self.get_prompt_messages(
+                pre_prompt=pre_prompt, context=context, post_prompt=post_prompt
+            )
+        )
+
+    async def aprompt_with_context(
+        self, *, pre_prompt: str, context: str, post_prompt: str | None = None
+    ) -> AsyncOpenAIResponse | AsyncOpenAIStreamingResponse:
+        return await self.achat_completions(
+            self.get_prompt_messages(
+                pre_prompt=pre_prompt, context=context, post_prompt=post_prompt
+            )
+        )
+
+    def describe_image(
+        self, *, image_file: File, prompt: str
+    ) -> OpenAIResponse | OpenAIStreamingResponse:
+        return self.chat_completions(
+            self.get_image_messages(image_file=image_file, prompt=prompt)
+        )
+
+    async def adescribe_image(
+        self, *, image_file: File, prompt: str
+    ) -> AsyncOpenAIResponse | AsyncOpenAIStreamingResponse:
+        # Reading the file may hit remote storage, so do it in a thread.
+        messages = await sync_to_async(self.get_image_messages, thread_sensitive=False)(
+            image_file=image_file, prompt=prompt
+        )
+        return await self.achat_completions(messages)
+
+    def get_prompt_messages(
+        self, *, pre_prompt: str, context: str, post_prompt: str | None = None
+    ) -> list[dict[str, Any]]:
         messages = [
             {"role": "system", "content": [{"type": "text", "text": pre_prompt}]},
             {"role": "user", "content": [{"type": "text", "text": context}]},
@@ -73,9 +349,11 @@ class OpenAIBackend(AIBackend[OpenAIBackendConfig]):
                 {"role": "system", "content": [{"type": "text", "text": post_prompt}]}
             )
 
-        return self.chat_completions(messages)
+        return messages
 
-    def describe_image(self, *, image_file: File, prompt: str) -> OpenAIResponse:
+    def get_image_messages(
+        self, *, image_file: File, prompt: str
+    ) -> list[dict[str, Any]]:
         if not prompt:
             raise ValueError("Prompt must not be empty.")
         mime_type, _ = mimetypes.guess_type(image_file.name)
@@ -84,46 +362,91 @@ class OpenAIBackend(AIBackend[OpenAIBackendConfig]):
         with image_file.open() as f:
             base64_image = base64.b64encode(f.read()).decode("utf-8")
 
-        return self.chat_completions(
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt,
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:{mime_type};base64,{base64_image}"
-                            },
-                        },
-                    ],
-                },
-            ],
-        )
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": prompt,
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": f"data:{mime_type};base64,{base64_image}"},
+                    },
+                ],
+            },
+        ]
 
-    def chat_completions(self, messages: list[dict[str, Any]]) -> OpenAIResponse:
+    def get_chat_completions_request(
+        self, messages: list[dict[str, Any]]
+    ) -> tuple[str, dict[str, str], dict[str, Any]]:
+        """
+        Return the URL, headers and JSON payload for a chat completions request.
+        """
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.get_openai_api_key()}",
         }
-        payload = {
+        payload: dict[str, Any] = {
             "model": self.config.model_id,
             "messages": messages,
             "max_tokens": self.config.token_limit,
         }
-        response = requests.post(
-            f"{self.config.api_base}/chat/completions",
+        if self.config.stream:
+            payload["stream"] = True
+        return f"{self.config.api_base}/chat/completions", headers, payload
+
+    def chat_completions(
+        self, messages: list[dict[str, Any]]
+    ) -> OpenAIResponse | OpenAIStreamingResponse:
+        url, headers, payload = self.get_chat_completions_request(messages)
+        response = self.get_session().post(
+            url,
             headers=headers,
             json=payload,
             timeout=self.config.timeout_seconds,
+            stream=self.config.stream,
         )
 
-        response.raise_for_status()
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            response.close()
+            raise
+        if self.config.stream:
+            return OpenAIStreamingResponse(response)
         return OpenAIResponse(response)
 
+    async def achat_completions(
+        self, messages: list[dict[str, Any]]
+    ) -> AsyncOpenAIResponse | AsyncOpenAIStreamingResponse:
+        url, headers, payload = self.get_chat_completions_request(messages)
+        client = await self.get_async_client()
+        request = client.build_request(
+            "POST",
+            url,
+            headers=headers,
+            json=payload,
+            timeout=self.config.timeout_seconds,
+        )
+        response = await client.send(request, stream=self.config.stream)
+
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError:
+            await response.aclose()
+            raise
+        if self.config.stream:
+            return AsyncOpenAIStreamingResponse(response)
+        return AsyncOpenAIResponse(response)
+
+    def get_session(self) -> requests.Session:
+        return get_session(self.config)
+
+    async def get_async_client(self) -> httpx.AsyncClient:
+        return await get_async_client(self.config)
+
     def get_openai_api_key(self) -> str:
         if config_key := self.config.openai_api_key:
             return config_key
@@ -0,0 +1,293 @@
+import hashlib
+import json
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+from functools import cache
+from typing import Any, NotRequired, Self, TypedDict
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+
+from ..types import AIResponse, AsyncAIResponse
+from .base import AIBackend
+
+DEFAULT_CACHE_ALIAS = "default"
+DEFAULT_TIMEOUT = 60 * 60 * 24
+DEFAULT_MAX_RESPONSE_SIZE = 100_000
+KEY_PREFIX = "wagtail_ai:response"
+
+
+class ResponseCacheSettingsDict(TypedDict):
+    CACHE_ALIAS: NotRequired[str]
+    TIMEOUT: NotRequired[int | None]
+    MAX_RESPONSE_SIZE: NotRequired[int | None]
+
+
+class CachedResponse(AIResponse):
+    """
+    A response that was read from the response cache.
+    """
+
+    def __init__(self, text: str) -> None:
+        self._text = text
+
+    def __iter__(self) -> Iterator[str]:
+        yield self._text
+
+    def text(self) -> str:
+        return self._text
+
+    def __str__(self):
+        return self.text()
+
+
+class CachingResponse(AIResponse):
+    """
+    Wraps a backend response and stores its text in the response cache
+    once it has been read in full.
+    """
+
+    def __init__(
+        self, response: AIResponse, *, response_cache: "ResponseCache", key: str
+    ) -> None:
+        self.response = response
+        self.response_cache = response_cache
+        self.key = key
+
+    def __iter__(self) -> Iterator[str]:
+        parts = []
+        for part in self.response:
+            parts.append(part)
+            yield part
+        self.response_cache.set(self.key, "".join(parts))
+
+    def text(self) -> str:
+        text = self.response.text()
+        self.response_cache.set(self.key, text)
+        return text
+
+    def __str__(self):
+        return self.text()
+
+
+class AsyncCachedResponse(AsyncAIResponse):
+    """
+    The async counterpart of ``CachedResponse``.
+    """
+
+    def __init__(self, text: str) -> None:
+        self._text = text
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        yield self._text
+
+    async def text(self) -> str:
+        return self._text
+
+
+class AsyncCachingResponse(AsyncAIResponse):
+    """
+    The async counterpart of ``CachingResponse``.
+    """
+
+    def __init__(
+        self, response: AsyncAIResponse, *, response_cache: "ResponseCache", key: str
+    ) -> None:
+        self.response = response
+        self.response_cache = response_cache
+        self.key = key
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        parts = []
+        async for part in self.response:
+            parts.append(part)
+            yield part
+        await self.response_cache.aset(self.key, "".join(parts))
+
+    async def text(self) -> str:
+        text = await self.response.text()
+        await self.response_cache.aset(self.key, text)
+        return text
+
+
+@dataclass(kw_only=True)
+class ResponseCache:
+    cache_alias: str
+    timeout: int | None
+    max_response_size: int | None
+
+    @classmethod
+    def from_settings(cls, config: ResponseCacheSettingsDict) -> Self:
+        cache_alias = config.get("CACHE_ALIAS", DEFAULT_CACHE_ALIAS)
+        if cache_alias not in settings.CACHES:
+            raise ImproperlyConfigured(
+                f'"CACHE_ALIAS" ("{cache_alias}") is not a configured cache.'
+            )
+
+        # A timeout of None means that responses never expire.
+        timeout = config.get("TIMEOUT", DEFAULT_TIMEOUT)
+        if timeout is not None:
+            try:
+                timeout = int(timeout)
+            except ValueError as e:
+                raise ImproperlyConfigured(
+                    f'"TIMEOUT" is not an "int", it is a "{type(timeout)}".'
+                ) from e
+
+        max_response_size = config.get("MAX_RESPONSE_SIZE", DEFAULT_MAX_RESPONSE_SIZE)
+        if max_response_size is not None:
+            try:
+                max_response_size = int(max_response_size)
+            except ValueError as e:
+                raise ImproperlyConfigured(
+                    f'"MAX_RESPONSE_SIZE" is not an "int", it is a "{type(max_response_size)}".'
+                ) from e
+
+        return cls(
+            cache_alias=cache_alias,
+            timeout=timeout,
+            max_response_size=max_response_size,
+        )
+
+    @property
+    def cache(self) -> BaseCache:
+        return caches[self.cache_alias]
+
+    def make_key(self, **parts: Any) -> str:
+        """
+        Build a cache key from a hash of everything that affects the response.
+        """
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        digest = hashlib.sha256(payload.encode()).hexdigest()
+        return f"{KEY_PREFIX}:{digest}"
+
+    def get(self, key: str) -> str | None:
+        return self.cache.get(key)
+
+    def set(self, key: str, text: str) -> None:
+        if self.max_response_size is not None and len(text) > self.max_response_size:
+            return
+        self.cache.set(key, text, self.timeout)
+
+    async def aget(self, key: str) -> str | None:
+        return await self.cache.aget(key)
+
+    async def aset(self, key: str, text: str) -> None:
+        if self.max_response_size is not None and len(text) > self.max_response_size:
+            return
+        await self.cache.aset(key, text, self.timeout)
+
+    def make_prompt_key(
+        self,
+        backend: AIBackend,
+        *,
+        pre_prompt: str,
+        context: str,
+        post_prompt: str | None = None,
+    ) -> str:
+        return self.make_key(
+            alias=backend.alias,
+            model_id=backend.config.model_id,
+            pre_prompt=pre_prompt,
+            context=context,
+            post_prompt=post_prompt,
+        )
+
+    def prompt_with_context(
+        self,
+        backend: AIBackend,
+        *,
+        pre_prompt: str,
+        context: str,
+        post_prompt: str | None = None,
+    ) -> AIResponse:
+        key = self.make_prompt_key(
+            backend, pre_prompt=pre_prompt, context=context, post_prompt=post_prompt
+        )
+        if (text := self.get(key)) is not None:
+            return CachedResponse(text)
+
+        response = backend.prompt_with_context(
+            pre_prompt=pre_prompt, context=context, post_prompt=post_prompt
+        )
+        return CachingResponse(response, response_cache=self, key=key)
+
+    async def aprompt_with_context(
+        self,
+        backend: AIBackend,
+        *,
+        pre_prompt: str,
+        context: str,
+        post_prompt: str | None = None,
+    ) -> AsyncAIResponse:
+        key = self.make_prompt_key(
+            backend, pre_prompt=pre_prompt, context=context, post_prompt=post_prompt
+        )
+        if (text := await self.aget(key)) is not None:
+            return AsyncCachedResponse(text)
+
+        response = await backend.aprompt_with_context(
+            pre_prompt=pre_prompt, context=context, post_prompt=post_prompt
+        )
+        return AsyncCachingResponse(response, response_cache=self, key=key)
+
+
+@cache
+def get_response_cache() -> ResponseCache | None:
+    """
+    Return the response cache, or None if it is not enabled with
+    ``WAGTAIL_AI["RESPONSE_CACHE"]``.
+    """
+    config = getattr(settings, "WAGTAIL_AI", {}).get("RESPONSE_CACHE")
+    if config is None:
+        return None
+    return ResponseCache.from_settings(config)
+
+
+def prompt_with_context(
+    backend: AIBackend,
+    *,
+    pre_prompt: str,
+    context: str,
+    post_prompt: str | None = None,
+) -> AIResponse:
+    """
+    Prompt the backend, going through the response cache when it is enabled.
+    """
+    response_cache = get_response_cache()
+    if response_cache is None:
+        return backend.prompt_with_context(
+            pre_prompt=pre_prompt, context=context, post_prompt=post_prompt
+        )
+    return response_cache.prompt_with_context(
+        backend, pre_prompt=pre_prompt, context=context, post_prompt=post_prompt
+    )
+
+
+async def aprompt_with_context(
+    backend: AIBackend,
+    *,
+    pre_prompt: str,
+    context: str,
+    post_prompt: str | None = None,
+) -> AsyncAIResponse:
+    """
+    The async counterpart of ``prompt_with_context``.
+    """
+    response_cache = get_response_cache()
+    if response_cache is None:
+        return await backend.aprompt_with_context(
+            pre_prompt=pre_prompt, context=context, post_prompt=post_prompt
+        )
+    return await response_cache.aprompt_with_context(
+        backend, pre_prompt=pre_prompt, context=context, post_prompt=post_prompt
+    )
+
+
+@receiver(setting_changed)
+def clear_caches_on_setting_change(sender, setting, **kwargs):
+    if setting in ("WAGTAIL_AI", "CACHES"):
+        get_response_cache.cache_clear()
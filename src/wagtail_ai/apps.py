@@ -6,3 +6,8 @@ class WagtailAiAppConfig(AppConfig):
     label = "wagtail_ai"
     name = "wagtail_ai"
     verbose_name = "Wagtail AI"
+
+    def ready(self):
+        from .signal_handlers import register_signal_handlers
+
+        register_signal_handlers()
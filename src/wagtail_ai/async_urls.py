@@ -0,0 +1,11 @@
+from django.urls import path
+
+from .views import aagent_job, adescribe_image, atext_completion
+
+app_name = "wagtail_ai_async"
+
+urlpatterns = [
+    path("text_completion/", atext_completion, name="text_completion"),
+    path("describe_image/", adescribe_image, name="describe_image"),
+    path("agent_jobs/<str:job_id>/", aagent_job, name="agent_job"),
+]
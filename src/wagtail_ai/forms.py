@@ -8,7 +8,7 @@ from wagtail.admin.staticfiles import versioned_static
 from wagtail.images.forms import BaseImageForm
 
 from wagtail_ai.agents.basic_prompt import ImageDescriptionPrompt, ImageTitlePrompt
-from wagtail_ai.models import Prompt
+from wagtail_ai.prompt_cache import get_prompt
 
 
 class PromptTextField(forms.CharField):
@@ -39,10 +39,11 @@ class ApiForm(forms.Form):
 class PromptForm(ApiForm):
     text = PromptTextField()
     prompt = PromptUUIDField()
+    stream = forms.BooleanField(required=False)
 
     def clean_prompt(self):
         prompt_uuid = self.cleaned_data["prompt"]
-        prompt = Prompt.objects.filter(uuid=prompt_uuid).first()
+        prompt = get_prompt(prompt_uuid)
         if not prompt:
             raise ValidationError(
                 self.fields["prompt"].error_messages["invalid"], code="invalid"
@@ -0,0 +1,160 @@
+"""
+An embedding cache for django-ai-core's ``CachedEmbeddingTransformer`` that
+keeps embeddings in a local SQLite file, so that unchanged chunks are not sent
+to the embedding API again when an index is updated.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections.abc import Iterator
+from pathlib import Path
+
+from django_ai_core.contrib.index.embedding_cache import EmbeddingCacheBackend
+
+DEFAULT_MAX_ENTRIES = 100_000
+# How often reading an embedding records its use, in nanoseconds. Recording it
+# on every read would take the write lock for each query.
+USED_AT_INTERVAL = 60 * 60 * 10**9
+# SQLite limits the number of parameters of a query.
+QUERY_BATCH_SIZE = 500
+
+
+def get_cache_key(content: str, transformer_id: str) -> str:
+    return hashlib.sha256(f"{transformer_id}\0{content}".encode()).hexdigest()
+
+
+class LocalEmbeddingCacheBackend(EmbeddingCacheBackend):
+    """
+    Embeddings stored in a SQLite file, keyed by a hash of the embedding
+    transformer ID, which includes the embedding model, and the content.
+
+    Vectors are stored as float32 values. Once the cache holds more than
+    ``max_entries`` embeddings, the least recently used ones are evicted, with
+    their last use recorded to the hour. The file can be shared by several
+    processes.
+    """
+
+    def __init__(
+        self, *, path: str | os.PathLike, max_entries: int = DEFAULT_MAX_ENTRIES
+    ) -> None:
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared between threads.
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, used_at INTEGER NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_used_at ON embeddings (used_at)"
+            )
+            # The number of embeddings is kept up to date as they are stored
+            # and evicted, rather than counted on every store.
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings_count ("
+                "id INTEGER PRIMARY KEY CHECK (id = 0), count INTEGER NOT NULL)"
+            )
+            with connection:
+                connection.execute(
+                    "INSERT OR IGNORE INTO embeddings_count (id, count) "
+                    "SELECT 0, COUNT(*) FROM embeddings "
+                    "WHERE NOT EXISTS (SELECT 1 FROM embeddings_count)"
+                )
+            self._local.connection = connection
+        return connection
+
+    def get_embedding(self, content: str, transformer_id: str) -> list[float] | None:
+        return self.get_embeddings_batch([content], transformer_id).get(content)
+
+    def store_embedding(
+        self, content: str, transformer_id: str, embedding: list[float]
+    ) -> None:
+        self.store_embeddings_batch({content: embedding}, transformer_id)
+
+    def get_embeddings_batch(
+        self, contents: list[str], transformer_id: str
+    ) -> dict[str, list[float]]:
+        contents_by_key = {
+            get_cache_key(content, transformer_id): content for content in contents
+        }
+        result = {}
+        now = time.time_ns()
+        stale_keys = []
+        with self.connection as connection:
+            for keys in _batched(list(contents_by_key)):
+                placeholders = ", ".join("?" * len(keys))
+                rows = connection.execute(
+                    "SELECT key, vector, used_at FROM embeddings "
+                    f"WHERE key IN ({placeholders})",
+                    keys,
+                ).fetchall()
+                for key, vector, used_at in rows:
+                    result[contents_by_key[key]] = array("f", vector).tolist()
+                    if now - used_at >= USED_AT_INTERVAL:
+                        stale_keys.append(key)
+            for keys in _batched(stale_keys):
+                placeholders = ", ".join("?" * len(keys))
+                connection.execute(
+                    f"UPDATE embeddings SET used_at = ? WHERE key IN ({placeholders})",
+                    [now, *keys],
+                )
+        return result
+
+    def store_embeddings_batch(
+        self, content_embeddings: dict[str, list[float]], transformer_id: str
+    ) -> None:
+        used_at = time.time_ns()
+        inserted = 0
+        with self.connection as connection:
+            for content, embedding in content_embeddings.items():
+                key = get_cache_key(content, transformer_id)
+                vector = array("f", embedding).tobytes()
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO embeddings (key, vector, used_at) "
+                    "VALUES (?, ?, ?)",
+                    [key, vector, used_at],
+                )
+                if cursor.rowcount:
+                    inserted += 1
+                else:
+                    connection.execute(
+                        "UPDATE embeddings SET vector = ?, used_at = ? WHERE key = ?",
+                        [vector, used_at, key],
+                    )
+            connection.execute(
+                "UPDATE embeddings_count SET count = count + ?", [inserted]
+            )
+            (count,) = connection.execute(
+                "SELECT count FROM embeddings_count"
+            ).fetchone()
+            if count > self.max_entries:
+                evicted = connection.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    "SELECT key FROM embeddings ORDER BY used_at LIMIT ?)",
+                    [count - self.max_entries],
+                ).rowcount
+                connection.execute(
+                    "UPDATE embeddings_count SET count = count - ?", [evicted]
+                )
+
+    def clear_cache(self) -> None:
+        with self.connection as connection:
+            connection.execute("DELETE FROM embeddings")
+            connection.execute("UPDATE embeddings_count SET count = 0")
+
+
+def _batched(keys: list[str]) -> Iterator[list[str]]:
+    for start in range(0, len(keys), QUERY_BATCH_SIZE):
+        yield keys[start : start + QUERY_BATCH_SIZE]
@@ -0,0 +1,412 @@
+"""
+A vector storage provider for django-ai-core indexes that keeps the vectors in
+memory-mapped files on the local disk, so that related content suggestions
+work without a separate vector database.
+"""
+
+import json
+import os
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from django.core.exceptions import ImproperlyConfigured
+from django_ai_core.contrib.index.schema import EmbeddedDocument
+from django_ai_core.contrib.index.storage.base import (
+    BaseStorageDocument,
+    BaseStorageQuerySet,
+    StorageProvider,
+)
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImproperlyConfigured(
+        'LocalVectorProvider requires NumPy. Install it with "pip install wagtail-ai[local-index]".'
+    ) from e
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # Not available on Windows, where writes are only serialized within a
+    # process.
+    fcntl = None
+
+MANIFEST_FILENAME = "manifest.json"
+LOCK_FILENAME = "write.lock"
+VECTORS_FILENAME = "vectors.bin"
+SCALES_FILENAME = "scales.bin"
+MIN_CAPACITY = 64
+
+
+class LocalVectorQuerySet(BaseStorageQuerySet["LocalVectorProvider"]):
+    def run_query(self) -> Iterator[BaseStorageDocument]:
+        if not self.storage_provider:
+            raise ValueError("Storage provider is required")
+
+        filter_map = {filter[0]: filter[1] for filter in self.filters}
+
+        embedding = filter_map.pop("embedding", None)
+        if embedding is None:
+            raise ValueError("embedding filter is required")
+
+        if self.ordering:
+            raise NotImplementedError("Ordering is not supported for querying")
+
+        store = self.storage_provider.store
+        matches = store.search(embedding, limit=self.stop, metadata=filter_map)
+        for document_key, content, metadata, score in matches[self.start : self.stop]:
+            yield self.model(
+                document_key=document_key,
+                content=content,
+                metadata=metadata,
+                score=score,
+            )
+
+
+class LocalVectorStore:
+    """
+    The vectors of one index, stored in a directory.
+
+    Vectors are normalized and kept, one per row, in a memory-mapped file of
+    float32 values, or of int8 values with a float32 scale per row when
+    quantized. The content, metadata and row of each document are kept in a
+    JSON manifest, which is replaced atomically after every change. Searches
+    reload the files when another process has changed the manifest.
+
+    Changes hold an exclusive lock on a file in the directory, so that
+    processes that update the index at the same time don't overwrite each
+    other's changes.
+    """
+
+    def __init__(self, directory: Path, *, quantize: bool = False) -> None:
+        self.directory = directory
+        self.quantize = quantize
+        self.lock = threading.RLock()
+        self._write_depth = 0
+        self._manifest_version: tuple[int, int] | None = None
+        self._reset()
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / MANIFEST_FILENAME
+
+    @property
+    def dtype(self):
+        return np.int8 if self.quantize else np.float32
+
+    def _reset(self) -> None:
+        self.dimensions: int | None = None
+        self.capacity = 0
+        self.size = 0
+        self.rows: dict[str, int] = {}
+        self.row_keys: dict[int, str] = {}
+        self.documents: dict[str, tuple[str, dict[str, Any]]] = {}
+        self.free_rows: list[int] = []
+        self.valid = np.zeros(0, dtype=bool)
+        self.vectors: Any = None
+        self.scales: Any = None
+
+    @contextmanager
+    def write_lock(self) -> Iterator[None]:
+        """
+        Lock the index for changes in this process and in other processes.
+        The manifest is reloaded if another process changed it in the meantime.
+        """
+        with self.lock:
+            if self._write_depth or fcntl is None:
+                self._write_depth += 1
+                try:
+                    self._refresh()
+                    yield
+                finally:
+                    self._write_depth -= 1
+                return
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.directory / LOCK_FILENAME, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._write_depth += 1
+                try:
+                    self._refresh()
+                    yield
+                finally:
+                    self._write_depth -= 1
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _get_manifest_version(self) -> tuple[int, int] | None:
+        # The manifest is replaced rather than written to, so a new inode
+        # number tells a change apart even within the resolution of mtime.
+        try:
+            stat = self.manifest_path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _refresh(self) -> None:
+        version = self._get_manifest_version()
+        if version == self._manifest_version:
+            return
+
+        self._reset()
+        self._manifest_version = version
+        if version is None:
+            return
+
+        manifest = json.loads(self.manifest_path.read_text())
+        if manifest["quantized"] != self.quantize:
+            raise ImproperlyConfigured(
+                f'The local vector index in "{self.directory}" was built with '
+                f"quantize={manifest['quantized']}. Rebuild the index to change it."
+            )
+        self.dimensions = manifest["dimensions"]
+        self.capacity = manifest["capacity"]
+        self.size = manifest["size"]
+        for document_key, row, content, metadata in manifest["documents"]:
+            self.rows[document_key] = row
+            self.row_keys[row] = document_key
+            self.documents[document_key] = (content, metadata)
+        self._map_files()
+        self.valid = np.zeros(self.capacity, dtype=bool)
+        self.valid[list(self.rows.values())] = True
+        used_rows = set(self.rows.values())
+        self.free_rows = [row for row in range(self.size) if row not in used_rows]
+
+    def _map_files(self) -> None:
+        if not self.capacity or self.dimensions is None:
+            self.vectors = self.scales = None
+            return
+        self.vectors = np.memmap(
+            self.directory / VECTORS_FILENAME,
+            dtype=self.dtype,
+            mode="r+",
+            shape=(self.capacity, self.dimensions),
+        )
+        if self.quantize:
+            self.scales = np.memmap(
+                self.directory / SCALES_FILENAME,
+                dtype=np.float32,
+                mode="r+",
+                shape=(self.capacity,),
+            )
+
+    def _grow(self, capacity: int) -> None:
+        """
+        Extend the files to hold ``capacity`` rows. The new rows are zeroes.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = [(VECTORS_FILENAME, np.dtype(self.dtype).itemsize * self.dimensions)]
+        if self.quantize:
+            files.append((SCALES_FILENAME, np.dtype(np.float32).itemsize))
+        for filename, row_size in files:
+            with open(self.directory / filename, "ab") as f:
+                f.truncate(capacity * row_size)
+        self.capacity = capacity
+        self._map_files()
+        valid = np.zeros(capacity, dtype=bool)
+        valid[: len(self.valid)] = self.valid
+        self.valid = valid
+
+    def _save(self) -> None:
+        if self.vectors is not None:
+            self.vectors.flush()
+        if self.scales is not None:
+            self.scales.flush()
+        manifest = {
+            "quantized": self.quantize,
+            "dimensions": self.dimensions,
+            "capacity": self.capacity,
+            "size": self.size,
+            "documents": [
+                [document_key, row, *self.documents[document_key]]
+                for document_key, row in self.rows.items()
+            ],
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temp_path = self.manifest_path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(manifest))
+        os.replace(temp_path, self.manifest_path)
+        self._manifest_version = self._get_manifest_version()
+
+    def add(self, documents: Iterable[EmbeddedDocument]) -> None:
+        with self.write_lock():
+            for document in documents:
+                vector = np.asarray(document.vector, dtype=np.float32)
+                if self.dimensions is None:
+                    self.dimensions = len(vector)
+                elif len(vector) != self.dimensions:
+                    raise ValueError(
+                        f"Expected a vector with {self.dimensions} dimensions, "
+                        f"got {len(vector)}."
+                    )
+
+                row = self.rows.get(document.document_key)
+                if row is None:
+                    if self.free_rows:
+                        row = self.free_rows.pop()
+                    else:
+                        if self.size == self.capacity:
+                            self._grow(max(MIN_CAPACITY, self.capacity * 2))
+                        row = self.size
+                        self.size += 1
+                self._write_row(row, vector)
+                self.rows[document.document_key] = row
+                self.row_keys[row] = document.document_key
+                self.documents[document.document_key] = (
+                    document.content,
+                    document.metadata,
+                )
+                self.valid[row] = True
+            self._save()
+
+    def _write_row(self, row: int, vector) -> None:
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+        if self.quantize:
+            scale = float(np.abs(vector).max()) / 127 or 1.0
+            self.vectors[row] = np.round(vector / scale).astype(np.int8)
+            self.scales[row] = scale
+        else:
+            self.vectors[row] = vector
+
+    def delete(self, document_keys: Iterable[str]) -> None:
+        with self.write_lock():
+            for document_key in document_keys:
+                row = self.rows.pop(document_key, None)
+                if row is None:
+                    continue
+                del self.documents[document_key]
+                del self.row_keys[row]
+                self.vectors[row] = 0
+                self.valid[row] = False
+                self.free_rows.append(row)
+            self._save()
+
+    def delete_objects(self, source_id: str, pks: Iterable[Any]) -> None:
+        """
+        Delete all the documents of the given objects of a ``ModelSource``.
+        """
+        prefixes = tuple(f"{source_id}:{pk}:" for pk in pks)
+        if not prefixes:
+            return
+        with self.write_lock():
+            self.delete([key for key in self.rows if key.startswith(prefixes)])
+
+    def clear(self) -> None:
+        with self.write_lock():
+            for filename in (MANIFEST_FILENAME, VECTORS_FILENAME, SCALES_FILENAME):
+                (self.directory / filename).unlink(missing_ok=True)
+            self._reset()
+            self._manifest_version = None
+
+    def keys(self) -> list[str]:
+        with self.lock:
+            self._refresh()
+            return list(self.rows)
+
+    def search(
+        self,
+        embedding: list[float],
+        *,
+        limit: int | None,
+        metadata: dict[str, Any] | None = None,
+    ) -> list[tuple[str, str, dict[str, Any], float]]:
+        """
+        Return the keys, content, metadata and cosine similarity scores of the
+        documents that are closest to the embedding, best first.
+
+        The documents are read under the same lock as the search, so that they
+        can't be deleted or refreshed in between.
+        """
+        with self.lock:
+            self._refresh()
+            if not self.rows:
+                return []
+
+            query = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            if norm:
+                query = query / norm
+
+            vectors = self.vectors[: self.size]
+            scores = vectors.astype(np.float32, copy=False) @ query
+            if self.quantize:
+                scores *= self.scales[: self.size]
+            candidates = self.valid[: self.size].copy()
+            if metadata:
+                for row in np.flatnonzero(candidates):
+                    document_metadata = self.documents[self.row_keys[row]][1]
+                    if any(document_metadata.get(k) != v for k, v in metadata.items()):
+                        candidates[row] = False
+
+            rows = np.flatnonzero(candidates)
+            if limit is not None and limit < len(rows):
+                # Only sort the best matches.
+                best = np.argpartition(-scores[rows], limit - 1)[:limit]
+                rows = rows[best]
+            rows = rows[np.argsort(-scores[rows], kind="stable")]
+            return [
+                (
+                    self.row_keys[row],
+                    *self.documents[self.row_keys[row]],
+                    float(scores[row]),
+                )
+                for row in rows
+            ]
+
+
+class LocalVectorProvider(StorageProvider):
+    """
+    Vector storage in memory-mapped files on the local disk.
+
+    Searches are exact, comparing the query with every stored vector, which
+    takes about a millisecond for a few thousand documents. Set ``quantize``
+    to store vectors as int8 values, which takes a quarter of the disk space
+    and memory, for slightly less precise scores and slower searches.
+
+    The files of each index are stored in a directory named after the index,
+    in ``path``. Any number of processes can search and update an index:
+    updates are serialized with a file lock, on platforms that support
+    ``fcntl.flock``. The directory must be on a local file system, as file
+    locks are unreliable on network file systems.
+    """
+
+    base_queryset_cls = LocalVectorQuerySet
+
+    def __init__(
+        self, *, path: str | os.PathLike, quantize: bool = False, **kwargs
+    ) -> None:
+        super().__init__(**kwargs)
+        self.path = Path(path)
+        self.quantize = quantize
+        self._stores: dict[str, LocalVectorStore] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def store(self) -> LocalVectorStore:
+        index_name = self.index_name or "default"
+        with self._lock:
+            if index_name not in self._stores:
+                self._stores[index_name] = LocalVectorStore(
+                    self.path / index_name, quantize=self.quantize
+                )
+            return self._stores[index_name]
+
+    def add(self, documents: Iterable[EmbeddedDocument]) -> None:
+        self.store.add(documents)
+
+    def delete(self, document_keys: Iterable[str]) -> None:
+        self.store.delete(document_keys)
+
+    def delete_objects(self, source_id: str, pks: Iterable[Any]) -> None:
+        self.store.delete_objects(source_id, pks)
+
+    def clear(self) -> None:
+        self.store.clear()
+
+    def prune_to(self, document_keys_to_keep: Iterable[str]) -> None:
+        keep = set(document_keys_to_keep)
+        self.store.delete([key for key in self.store.keys() if key not in keep])
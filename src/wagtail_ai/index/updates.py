@@ -0,0 +1,249 @@
+"""
+Keep vector indexes up to date as pages are published, unpublished and
+deleted, without rebuilding them.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import cache
+from typing import Any, NotRequired, Protocol, Self, TypedDict, runtime_checkable
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, models, transaction
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+from django_ai_core.contrib.index import ModelSource, VectorIndex
+from django_ai_core.contrib.index import registry as index_registry
+from wagtail.models import Page
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DELAY = 5.0
+DEFAULT_MAX_DELAY = 60.0
+DEFAULT_BATCH_SIZE = 20
+# When a storage provider can't delete all the documents of an object, the
+# keys of this many chunks after the current last one are deleted, in case the
+# object used to have more chunks.
+STALE_CHUNKS_TO_DELETE = 100
+
+
+class IndexUpdatesSettingsDict(TypedDict):
+    DELAY: NotRequired[float]
+    MAX_DELAY: NotRequired[float]
+    BATCH_SIZE: NotRequired[int]
+
+
+@runtime_checkable
+class SupportsDeleteObjects(Protocol):
+    def delete_objects(self, source_id: str, pks: Iterable[Any]) -> None:
+        """Delete all the documents of the given objects of a source."""
+        ...
+
+
+def _get_root_model(model: type[models.Model]) -> type[models.Model]:
+    """
+    Return the topmost concrete model of a multi-table inheritance chain, so
+    that e.g. all page types are queued under ``Page``.
+    """
+    parents = model._meta.get_parent_list()
+    return parents[-1] if parents else model._meta.concrete_model
+
+
+@dataclass(kw_only=True)
+class IndexUpdateQueue:
+    """
+    Collects the objects that changed, and updates the indexes in a background
+    thread once no more changes have come in for ``delay`` seconds, or at most
+    ``max_delay`` seconds after the first change.
+
+    An object that changes several times before the update is only embedded
+    once. With a ``delay`` of 0, indexes are updated straight away.
+    """
+
+    delay: float
+    max_delay: float
+    batch_size: int
+    _pending: dict[type[models.Model], set[Any]] = field(
+        default_factory=lambda: defaultdict(set), init=False
+    )
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+    _timer: threading.Timer | None = field(default=None, init=False)
+    _first_enqueued_at: float | None = field(default=None, init=False)
+
+    @classmethod
+    def from_settings(cls, config: IndexUpdatesSettingsDict) -> Self:
+        values = {}
+        for key, default, type_ in [
+            ("DELAY", DEFAULT_DELAY, float),
+            ("MAX_DELAY", DEFAULT_MAX_DELAY, float),
+            ("BATCH_SIZE", DEFAULT_BATCH_SIZE, int),
+        ]:
+            value = config.get(key, default)
+            try:
+                values[key.lower()] = type_(value)
+            except (TypeError, ValueError) as e:
+                raise ImproperlyConfigured(
+                    f'"{key}" is not a "{type_.__name__}", it is a "{type(value)}".'
+                ) from e
+        return cls(**values)
+
+    def enqueue(self, model: type[models.Model], pk: Any) -> None:
+        """
+        Queue an object to be re-indexed, or removed from indexes if it no
+        longer exists, once the current transaction is committed.
+        """
+        transaction.on_commit(lambda: self._add(model, pk))
+
+    def _add(self, model: type[models.Model], pk: Any) -> None:
+        model = _get_root_model(model)
+        if not self.delay:
+            update_indexes({model: {pk}}, batch_size=self.batch_size)
+            return
+
+        with self._lock:
+            self._pending[model].add(pk)
+            now = time.monotonic()
+            if self._first_enqueued_at is None:
+                self._first_enqueued_at = now
+            if self._timer is not None:
+                self._timer.cancel()
+            wait = min(
+                self.delay, max(0, self._first_enqueued_at + self.max_delay - now)
+            )
+            self._timer = threading.Timer(wait, self._flush_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_in_background(self) -> None:
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Failed to update vector indexes")
+        finally:
+            connections.close_all()
+
+    def flush(self) -> None:
+        """
+        Update the indexes for all the queued objects now.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(set)
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._first_enqueued_at = None
+        if pending:
+            update_indexes(pending, batch_size=self.batch_size)
+
+
+def update_indexes(
+    pks_by_model: dict[type[models.Model], set[Any]], *, batch_size: int
+) -> None:
+    """
+    Re-embed the given objects in every registered index with a source for
+    them, and delete the documents of objects that are no longer in the
+    source's queryset.
+    """
+    for index_cls in index_registry.list().values():
+        index = index_cls()
+        for source in index.sources:
+            if not isinstance(source, ModelSource):
+                continue
+            pks = pks_by_model.get(_get_root_model(source.model))
+            if pks:
+                update_source(index, source, pks, batch_size=batch_size)
+
+
+def update_source(
+    index: VectorIndex, source: ModelSource, pks: set[Any], *, batch_size: int
+) -> None:
+    storage_provider = index.storage_provider
+    objects = list(source.queryset.filter(pk__in=pks))
+    removed_pks = pks - {obj.pk for obj in objects}
+    if removed_pks:
+        _delete_documents(storage_provider, source, removed_pks)
+
+    for start in range(0, len(objects), batch_size):
+        batch = objects[start : start + batch_size]
+        documents = list(source.objects_to_documents(batch))
+        # Embed first, so that the objects stay in the index if embedding
+        # fails.
+        embedded_documents = index.embedding_transformer.embed_documents(
+            documents, batch_size=batch_size
+        )
+        if isinstance(storage_provider, SupportsDeleteObjects):
+            storage_provider.delete_objects(source.source_id, [obj.pk for obj in batch])
+        else:
+            _delete_stale_chunks(storage_provider, source, batch, documents)
+        if embedded_documents:
+            storage_provider.add(embedded_documents)
+    logger.info(
+        "Updated %d and removed %d objects of %s in %s",
+        len(objects),
+        len(removed_pks),
+        source.source_id,
+        index.index_id,
+    )
+
+
+def _delete_documents(storage_provider, source: ModelSource, pks: set[Any]) -> None:
+    if isinstance(storage_provider, SupportsDeleteObjects):
+        storage_provider.delete_objects(source.source_id, pks)
+    else:
+        storage_provider.delete(
+            [
+                f"{source.source_id}:{pk}:{chunk}"
+                for pk in pks
+                for chunk in range(STALE_CHUNKS_TO_DELETE)
+            ]
+        )
+
+
+def _delete_stale_chunks(storage_provider, source: ModelSource, objects, documents):
+    chunk_counts = defaultdict(int)
+    for document in documents:
+        chunk_counts[document.metadata["pk"]] += 1
+    storage_provider.delete(
+        [
+            f"{source.source_id}:{obj.pk}:{chunk}"
+            for obj in objects
+            for chunk in range(
+                chunk_counts[obj.pk], chunk_counts[obj.pk] + STALE_CHUNKS_TO_DELETE
+            )
+        ]
+    )
+
+
+@cache
+def get_index_update_queue() -> IndexUpdateQueue | None:
+    """
+    Return the index update queue, or None if it is not enabled with
+    ``WAGTAIL_AI["INDEX_UPDATES"]``.
+    """
+    config = getattr(settings, "WAGTAIL_AI", {}).get("INDEX_UPDATES")
+    if config is None:
+        return None
+    return IndexUpdateQueue.from_settings(config)
+
+
+def enqueue_page_update(sender, instance, **kwargs):
+    if (queue := get_index_update_queue()) is not None:
+        queue.enqueue(Page, instance.pk)
+
+
+def enqueue_page_removal(sender, instance, **kwargs):
+    # Deleting a page sends post_delete for each model in its inheritance
+    # chain, so this is only connected to the base Page.
+    if (queue := get_index_update_queue()) is not None:
+        queue.enqueue(Page, instance.pk)
+
+
+@receiver(setting_changed)
+def clear_caches_on_setting_change(sender, setting, **kwargs):
+    if setting == "WAGTAIL_AI":
+        get_index_update_queue.cache_clear()
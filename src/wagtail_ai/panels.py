@@ -12,6 +12,7 @@ from wagtail.admin.panels import (
 from wagtail.admin.staticfiles import versioned_static
 
 from wagtail_ai.agents.basic_prompt import PageDescriptionPrompt, PageTitlePrompt
+from wagtail_ai.agents.suggested_content import get_model_key, get_object_key
 
 if TYPE_CHECKING:
     from django_ai_core.contrib.index import VectorIndex
@@ -122,9 +123,19 @@ class AIChooserPanelMixin(Panel):
             attrs["data-wai-chooser-panel-relation-name-value"] = (
                 self.panel.relation_name
             )
-            attrs["data-wai-chooser-panel-instance-pk-value"] = (
-                self.instance.pk if self.instance else None
-            )
+            if self.instance and self.instance.pk is not None:
+                attrs["data-wai-chooser-panel-instance-key-value"] = get_object_key(
+                    type(self.instance), self.instance.pk
+                )
+            if chooser_field_name := getattr(self.panel, "chooser_field_name", None):
+                # The model of the chosen objects, to exclude them from the
+                # suggestions.
+                chooser_field = self.panel.db_field.related_model._meta.get_field(
+                    chooser_field_name
+                )
+                attrs["data-wai-chooser-panel-model-value"] = get_model_key(
+                    chooser_field.related_model
+                )
             attrs["data-wai-chooser-panel-limit-value"] = self.panel.suggest_limit
             attrs["data-wai-chooser-panel-vector-index-value"] = self.panel.vector_index
             if self.panel.chunk_size:
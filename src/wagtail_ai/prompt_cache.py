@@ -0,0 +1,134 @@
+import threading
+import time
+import uuid
+from functools import cache
+from typing import NotRequired, Self, TypedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+
+from .models import Prompt
+
+VERSION_CACHE_KEY = "wagtail_ai:prompts:version"
+DEFAULT_TIMEOUT = 60
+
+
+class PromptCacheSettingsDict(TypedDict):
+    CACHE_ALIAS: NotRequired[str]
+    TIMEOUT: NotRequired[float]
+
+
+class PromptRegistry:
+    """
+    An in-process lookup of prompts by UUID.
+
+    All prompts are loaded with a single query the first time one is looked
+    up, and reloaded after a prompt is saved or deleted in this process, or
+    once they are ``timeout`` seconds old. When a shared cache is configured,
+    saving a prompt also changes a version stored in that cache, so that the
+    other processes reload their prompts straight away.
+
+    Prompts that aren't loaded yet, such as prompts created in another
+    process, are looked up in the database.
+    """
+
+    def __init__(
+        self, *, cache_alias: str | None = None, timeout: float = DEFAULT_TIMEOUT
+    ) -> None:
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self._prompts: dict[uuid.UUID, Prompt] | None = None
+        self._version: str | None = None
+        self._loaded_at = 0.0
+        # Incremented on every invalidation, so that prompts loaded while a
+        # prompt is being saved aren't kept.
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, config: PromptCacheSettingsDict | None) -> Self:
+        if config is None:
+            return cls()
+
+        cache_alias = config.get("CACHE_ALIAS", "default")
+        if cache_alias not in settings.CACHES:
+            raise ImproperlyConfigured(
+                f'"CACHE_ALIAS" ("{cache_alias}") is not a configured cache.'
+            )
+
+        timeout = config.get("TIMEOUT", DEFAULT_TIMEOUT)
+        if not isinstance(timeout, int | float) or timeout < 0:
+            raise ImproperlyConfigured(
+                f'"TIMEOUT" must be a number of seconds, not "{timeout}".'
+            )
+        return cls(cache_alias=cache_alias, timeout=timeout)
+
+    def get(self, prompt_uuid: uuid.UUID) -> Prompt | None:
+        version = self._get_shared_version()
+        prompts = self._prompts
+        if (
+            prompts is None
+            or version != self._version
+            or time.monotonic() - self._loaded_at >= self.timeout
+        ):
+            prompts = self._load(version)
+        prompt = prompts.get(prompt_uuid)
+        if prompt is None:
+            prompt = Prompt.objects.filter(uuid=prompt_uuid).first()
+            if prompt is not None:
+                with self._lock:
+                    if self._prompts is prompts:
+                        prompts[prompt_uuid] = prompt
+        return prompt
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._prompts = None
+        if self.cache_alias is not None:
+            caches[self.cache_alias].set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+    def _get_shared_version(self) -> str | None:
+        if self.cache_alias is None:
+            return None
+        return caches[self.cache_alias].get(VERSION_CACHE_KEY)
+
+    def _load(self, version: str | None) -> dict[uuid.UUID, Prompt]:
+        generation = self._generation
+        loaded_at = time.monotonic()
+        prompts = {prompt.uuid: prompt for prompt in Prompt.objects.all()}
+        with self._lock:
+            if generation == self._generation:
+                self._prompts = prompts
+                self._version = version
+                self._loaded_at = loaded_at
+        return prompts
+
+
+@cache
+def get_prompt_registry() -> PromptRegistry:
+    config = getattr(settings, "WAGTAIL_AI", {}).get("PROMPT_CACHE")
+    return PromptRegistry.from_settings(config)
+
+
+def get_prompt(prompt_uuid: uuid.UUID) -> Prompt | None:
+    """
+    Look up a prompt by its UUID, without querying the database for prompts
+    that were already loaded.
+
+    The returned prompt is shared between requests and must not be saved.
+    """
+    return get_prompt_registry().get(prompt_uuid)
+
+
+def invalidate_prompt_registry(sender, **kwargs):
+    get_prompt_registry().invalidate()
+
+
+@receiver(setting_changed)
+def clear_caches_on_setting_change(sender, setting, **kwargs):
+    if setting in ("WAGTAIL_AI", "CACHES"):
+        get_prompt_registry.cache_clear()
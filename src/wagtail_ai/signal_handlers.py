@@ -0,0 +1,36 @@
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+from wagtail.models import Page, Site
+from wagtail.signals import page_published, page_unpublished
+
+from .agents.base import clear_agent_settings_cache_on_save
+from .index.updates import enqueue_page_removal, enqueue_page_update
+from .models import AgentSettingsMixin, Prompt
+from .prompt_cache import invalidate_prompt_registry
+from .wagtail_hooks import invalidate_admin_config
+
+
+def get_agent_settings_models() -> list[type[AgentSettingsMixin]]:
+    """
+    Return every model that can be used as ``AGENT_SETTINGS_MODEL``, so that
+    changing the setting doesn't require connecting the handlers again.
+    """
+    return [
+        model for model in apps.get_models() if issubclass(model, AgentSettingsMixin)
+    ]
+
+
+def register_signal_handlers() -> None:
+    settings_senders = [Site, *get_agent_settings_models()]
+    for signal in (post_save, post_delete):
+        for sender in [Prompt, *settings_senders]:
+            signal.connect(invalidate_admin_config, sender=sender)
+        signal.connect(invalidate_prompt_registry, sender=Prompt)
+        for sender in settings_senders:
+            signal.connect(clear_agent_settings_cache_on_save, sender=sender)
+
+    # Page signals are sent with the specific page class as the sender, and
+    # only for pages.
+    page_published.connect(enqueue_page_update)
+    page_unpublished.connect(enqueue_page_update)
+    post_delete.connect(enqueue_page_removal, sender=Page)
@@ -2,12 +2,95 @@ import type { ApiUrlName } from './custom';
 
 export class APIRequestError extends Error {}
 
+type ServerSentEvent = {
+  event: string;
+  data: any;
+};
+
+const parseServerSentEvent = (block: string): ServerSentEvent => {
+  let event = 'message';
+  const data: string[] = [];
+  block.split('\n').forEach((line) => {
+    if (line.startsWith('event:')) {
+      event = line.slice('event:'.length).trim();
+    } else if (line.startsWith('data:')) {
+      data.push(line.slice('data:'.length).trim());
+    }
+  });
+  return { event, data: data.length ? JSON.parse(data.join('\n')) : {} };
+};
+
+/**
+ * Read a `text/event-stream` response, calling `onEvent` with each event as
+ * it arrives, until `onEvent` returns true.
+ */
+const readServerSentEvents = async (
+  res: Response,
+  onEvent: (event: ServerSentEvent) => boolean,
+): Promise<void> => {
+  if (!res.body) {
+    throw new APIRequestError('The response is empty.');
+  }
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = '';
+  let chunk = await reader.read();
+  while (!chunk.done) {
+    buffer += chunk.value;
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      if (onEvent(parseServerSentEvent(buffer.slice(0, boundary)))) {
+        return;
+      }
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+    }
+    // eslint-disable-next-line no-await-in-loop
+    chunk = await reader.read();
+  }
+  throw new APIRequestError('The response ended unexpectedly.');
+};
+
+/**
+ * Read a `text/event-stream` response, calling `onMessage` with the text
+ * received so far every time a new part of the response arrives.
+ * Resolves with the full text once the server sends the "done" event.
+ */
+const readEventStream = async (
+  res: Response,
+  onMessage: (text: string) => void,
+): Promise<string> => {
+  let text = '';
+  await readServerSentEvents(res, ({ event, data }) => {
+    if (event === 'error') {
+      throw new APIRequestError(data.error);
+    }
+    if (event === 'done') {
+      return true;
+    }
+    text += data.message;
+    onMessage(text);
+    return false;
+  });
+  return text;
+};
+
+/**
+ * Send a request to one of the Wagtail AI endpoints and resolve with the
+ * response message.
+ *
+ * If `onMessage` is given, the response is streamed and `onMessage` is called
+ * with the text received so far as it arrives.
+ */
 export const fetchResponse = async (
   action: keyof typeof ApiUrlName,
   body: FormData,
   signal?: AbortSignal,
+  onMessage?: (text: string) => void,
 ): Promise<string> => {
   const urls = window.wagtailAI.config.urls;
+  if (onMessage) {
+    body.set('stream', 'true');
+  }
   const res = await fetch(urls[action], {
     method: 'POST',
     headers: {
@@ -16,6 +99,13 @@ export const fetchResponse = async (
     body,
     signal,
   });
+  if (
+    onMessage &&
+    res.ok &&
+    res.headers.get('Content-Type')?.startsWith('text/event-stream')
+  ) {
+    return readEventStream(res, onMessage);
+  }
   const json = await res.json();
   if (res.ok) {
     return json.message;
@@ -23,3 +113,109 @@ export const fetchResponse = async (
     throw new APIRequestError(json.error);
   }
 };
+
+const MIN_POLL_INTERVAL = 500;
+const MAX_POLL_INTERVAL = 5000;
+
+/**
+ * Wait for a deferred agent job to finish, polling its result URL. The async
+ * view waits on the server for a while before responding, so its results
+ * arrive without delay. The sync view responds straight away, so it is polled
+ * less and less often.
+ */
+const waitForAgentJob = async (
+  resultUrl: string,
+  signal?: AbortSignal,
+): Promise<any> => {
+  let interval = MIN_POLL_INTERVAL;
+  for (;;) {
+    const startedAt = Date.now();
+    // eslint-disable-next-line no-await-in-loop
+    const res = await fetch(`${resultUrl}?wait=true`, { signal });
+    // eslint-disable-next-line no-await-in-loop
+    const json = await res.json();
+    if (!res.ok) {
+      throw new APIRequestError(json.error);
+    }
+    if (json.status === 'completed') {
+      return json.data;
+    }
+    const delay = interval - (Date.now() - startedAt);
+    if (delay > 0) {
+      // eslint-disable-next-line no-await-in-loop
+      await new Promise((resolve) => {
+        setTimeout(resolve, delay);
+      });
+    }
+    interval = Math.min(interval * 2, MAX_POLL_INTERVAL);
+  }
+};
+
+/**
+ * Execute one of the Wagtail AI agents and resolve with its result.
+ *
+ * When deferred agent execution is enabled, the agent runs in the background
+ * on the server and the result is polled for, so slow responses from the AI
+ * provider don't hold a server worker.
+ */
+export const executeAgent = async (
+  url: string,
+  args: Record<string, any>,
+  signal?: AbortSignal,
+): Promise<any> => {
+  const defer = window.wagtailAI.config.deferAgents;
+  const res = await fetch(defer ? `${url}?defer=true` : url, {
+    method: 'POST',
+    headers: {
+      [wagtailConfig.CSRF_HEADER_NAME]: wagtailConfig.CSRF_TOKEN,
+    },
+    body: JSON.stringify({ arguments: args }),
+    signal,
+  });
+  if (!res.ok) {
+    throw new APIRequestError(
+      `Error fetching AI response: ${res.status} ${res.statusText}`,
+    );
+  }
+  const json = await res.json();
+  if (res.status === 202) {
+    return waitForAgentJob(json.result_url, signal);
+  }
+  return json.data;
+};
+
+/**
+ * Execute one of the Wagtail AI agents that can stream its result, calling
+ * `onItem` with the key and value of each part of the result as soon as it
+ * has been generated. Resolves once the whole result has been received.
+ */
+export const streamAgent = async (
+  url: string,
+  args: Record<string, any>,
+  onItem: (key: string, value: any) => void,
+  signal?: AbortSignal,
+): Promise<void> => {
+  const res = await fetch(`${url}?stream=true`, {
+    method: 'POST',
+    headers: {
+      [wagtailConfig.CSRF_HEADER_NAME]: wagtailConfig.CSRF_TOKEN,
+    },
+    body: JSON.stringify({ arguments: args }),
+    signal,
+  });
+  if (!res.ok) {
+    throw new APIRequestError(
+      `Error fetching AI response: ${res.status} ${res.statusText}`,
+    );
+  }
+  await readServerSentEvents(res, ({ event, data }) => {
+    if (event === 'error') {
+      throw new APIRequestError(data.error);
+    }
+    if (event === 'done') {
+      return true;
+    }
+    onItem(data.key, data.value);
+    return false;
+  });
+};
@@ -1,5 +1,6 @@
 import { Controller } from '@hotwired/stimulus';
 import './main.css';
+import { executeAgent } from '../api';
 import { getPreviewContent } from '../preview';
 
 enum ChooserSuggestionState {
@@ -22,21 +23,24 @@ class ChooserPanelController extends Controller<HTMLElement> {
       default: ChooserSuggestionState.INITIAL,
       type: String,
     },
-    seenPks: {
+    seenKeys: {
       default: [],
       type: Array,
     },
     vectorIndex: String,
-    instancePk: String,
+    instanceKey: String,
+    model: String,
     limit: Number,
     chunkSize: Number,
   };
   declare relationNameValue: string;
   declare urlValue: string;
-  declare instancePkValue: string;
+  declare instanceKeyValue: string;
+  declare hasInstanceKeyValue: boolean;
+  declare modelValue: string;
   declare vectorIndexValue: string;
   declare limitValue: number;
-  declare seenPksValue: [string?];
+  declare seenKeysValue: [string?];
   declare stateValue: ChooserSuggestionState;
   declare chunkSizeValue: number;
   declare hasChunkSizeValue: boolean;
@@ -95,37 +99,24 @@ class ChooserPanelController extends Controller<HTMLElement> {
     const { innerText } = previewContent;
 
     try {
-      const response = await fetch(this.urlValue, {
-        method: 'POST',
-        headers: {
-          [wagtailConfig.CSRF_HEADER_NAME]: wagtailConfig.CSRF_TOKEN,
+      return await executeAgent(
+        this.urlValue,
+        {
+          vector_index: this.vectorIndexValue,
+          // Exclude the current page, any items that have
+          // already been suggested, and any items that are
+          // already in the formset
+          exclude: [
+            ...(this.hasInstanceKeyValue ? [this.instanceKeyValue] : []),
+            ...this.seenKeysValue,
+            ...this.getFormsetChildKeys(),
+          ],
+          content: innerText,
+          limit: limit,
+          chunk_size: this.hasChunkSizeValue ? this.chunkSizeValue : undefined,
         },
-        body: JSON.stringify({
-          arguments: {
-            vector_index: this.vectorIndexValue,
-            // Exclude PKs for the current page, any
-            // items that have already been suggested, and any
-            // items that are already in the formset
-            exclude_pks: [
-              this.instancePkValue,
-              ...this.seenPksValue,
-              ...this.getFormsetChildIds(),
-            ],
-            content: innerText,
-            limit: limit,
-            chunk_size: this.hasChunkSizeValue
-              ? this.chunkSizeValue
-              : undefined,
-          },
-        }),
-        signal: this.abortController?.signal,
-      });
-      if (!response.ok) {
-        throw new Error(
-          `Error fetching AI response: ${response.status} ${response.statusText}`,
-        );
-      }
-      return await response.json().then(({ data }) => data);
+        this.abortController?.signal,
+      );
     } catch (error) {
       console.error('Error fetching AI response:', error);
       throw error;
@@ -142,18 +133,22 @@ class ChooserPanelController extends Controller<HTMLElement> {
     );
   }
 
-  getFormsetChildIds() {
+  getFormsetChildKeys() {
     const forms = Array.from(
       this.panelComponent.formsElt[0].querySelectorAll(
         ':scope > [data-inline-panel-child]:not(.deleted)',
       ),
     );
-    return forms.map(
-      (el: HTMLElement, idx: number) =>
-        el.querySelector<HTMLInputElement>(
-          `#${this.panelComponent.opts.formsetPrefix}-${idx}-related_page`,
-        )?.value,
-    );
+    const { formsetPrefix, chooserFieldName } = this.panelComponent.opts;
+    return forms
+      .map(
+        (el: HTMLElement, idx: number) =>
+          el.querySelector<HTMLInputElement>(
+            `#${formsetPrefix}-${idx}-${chooserFieldName}`,
+          )?.value,
+      )
+      .filter((pk) => pk)
+      .map((pk) => `${this.modelValue}:${pk}`);
   }
 
   updateControlStates() {
@@ -183,7 +178,7 @@ class ChooserPanelController extends Controller<HTMLElement> {
 
       if (suggestions && suggestions.length > 0) {
         suggestions.forEach((item: any) => {
-          this.seenPksValue.push(item.id);
+          this.seenKeysValue.push(item.key);
           this.addItem(item);
         });
         this.stateValue = ChooserSuggestionState.SUGGESTED;
@@ -209,7 +204,7 @@ class ChooserPanelController extends Controller<HTMLElement> {
 
   async clear() {
     this.stateValue = ChooserSuggestionState.INITIAL;
-    this.seenPksValue.length = 0;
+    this.seenKeysValue.length = 0;
     this.clearSuggestions();
     this.updateControlStates();
   }
@@ -1,5 +1,6 @@
 import { Controller } from '@hotwired/stimulus';
 import './main.css';
+import { executeAgent, streamAgent } from '../api';
 import { getPreviewContent } from '../preview';
 
 interface ImprovementItem {
@@ -332,7 +333,34 @@ Return JSON with the provided structure WITHOUT the markdown code block. Start i
     suggestionElement.style.height = suggestionElement.scrollHeight + 'px';
   }
 
-  async prompt(): Promise<FeedbackResult> {
+  /** Render a part of the feedback, as soon as it has been received. */
+  renderItem(key: string, value: any) {
+    switch (key) {
+      case 'quality_score':
+        this.scoreValue = value;
+        break;
+      case 'qualitative_feedback':
+        this.renderFeedback(value);
+        break;
+      case 'specific_improvements':
+        this.renderSuggestion(value, this.suggestionsTarget.childElementCount);
+        break;
+      default:
+        break;
+    }
+  }
+
+  renderResult(data: FeedbackResult) {
+    this.renderItem('quality_score', data.quality_score);
+    data.qualitative_feedback.forEach((feedback) => {
+      this.renderItem('qualitative_feedback', feedback);
+    });
+    data.specific_improvements.forEach((suggestion) => {
+      this.renderItem('specific_improvements', suggestion);
+    });
+  }
+
+  async prompt(): Promise<void> {
     const previewContent = await getPreviewContent();
     if (!previewContent) {
       throw new Error('Unable to get page content for analysis.');
@@ -346,28 +374,32 @@ Return JSON with the provided structure WITHOUT the markdown code block. Start i
 
     // If a server endpoint is configured, use that.
     if (this.urlValue) {
+      const args = {
+        content_text: innerText.trim(),
+        content_html: innerHTML.trim(),
+        content_language: this.contentLanguageLabel,
+        editor_language: this.editorLanguageLabel,
+      };
       try {
-        const response = await fetch(this.urlValue, {
-          method: 'POST',
-          headers: {
-            [wagtailConfig.CSRF_HEADER_NAME]: wagtailConfig.CSRF_TOKEN,
-          },
-          body: JSON.stringify({
-            arguments: {
-              content_text: innerText.trim(),
-              content_html: innerHTML.trim(),
-              content_language: this.contentLanguageLabel,
-              editor_language: this.editorLanguageLabel,
-            },
-          }),
-          signal: this.abortController?.signal,
-        });
-        if (!response.ok) {
-          throw new Error(
-            `Error fetching AI response: ${response.status} ${response.statusText}`,
+        // Deferred agents run in the background, so their result can't be
+        // streamed. Otherwise, render the feedback as it is generated.
+        if (window.wagtailAI.config.deferAgents) {
+          this.renderResult(
+            await executeAgent(
+              this.urlValue,
+              args,
+              this.abortController?.signal,
+            ),
+          );
+        } else {
+          await streamAgent(
+            this.urlValue,
+            args,
+            (key, value) => this.renderItem(key, value),
+            this.abortController?.signal,
           );
         }
-        return await response.json().then(({ data }) => data);
+        return;
       } catch (error) {
         console.error('Error fetching AI response:', error);
         throw error;
@@ -382,11 +414,13 @@ Return JSON with the provided structure WITHOUT the markdown code block. Start i
         content: 'Content to analyze and improve:\n\n' + innerText,
       },
     ]);
-    return JSON.parse(
-      await session.prompt(innerText, {
-        responseConstraint: this.schema,
-        signal: this.abortController?.signal,
-      }),
+    this.renderResult(
+      JSON.parse(
+        await session.prompt(innerText, {
+          responseConstraint: this.schema,
+          signal: this.abortController?.signal,
+        }),
+      ),
     );
   }
 
@@ -396,18 +430,10 @@ Return JSON with the provided structure WITHOUT the markdown code block. Start i
     this.stateValue = FeedbackState.LOADING;
 
     try {
-      const data = await this.prompt();
-      if (!data?.quality_score) {
+      await this.prompt();
+      if (!this.scoreValue) {
         throw new Error('Invalid response from AI model');
       }
-
-      this.scoreValue = data.quality_score;
-      data.qualitative_feedback.forEach((feedback) => {
-        this.renderFeedback(feedback);
-      });
-      data.specific_improvements.forEach((suggestion, index) => {
-        this.renderSuggestion(suggestion, index);
-      });
     } catch (error) {
       if (this.abortController?.signal.aborted) {
         this.stateValue = FeedbackState.IDLE;
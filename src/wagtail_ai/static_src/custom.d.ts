@@ -18,6 +18,7 @@ export enum ApiUrlName {
 export interface WagtailAiConfiguration {
   aiPrompts: Prompt[];
   settingPrompts: SettingPrompt[];
+  deferAgents: boolean;
   urls: {
     [ApiUrlName.TEXT_COMPLETION]: string;
     [ApiUrlName.DESCRIBE_IMAGE]: string;
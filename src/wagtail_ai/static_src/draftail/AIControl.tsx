@@ -67,6 +67,28 @@ function LoadingOverlay({
   );
 }
 
+// Shown instead of the overlay once the response streams into the editor, so
+// the request can still be cancelled while the text is being generated.
+function StreamingControl({
+  cancelHandler,
+}: {
+  cancelHandler: React.MouseEventHandler<HTMLButtonElement>;
+}) {
+  return (
+    <div className="Draftail-AI-StreamingControl">
+      <svg className="icon icon-spinner c-spinner" aria-hidden="true">
+        <use href="#icon-spinner" />
+      </svg>
+      <button
+        onClick={cancelHandler}
+        className="button button-small button-secondary"
+      >
+        Cancel request
+      </button>
+    </div>
+  );
+}
+
 function ToolbarDropdown({
   close,
   onAction,
@@ -95,6 +117,8 @@ function AIControl({ getEditorState, onChange }: ControlComponentProps) {
   const aiPrompts = window.wagtailAI.config.aiPrompts;
   const editorState = getEditorState() as EditorState;
   const [isLoading, setIsLoading] = useState<Boolean>(false);
+  // Whether the response has started to stream into the editor.
+  const [isStreaming, setIsStreaming] = useState<Boolean>(false);
   const [isDropdownOpen, setIsDropdownOpen] = useState<Boolean>(false);
   const [error, setError] = useState<null | string>(null);
   const aIControlRef = useRef<any>();
@@ -103,19 +127,31 @@ function AIControl({ getEditorState, onChange }: ControlComponentProps) {
     ? aIControlRef?.current.closest('[data-draftail-editor-wrapper]')
     : null;
 
-  const abortController = new AbortController();
+  // Kept in a ref, as the component re-renders while the response streams in
+  // and the request must be cancelled with the controller it was sent with.
+  const abortControllerRef = useRef<AbortController>(new AbortController());
 
   const cancelRequest: React.MouseEventHandler<HTMLButtonElement> = (e) => {
     e.preventDefault();
     // Call the abort method to cancel the request
-    abortController.abort();
+    abortControllerRef.current.abort();
     setIsLoading(false); // Set loading to false to hide the overlay
+    setIsStreaming(false);
+  };
+
+  const handleProgress = (newEditorState: EditorState) => {
+    // Replace the overlay with a smaller cancel control, so the response can
+    // be seen as it arrives.
+    setIsStreaming(true);
+    onChange(newEditorState);
   };
 
   const handleAction = async (prompt: Prompt) => {
     setError(null);
     setIsDropdownOpen(false);
     setIsLoading(true);
+    const abortController = new AbortController();
+    abortControllerRef.current = abortController;
     try {
       if (prompt.method === 'append') {
         onChange(
@@ -124,6 +160,7 @@ function AIControl({ getEditorState, onChange }: ControlComponentProps) {
             prompt,
             handleAppend,
             abortController,
+            handleProgress,
           ),
         );
       } else {
@@ -133,6 +170,7 @@ function AIControl({ getEditorState, onChange }: ControlComponentProps) {
             prompt,
             handleReplace,
             abortController,
+            handleProgress,
           ),
         );
       }
@@ -140,6 +178,7 @@ function AIControl({ getEditorState, onChange }: ControlComponentProps) {
       setError(err.message);
     }
     setIsLoading(false);
+    setIsStreaming(false);
   };
 
   return (
@@ -173,12 +212,18 @@ function AIControl({ getEditorState, onChange }: ControlComponentProps) {
             container.parentNode.previousElementSibling,
           )
         : null}
-      {isLoading && container
+      {isLoading && !isStreaming && container
         ? createPortal(
             <LoadingOverlay cancelHandler={cancelRequest} />,
             container,
           )
         : null}
+      {isLoading && isStreaming && container
+        ? createPortal(
+            <StreamingControl cancelHandler={cancelRequest} />,
+            container,
+          )
+        : null}
     </>
   );
 }
@@ -13,11 +13,12 @@ export const fetchAIResponse = async (
   text: string,
   prompt: Prompt,
   signal: AbortSignal,
+  onMessage?: (text: string) => void,
 ): Promise<string> => {
   const formData = new FormData();
   formData.append('text', text);
   formData.append('prompt', prompt.uuid);
-  return fetchResponse('TEXT_COMPLETION', formData, signal);
+  return fetchResponse('TEXT_COMPLETION', formData, signal, onMessage);
 };
 
 const getAllSelection = (content: ContentState): SelectionState => {
@@ -77,6 +78,7 @@ export const processAction = async (
     response: string,
   ) => EditorState,
   abortController: AbortController, // Pass the AbortController instance
+  onProgress?: (editorState: EditorState) => void, // Called as the response streams in
 ): Promise<EditorState> => {
   const content = editorState.getCurrentContent();
   const plainText = content.getPlainText();
@@ -84,6 +86,10 @@ export const processAction = async (
     plainText,
     prompt,
     abortController.signal,
+    onProgress
+      ? (partialResponse) =>
+          onProgress(editorStateHandler(editorState, partialResponse))
+      : undefined,
   );
   return editorStateHandler(editorState, response);
 };
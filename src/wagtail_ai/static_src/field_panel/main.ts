@@ -1,5 +1,6 @@
 import { Controller } from '@hotwired/stimulus';
 import './main.css';
+import { executeAgent } from '../api';
 import { PromptMethod } from '../constants';
 import { Prompt, SettingPrompt } from '../custom';
 import { getPreviewContent } from '../preview';
@@ -435,20 +436,11 @@ class FieldPanelController extends Controller<HTMLElement> {
     let result = '';
     try {
       this.abortController = new AbortController();
-      const response = await fetch(this.urlValue, {
-        method: 'POST',
-        headers: {
-          [wagtailConfig.CSRF_HEADER_NAME]: wagtailConfig.CSRF_TOKEN,
-        },
-        body: JSON.stringify({ arguments: data }),
-        signal: this.abortController?.signal,
-      });
-      if (!response.ok) {
-        throw new Error(
-          `Error fetching AI response: ${response.status} ${response.statusText}`,
-        );
-      }
-      result = await response.json().then(({ data }) => data);
+      result = await executeAgent(
+        this.urlValue,
+        data,
+        this.abortController?.signal,
+      );
     } catch (error) {
       if (this.abortController?.signal.aborted) {
         this.stateValue = FieldPanelState.IDLE;
@@ -0,0 +1,28 @@
+from collections.abc import Iterator
+
+from ..types import TextSplitterProtocol
+
+Span = tuple[int, int]
+
+
+def split_text_spans(splitter: TextSplitterProtocol, text: str) -> list[Span]:
+    """
+    Return the ``(start, end)`` offsets of the chunks of the text.
+
+    Splitters that satisfy ``TextSplitterProtocol`` without subclassing it
+    may only implement ``split_text``, in which case the chunks are located in
+    the text like the protocol's default ``split_text_spans`` does.
+    """
+    if (method := getattr(splitter, "split_text_spans", None)) is not None:
+        return method(text)
+    return TextSplitterProtocol.split_text_spans(splitter, text)
+
+
+def iter_split_text_spans(splitter: TextSplitterProtocol, text: str) -> Iterator[Span]:
+    """
+    The lazy version of ``split_text_spans``, which also works with splitters
+    that don't implement ``iter_split_text_spans``.
+    """
+    if (method := getattr(splitter, "iter_split_text_spans", None)) is not None:
+        return method(text)
+    return iter(split_text_spans(splitter, text))
@@ -0,0 +1,103 @@
+"""
+A small, dependency-free byte pair encoding (BPE) token counter.
+
+It reads merge tables in the format used by tiktoken (one base64-encoded token
+and its rank per line), so the table for a model can be downloaded once and
+shipped with a project, then used without network access.
+"""
+
+import base64
+import os
+import re
+from functools import cache, lru_cache
+from pathlib import Path
+from typing import Self
+
+# An approximation of the cl100k_base pre-tokenizer that works with the `re`
+# module, which doesn't support the \p{L} and \p{N} character classes. Letters
+# are matched with [^\W\d_] and numbers with \d.
+CL100K_PATTERN = (
+    r"(?i:'s|'t|'re|'ve|'m|'ll|'d)"
+    r"|(?:[^\r\n\w]|_)?[^\W\d_]+"
+    r"|\d{1,3}"
+    r"| ?(?:[^\s\w]|_)+[\r\n]*"
+    r"|\s*[\r\n]+"
+    r"|\s+(?!\S)"
+    r"|\s+"
+)
+
+DEFAULT_CACHE_SIZE = 65536
+
+
+class BytePairEncoding:
+    """
+    Counts the tokens in a text using a BPE merge table.
+
+    The text is first split into pieces with a pre-tokenizer pattern, then the
+    bytes of each piece are merged according to the ranks in the table. Piece
+    counts are memoized, as the same words come up over and over again when a
+    text splitter measures its candidate chunks.
+    """
+
+    def __init__(
+        self,
+        ranks: dict[bytes, int],
+        *,
+        pattern: str = CL100K_PATTERN,
+        cache_size: int | None = DEFAULT_CACHE_SIZE,
+    ) -> None:
+        self.ranks = ranks
+        self.pattern = re.compile(pattern)
+        self.count_piece_tokens = lru_cache(maxsize=cache_size)(
+            self._count_piece_tokens
+        )
+
+    @classmethod
+    def from_file(cls, path: str | os.PathLike, **kwargs) -> Self:
+        ranks = {}
+        for line in Path(path).read_bytes().splitlines():
+            if not line:
+                continue
+            token, rank = line.split()
+            ranks[base64.b64decode(token)] = int(rank)
+        return cls(ranks, **kwargs)
+
+    def count_tokens(self, text: str) -> int:
+        return sum(
+            self.count_piece_tokens(piece) for piece in self.pattern.findall(text)
+        )
+
+    def _count_piece_tokens(self, piece: str) -> int:
+        data = piece.encode()
+        if data in self.ranks:
+            return 1
+        return len(self._merge(data))
+
+    def _merge(self, data: bytes) -> list[bytes]:
+        """
+        Merge the bytes with the lowest ranked pair first, until no adjacent
+        pair is in the table.
+        """
+        parts = [data[i : i + 1] for i in range(len(data))]
+        while len(parts) > 1:
+            best_rank = None
+            best_index = 0
+            for index in range(len(parts) - 1):
+                rank = self.ranks.get(parts[index] + parts[index + 1])
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best_rank = rank
+                    best_index = index
+            if best_rank is None:
+                break
+            parts[best_index : best_index + 2] = [
+                parts[best_index] + parts[best_index + 1]
+            ]
+        return parts
+
+
+@cache
+def get_encoding(path: str, *, pattern: str = CL100K_PATTERN) -> BytePairEncoding:
+    """
+    Load a merge table once per process, so its memoized counts are shared.
+    """
+    return BytePairEncoding.from_file(path, pattern=pattern)
@@ -1,5 +1,5 @@
 import logging
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
 
 from ..types import TextSplitterLengthCalculatorProtocol, TextSplitterProtocol
 
@@ -16,6 +16,16 @@ class DummyTextSplitter(TextSplitterProtocol):
         # Don't do any splitting.
         return [text]
 
+    def split_text_spans(self, text: str) -> list[tuple[int, int]]:
+        return [(0, len(text))] if text else []
+
+    def iter_split_text(self, text: str) -> Iterator[str]:
+        yield text
+
+    def iter_split_text_spans(self, text: str) -> Iterator[tuple[int, int]]:
+        if text:
+            yield (0, len(text))
+
 
 class DummyLengthCalculator(TextSplitterLengthCalculatorProtocol):
     def get_splitter_length(self, text: str) -> int:
@@ -30,30 +30,33 @@ SOFTWARE.
 
 import logging
 import re
-from collections.abc import Callable, Iterable, MutableSequence, Sequence
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from itertools import groupby
 
 from ..types import TextSplitterProtocol
 
 logger = logging.getLogger(__name__)
 
+Span = tuple[int, int]
+
 
 def _split_text_with_regex(
     text: str, separator: str, keep_separator: bool
-) -> list[str]:
-    # Now that we have the separator, split the text
+) -> Iterator[Span]:
+    # Now that we have the separator, split the text. Splits are returned as
+    # (start, end) offsets in the text rather than as strings.
     if separator:
-        if keep_separator:
-            # The parentheses in the pattern keep the delimiters in the result.
-            _splits = re.split(f"({separator})", text)
-            splits = [_splits[i] + _splits[i + 1] for i in range(1, len(_splits), 2)]
-            if len(_splits) % 2 == 0:
-                splits += _splits[-1:]
-            splits = [_splits[0], *splits]
-        else:
-            splits = re.split(separator, text)
+        start = 0
+        for match in re.finditer(separator, text):
+            if match.start() > start:
+                yield (start, match.start())
+            # Keeping the separator attaches it to the start of the next split.
+            start = match.start() if keep_separator else match.end()
+        if len(text) > start:
+            yield (start, len(text))
     else:
-        splits = list(text)
-    return [s for s in splits if s != ""]
+        yield from ((i, i + 1) for i in range(len(text)))
 
 
 class LangchainRecursiveCharacterTextSplitter(TextSplitterProtocol):
@@ -62,7 +65,8 @@ class LangchainRecursiveCharacterTextSplitter(TextSplitterProtocol):
     Recursively tries to split by different characters to find one
     that works.
 
-    This class comes from the Langchain project and has been slightly modified.
+    This class comes from the Langchain project and has been slightly modified
+    to track the offsets of the chunks in the original text.
     """
 
     separators: Sequence[str]
@@ -83,11 +87,30 @@ class LangchainRecursiveCharacterTextSplitter(TextSplitterProtocol):
         self.chunk_size = chunk_size
 
     def split_text(self, text: str) -> list[str]:
-        return self._split_text(text, self.separators)
-
-    def _split_text(self, text: str, separators: Sequence[str]) -> list[str]:
-        """Split incoming text and return chunks."""
-        final_chunks = []
+        return list(self.iter_split_text(text))
+
+    def split_text_spans(self, text: str) -> list[Span]:
+        """
+        Split the text and return the (start, end) offsets of the chunks.
+
+        Unlike ``split_text``, the chunks don't overlap, so the text between and
+        around them is exactly what is left when they are cut out.
+        """
+        return list(self.iter_split_text_spans(text))
+
+    def iter_split_text(self, text: str) -> Iterator[str]:
+        for start, end in self._split_text(
+            text, self.separators, chunk_overlap=self.chunk_overlap
+        ):
+            yield text[start:end]
+
+    def iter_split_text_spans(self, text: str) -> Iterator[Span]:
+        return self._split_text(text, self.separators, chunk_overlap=0)
+
+    def _split_text(
+        self, text: str, separators: Sequence[str], *, chunk_overlap: int
+    ) -> Iterator[Span]:
+        """Split incoming text and yield chunks as soon as they are final."""
         # Get appropriate separator to use
         separator = separators[-1]
         new_separators = []
@@ -103,36 +126,49 @@ class LangchainRecursiveCharacterTextSplitter(TextSplitterProtocol):
 
         splits = _split_text_with_regex(text, separator, self.keep_separator)
 
-        # Now go merging things, recursively splitting longer texts.
-        _good_splits = []
-        for s in splits:
-            if self.length_function(s) < self.chunk_size:
-                _good_splits.append(s)
-            else:
-                if _good_splits:
-                    merged_text = self._merge_splits(_good_splits, separator)
-                    final_chunks.extend(merged_text)
-                    _good_splits = []
+        # Now go merging things, recursively splitting longer texts. The length
+        # of each split is measured once here and reused when merging. Runs of
+        # short enough splits are merged lazily, so chunks are yielded as soon
+        # as they are complete.
+        measured_splits = (
+            ((start, end), self.length_function(text[start:end]))
+            for start, end in splits
+        )
+        for is_good, group in groupby(
+            measured_splits, key=lambda split: split[1] < self.chunk_size
+        ):
+            if is_good:
+                yield from self._merge_splits(
+                    text, group, separator, chunk_overlap=chunk_overlap
+                )
+                continue
+            for (start, end), _len in group:
                 if not new_separators:
-                    final_chunks.append(s)
+                    yield (start, end)
                 else:
-                    other_info = self._split_text(s, new_separators)
-                    final_chunks.extend(other_info)
-        if _good_splits:
-            merged_text = self._merge_splits(_good_splits, separator)
-            final_chunks.extend(merged_text)
-        return final_chunks
-
-    def _merge_splits(self, splits: Iterable[str], separator: str) -> list[str]:
+                    other_info = self._split_text(
+                        text[start:end], new_separators, chunk_overlap=chunk_overlap
+                    )
+                    for sub_start, sub_end in other_info:
+                        yield (start + sub_start, start + sub_end)
+
+    def _merge_splits(
+        self,
+        text: str,
+        splits: Iterable[tuple[Span, int]],
+        separator: str,
+        *,
+        chunk_overlap: int,
+    ) -> Iterator[Span]:
         # We now want to combine these smaller pieces into medium size
-        # chunks to send to the LLM.
+        # chunks to send to the LLM. Each split comes with its length, which
+        # is kept alongside it so that it doesn't need measuring again when
+        # it is dropped from the start of the current chunk.
         separator_len = self.length_function(separator)
 
-        docs = []
-        current_doc: MutableSequence[str] = []
+        current_doc: deque[tuple[Span, int]] = deque()
         total = 0
-        for d in splits:
-            _len = self.length_function(d)
+        for d, _len in splits:
             if (
                 total + _len + (separator_len if len(current_doc) > 0 else 0)
                 > self.chunk_size
@@ -143,33 +179,38 @@ class LangchainRecursiveCharacterTextSplitter(TextSplitterProtocol):
                         f"which is longer than the specified {self.chunk_size}"
                     )
                 if len(current_doc) > 0:
-                    doc = self._join_docs(current_doc, separator)
+                    doc = self._join_docs(text, current_doc)
                     if doc is not None:
-                        docs.append(doc)
+                        yield doc
                     # Keep on popping if:
                     # - we have a larger chunk than in the chunk overlap
                     # - or if we still have any chunks and the length is long
-                    while total > self.chunk_overlap or (
+                    while total > chunk_overlap or (
                         total + _len + (separator_len if len(current_doc) > 0 else 0)
                         > self.chunk_size
                         and total > 0
                     ):
-                        total -= self.length_function(current_doc[0]) + (
-                            separator_len if len(current_doc) > 1 else 0
+                        _, first_len = current_doc.popleft()
+                        total -= first_len + (
+                            separator_len if len(current_doc) > 0 else 0
                         )
-                        current_doc = current_doc[1:]
-            current_doc.append(d)
+            current_doc.append((d, _len))
             total += _len + (separator_len if len(current_doc) > 1 else 0)
-        doc = self._join_docs(current_doc, separator)
+        doc = self._join_docs(text, current_doc)
         if doc is not None:
-            docs.append(doc)
-        return docs
+            yield doc
 
-    def _join_docs(self, docs: Sequence[str], separator: str) -> str | None:
-        text = separator.join(docs)
+    def _join_docs(self, text: str, docs: Sequence[tuple[Span, int]]) -> Span | None:
+        if not docs:
+            return None
+        # The chunk spans from the start of the first split to the end of the
+        # last one, including the separators between them.
+        start, end = docs[0][0][0], docs[-1][0][1]
         if self.strip_whitespace:
-            text = text.strip()
-        if text == "":
+            doc = text[start:end]
+            start += len(doc) - len(doc.lstrip())
+            end -= len(doc) - len(doc.rstrip())
+        if start >= end:
             return None
         else:
-            return text
+            return (start, end)
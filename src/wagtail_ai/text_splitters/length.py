@@ -1,9 +1,13 @@
 import decimal
 import logging
 import math
+import os
 import re
 
+from django.core.exceptions import ImproperlyConfigured
+
 from ..types import TextSplitterLengthCalculatorProtocol
+from .bpe import CL100K_PATTERN, get_encoding
 
 logger = logging.getLogger(__name__)
 
@@ -53,3 +57,26 @@ class NaiveTextSplitterCalculator(TextSplitterLengthCalculatorProtocol):
         return math.ceil(
             max(token_char_count, token_word_count) * self.final_multiplier
         )
+
+
+class BPETextSplitterCalculator(TextSplitterLengthCalculatorProtocol):
+    """
+    Text splitter length function that counts the tokens with a byte pair
+    encoding merge table, for a much closer count than the naive estimate.
+
+    Subclass it and set ``encoding_file`` to the path of a tiktoken-format
+    merge table (e.g. ``cl100k_base.tiktoken`` for GPT-3.5 and GPT-4 models).
+    The table is loaded from disk, so no network access is needed.
+    """
+
+    encoding_file: str | os.PathLike | None = None
+    pattern: str = CL100K_PATTERN
+
+    def get_splitter_length(self, text: str) -> int:
+        if self.encoding_file is None:
+            raise ImproperlyConfigured(
+                f"{type(self).__name__}.encoding_file must be set to the path of a"
+                " BPE merge table."
+            )
+        encoding = get_encoding(os.fspath(self.encoding_file), pattern=self.pattern)
+        return encoding.count_tokens(text)
@@ -1,4 +1,4 @@
-from collections.abc import Callable, Iterator
+from collections.abc import AsyncIterator, Callable, Iterator
 from typing import Any, Protocol
 
 
@@ -12,6 +12,16 @@ class AIResponse(Protocol):
     def text(self) -> str: ...
 
 
+class AsyncAIResponse(Protocol):
+    """
+    Compatible with the llm.AsyncResponse.
+    """
+
+    def __aiter__(self) -> AsyncIterator[str]: ...
+
+    async def text(self) -> str: ...
+
+
 class TextSplitterProtocol(Protocol):
     def __init__(
         self, *, chunk_size: int, length_function: Callable[[str], int], **kwargs: Any
@@ -19,6 +29,49 @@ class TextSplitterProtocol(Protocol):
 
     def split_text(self, text: str) -> list[str]: ...
 
+    def split_text_spans(self, text: str) -> list[tuple[int, int]]:
+        """
+        Split the text and return the (start, end) offsets of the chunks, in
+        order and without overlapping.
+
+        Splitters that don't implement this themselves fall back to locating the
+        chunks returned by ``split_text`` in the text. Where a chunk overlaps the
+        previous one, only the part after the previous chunk is used.
+        """
+        spans = []
+        position = 0
+        for chunk in self.split_text(text):
+            if not chunk:
+                continue
+            start = text.find(chunk, position)
+            if start == -1:
+                # The chunk may overlap with the previous one, look for it
+                # from the start of the previous chunk instead.
+                search_from = spans[-1][0] + 1 if spans else 0
+                start = text.find(chunk, search_from)
+                if start == -1 or start + len(chunk) <= position:
+                    raise ValueError(f"Cannot find the chunk in the text: {chunk!r}")
+            end = start + len(chunk)
+            spans.append((max(start, position), end))
+            position = end
+        return spans
+
+    def iter_split_text(self, text: str) -> Iterator[str]:
+        """
+        Split the text, yielding each chunk as soon as it is final, so that
+        the chunks can be processed while the rest of the text is being split.
+
+        Splitters that don't implement this themselves fall back to
+        ``split_text``.
+        """
+        yield from self.split_text(text)
+
+    def iter_split_text_spans(self, text: str) -> Iterator[tuple[int, int]]:
+        """
+        The lazy version of ``split_text_spans``.
+        """
+        yield from self.split_text_spans(text)
+
 
 class TextSplitterLengthCalculatorProtocol(Protocol):
     def get_splitter_length(self, text: str) -> int: ...
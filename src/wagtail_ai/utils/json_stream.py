@@ -0,0 +1,138 @@
+"""
+Parse a JSON object while it is being generated, to use each of its members as
+soon as it is complete rather than when the whole response has arrived.
+"""
+
+import json
+from collections.abc import Iterator
+from typing import Any
+
+
+class IncrementalJSONParser:
+    """
+    Parses a JSON object from text that is fed to it in parts, and yields
+    ``(key, value)`` pairs for its members as soon as they are complete.
+    Members that are arrays are yielded item by item, with the key of the
+    array.
+
+    Anything before the opening brace of the object, such as a Markdown code
+    block fence, is ignored.
+    """
+
+    def __init__(self) -> None:
+        self.buffer = ""
+        # The position in ``buffer`` up to which the text was scanned.
+        self.position = 0
+        self.stack: list[str] = []
+        self.in_string = False
+        self.escaped = False
+        self.done = False
+        self.key: str | None = None
+        # Where the key, the member's value or the current array item starts.
+        self.key_start: int | None = None
+        self.value_start: int | None = None
+        self.item_start: int | None = None
+
+    def feed(self, text: str) -> Iterator[tuple[str, Any]]:
+        self.buffer += text
+        while self.position < len(self.buffer) and not self.done:
+            yield from self._scan(self.buffer[self.position])
+            self.position += 1
+        self._discard_scanned_text()
+
+    def close(self) -> None:
+        """Raise ``ValueError`` if the object is incomplete."""
+        if not self.done:
+            raise ValueError("The JSON object is incomplete.")
+
+    def _scan(self, char: str) -> Iterator[tuple[str, Any]]:
+        if self.in_string:
+            self._scan_string(char)
+            return
+
+        depth = len(self.stack)
+        if char in "{[":
+            self._scan_start(char, depth)
+        elif depth == 0:
+            return
+        elif char == '"':
+            self.in_string = True
+            if depth == 1 and self.value_start is None:
+                self.key_start = self.position
+        elif char in "}]":
+            yield from self._scan_end(depth)
+        elif char == ":" and depth == 1:
+            self.value_start = self.position + 1
+        elif char == ",":
+            yield from self._scan_comma(depth)
+
+    def _scan_string(self, char: str) -> None:
+        if self.escaped:
+            self.escaped = False
+        elif char == "\\":
+            self.escaped = True
+        elif char == '"':
+            self.in_string = False
+            if self.key_start is not None:
+                self.key = json.loads(self.buffer[self.key_start : self.position + 1])
+                self.key_start = None
+
+    def _scan_start(self, char: str, depth: int) -> None:
+        if depth == 0 and char != "{":
+            return
+        self.stack.append(char)
+        if depth == 1 and char == "[" and self.value_start is not None:
+            self.item_start = self.position + 1
+
+    def _scan_comma(self, depth: int) -> Iterator[tuple[str, Any]]:
+        if depth == 1:
+            yield from self._value_end()
+            self.value_start = None
+            self.key = None
+        elif depth == 2 and self.item_start is not None:
+            yield from self._item_end()
+            self.item_start = self.position + 1
+
+    def _scan_end(self, depth: int) -> Iterator[tuple[str, Any]]:
+        if depth == 2 and self.item_start is not None:
+            # The array was yielded item by item.
+            yield from self._item_end()
+            self.item_start = None
+            self.value_start = None
+            self.key = None
+        elif depth == 1:
+            yield from self._value_end()
+            self.done = True
+        self.stack.pop()
+
+    def _item_end(self) -> Iterator[tuple[str, Any]]:
+        item = self.buffer[self.item_start : self.position].strip()
+        if item and self.key is not None:
+            yield self.key, json.loads(item)
+
+    def _value_end(self) -> Iterator[tuple[str, Any]]:
+        if self.value_start is None or self.key is None:
+            return
+        value = self.buffer[self.value_start : self.position].strip()
+        if value:
+            yield self.key, json.loads(value)
+
+    def _discard_scanned_text(self) -> None:
+        # Keep the text from the start of the incomplete key, value or item,
+        # so that the buffer doesn't grow with the whole response.
+        starts = [
+            start
+            for start in (self.key_start, self.value_start, self.item_start)
+            if start is not None
+        ]
+        offset = min(starts, default=self.position)
+        if offset == 0:
+            return
+        self.buffer = self.buffer[offset:]
+        self.position -= offset
+        if self.key_start is not None:
+            self.key_start -= offset
+        if self.value_start is not None:
+            self.value_start -= offset
+        if self.item_start is not None:
+            self.item_start -= offset
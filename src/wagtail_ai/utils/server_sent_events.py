@@ -0,0 +1,21 @@
+import json
+from collections.abc import AsyncIterator, Iterator
+
+from django.http import StreamingHttpResponse
+
+
+def server_sent_event(data: dict, event: str | None = None) -> str:
+    message = f"data: {json.dumps(data)}\n\n"
+    if event is not None:
+        message = f"event: {event}\n{message}"
+    return message
+
+
+def event_stream_response(
+    events: Iterator[str] | AsyncIterator[str],
+) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop proxies such as nginx from buffering the events.
+    response["X-Accel-Buffering"] = "no"
+    return response
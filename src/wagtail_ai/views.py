@@ -1,10 +1,25 @@
+import asyncio
+import collections
 import logging
 import os
-from typing import Type, cast
-
+import queue
+import threading
+from collections.abc import (
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+)
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import wraps
+from typing import Type, TypeVar, cast
+
+from asgiref.sync import sync_to_async
 from django import forms
 from django.conf import settings
-from django.http import JsonResponse
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext as _
 from wagtail.admin.ui.tables import UpdatedAtColumn
@@ -13,12 +28,18 @@ from wagtail.images import get_image_model
 from wagtail.images.models import AbstractImage
 
 from . import ai, types
+from .agents.jobs import JobStatus, get_agent_jobs
+from .ai import response_cache
 from .ai.base import BackendFeature
 from .forms import DescribeImageApiForm, PromptForm
 from .models import Prompt
+from .text_splitters import iter_split_text_spans
+from .utils.server_sent_events import event_stream_response, server_sent_event
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class AIHandlerException(Exception):
     pass
@@ -37,8 +58,8 @@ def _process_backend_request(
     :raises AIHandlerException: Raised for specific error scenarios to be communicated to the front-end.
     """
     try:
-        response = ai_backend.prompt_with_context(
-            pre_prompt=pre_prompt, context=context
+        response = response_cache.prompt_with_context(
+            ai_backend, pre_prompt=pre_prompt, context=context
         )
     except Exception as e:
         # Raise a more generic error to send to the front-end
@@ -48,42 +69,412 @@ def _process_backend_request(
     return response
 
 
-def _replace_handler(*, prompt: Prompt, text: str) -> str:
+async def _aprocess_backend_request(
+    ai_backend: ai.AIBackend, pre_prompt: str, context: str
+) -> types.AsyncAIResponse:
+    """
+    The async counterpart of ``_process_backend_request``.
+    """
+    try:
+        response = await response_cache.aprompt_with_context(
+            ai_backend, pre_prompt=pre_prompt, context=context
+        )
+    except Exception as e:
+        raise AIHandlerException(
+            "Error processing request, Please try again later."
+        ) from e
+    return response
+
+
+# Characters that str.splitlines() treats as line boundaries.
+_LINE_BREAKS = frozenset("\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029")
+
+
+class _BlankLineStripper:
+    """
+    Remove extra blank lines returned by the API, as the tokens are received.
+
+    Feeding it all the tokens is equivalent to
+    ``os.linesep.join(s for s in text.splitlines() if s)`` on the full text,
+    without having to wait for it.
+    """
+
+    def __init__(self) -> None:
+        self.started = False
+        self.pending_line_break = False
+
+    def feed(self, token: str) -> str:
+        output = []
+        for char in token:
+            if char in _LINE_BREAKS:
+                self.pending_line_break = self.started
+                continue
+            if self.pending_line_break:
+                output.append(os.linesep)
+                self.pending_line_break = False
+            output.append(char)
+            self.started = True
+        return "".join(output)
+
+
+def _strip_blank_lines(tokens: Iterable[str]) -> Iterator[str]:
+    stripper = _BlankLineStripper()
+    for token in tokens:
+        if output := stripper.feed(token):
+            yield output
+
+
+async def _astrip_blank_lines(tokens: AsyncIterable[str]) -> AsyncIterator[str]:
+    stripper = _BlankLineStripper()
+    async for token in tokens:
+        if output := stripper.feed(token):
+            yield output
+
+
+def _stream_chunk(
+    ai_backend: ai.AIBackend, pre_prompt: str, context: str
+) -> Iterator[str]:
+    response = _process_backend_request(
+        ai_backend, pre_prompt=pre_prompt, context=context
+    )
+    return _strip_blank_lines(response)
+
+
+async def _astream_chunk(
+    ai_backend: ai.AIBackend, pre_prompt: str, context: str
+) -> AsyncIterator[str]:
+    response = await _aprocess_backend_request(
+        ai_backend, pre_prompt=pre_prompt, context=context
+    )
+    async for part in _astrip_blank_lines(response):
+        yield part
+
+
+Span = tuple[int, int]
+
+
+def _replace_handler(*, prompt: Prompt, text: str) -> Iterator[str]:
     ai_backend = ai.get_backend()
     splitter = ai_backend.get_text_splitter()
-    texts = splitter.split_text(text)
+    spans = iter_split_text_spans(splitter, text)
+    return _stream_replace(
+        ai_backend, pre_prompt=prompt.prompt_value, text=text, spans=spans
+    )
 
-    for split in texts:
-        response = _process_backend_request(
-            ai_backend, pre_prompt=prompt.prompt_value, context=split
-        )
-        # Remove extra blank lines returned by the API
-        message = os.linesep.join([s for s in response.text().splitlines() if s])
-        text = text.replace(split, message)
 
-    return text
+# Threads shared by all requests, to split text and to process its chunks in
+# the background. Each request processes up to the backend's
+# ``MAX_CONCURRENCY`` chunks at once.
+SPLIT_WORKERS = 4
+CHUNK_WORKERS = 16
+_split_pool = ThreadPoolExecutor(
+    max_workers=SPLIT_WORKERS, thread_name_prefix="wagtail_ai_split"
+)
+_chunk_pool = ThreadPoolExecutor(
+    max_workers=CHUNK_WORKERS, thread_name_prefix="wagtail_ai_chunk"
+)
+
+
+def _close_connections_after(func: Callable[..., T]) -> Callable[..., T]:
+    """
+    Close the database connections that the pool thread opened, for example
+    to use a database cache, as Django only closes those of request threads.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs) -> T:
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+
+    return wrapper
+
+
+class _ChunkScheduler:
+    """
+    Submits chunks of a request to the shared pool, with no more than
+    ``max_workers`` of them running at once. The others wait in order, and
+    are submitted as the running ones finish.
+    """
+
+    def __init__(self, process: Callable[[Span], str], *, max_workers: int) -> None:
+        self.process = _close_connections_after(process)
+        self.max_workers = max_workers
+        self.running = 0
+        self.waiting: collections.deque[tuple[Span, Future[str]]] = collections.deque()
+        self.lock = threading.Lock()
+
+    def submit(self, span: Span) -> Future[str]:
+        future: Future[str] = Future()
+        with self.lock:
+            if self.running >= self.max_workers:
+                self.waiting.append((span, future))
+                return future
+            self.running += 1
+        self._start(span, future)
+        return future
+
+    def cancel(self) -> None:
+        with self.lock:
+            for _, future in self.waiting:
+                future.cancel()
+            self.waiting.clear()
+
+    def _start(self, span: Span, future: Future[str]) -> None:
+        if not future.set_running_or_notify_cancel():
+            self._finish()
+            return
+        try:
+            _chunk_pool.submit(self.process, span).add_done_callback(
+                lambda result: self._done(result, future)
+            )
+        except RuntimeError as e:
+            # The pool is shut down when the interpreter exits.
+            future.set_exception(e)
+            self._finish()
+
+    def _done(self, result: Future[str], future: Future[str]) -> None:
+        if (exception := result.exception()) is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result.result())
+        self._finish()
+
+    def _finish(self) -> None:
+        with self.lock:
+            if not self.waiting:
+                self.running -= 1
+                return
+            span, future = self.waiting.popleft()
+        self._start(span, future)
+
+
+def _split_in_background(
+    spans: Iterable[Span],
+    submit: Callable[[int, Span], Future[str] | None],
+    stop: threading.Event,
+) -> "queue.SimpleQueue[tuple[Span, Future[str] | None] | Exception | None]":
+    """
+    Consume the spans in the shared pool, so that the text is split while the
+    responses for the first chunks are being received.
+
+    Each span is put on the returned queue together with its future, if it was
+    submitted, followed by ``None`` once all the spans have been consumed.
+    """
+    chunks: queue.SimpleQueue[tuple[Span, Future[str] | None] | Exception | None]
+    chunks = queue.SimpleQueue()
+
+    def split() -> None:
+        try:
+            for index, span in enumerate(spans):
+                if stop.is_set():
+                    break
+                chunks.put((span, submit(index, span)))
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(None)
+
+    _split_pool.submit(_close_connections_after(split))
+    return chunks
+
+
+def _stream_replace(
+    ai_backend: ai.AIBackend,
+    *,
+    pre_prompt: str,
+    text: str,
+    spans: Iterable[Span],
+) -> Iterator[str]:
+    """
+    Yield the text with each chunk replaced by the response for it, keeping
+    what is between the chunks as-is.
+
+    The spans are consumed lazily in the background, so the first request is
+    sent as soon as the first chunk has been split. The response for the
+    first chunk is streamed as it is received, while the following chunks are
+    sent concurrently in the background (up to the backend's
+    ``MAX_CONCURRENCY``) and yielded in order once they are reached.
+    """
 
+    def process(span: Span) -> str:
+        start, end = span
+        return "".join(_stream_chunk(ai_backend, pre_prompt, text[start:end]))
 
-def _append_handler(*, prompt: Prompt, text: str) -> str:
+    max_workers = ai_backend.config.max_concurrency - 1
+    scheduler = (
+        _ChunkScheduler(process, max_workers=max_workers) if max_workers > 0 else None
+    )
+
+    def submit(index: int, span: Span) -> Future[str] | None:
+        if scheduler is None or index == 0:
+            return None
+        return scheduler.submit(span)
+
+    stop = threading.Event()
+    chunks = _split_in_background(spans, submit, stop)
+    try:
+        position = 0
+        while (chunk := chunks.get()) is not None:
+            if isinstance(chunk, Exception):
+                raise chunk
+            (start, end), future = chunk
+            if start > position:
+                yield text[position:start]
+            if future is not None:
+                yield future.result()
+            else:
+                yield from _stream_chunk(ai_backend, pre_prompt, text[start:end])
+            position = end
+        if position < len(text):
+            yield text[position:]
+    finally:
+        stop.set()
+        if scheduler is not None:
+            scheduler.cancel()
+
+
+def _areplace_handler(*, prompt: Prompt, text: str) -> AsyncIterator[str]:
+    ai_backend = ai.get_backend()
+    splitter = ai_backend.get_text_splitter()
+    spans = iter_split_text_spans(splitter, text)
+    return _astream_replace(
+        ai_backend, pre_prompt=prompt.prompt_value, text=text, spans=spans
+    )
+
+
+def _cancel_tasks(tasks: Iterable[asyncio.Future]) -> None:
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            # Mark any errors as retrieved, the first one has been raised.
+            task.exception()
+
+
+async def _astream_replace(
+    ai_backend: ai.AIBackend,
+    *,
+    pre_prompt: str,
+    text: str,
+    spans: Iterable[Span],
+) -> AsyncIterator[str]:
+    """
+    The async counterpart of ``_stream_replace``. The text is split in a
+    worker thread, and the following chunks are sent as tasks on the event
+    loop rather than in threads.
+    """
+    semaphore = asyncio.Semaphore(max(ai_backend.config.max_concurrency - 1, 1))
+
+    async def process(span: Span) -> str:
+        start, end = span
+        async with semaphore:
+            chunk = _astream_chunk(ai_backend, pre_prompt, text[start:end])
+            return "".join([part async for part in chunk])
+
+    spans = iter(spans)
+    next_span = sync_to_async(next, thread_sensitive=False)
+    chunks: asyncio.Queue[tuple[Span, asyncio.Task[str] | None] | None]
+    chunks = asyncio.Queue()
+    tasks: list[asyncio.Future] = []
+
+    async def split() -> None:
+        try:
+            index = 0
+            while (span := await next_span(spans, None)) is not None:
+                task = None
+                if index > 0 and ai_backend.config.max_concurrency > 1:
+                    task = asyncio.ensure_future(process(span))
+                    tasks.append(task)
+                chunks.put_nowait((span, task))
+                index += 1
+        finally:
+            chunks.put_nowait(None)
+
+    splitter = asyncio.ensure_future(split())
+    tasks.append(splitter)
+    try:
+        position = 0
+        while (chunk := await chunks.get()) is not None:
+            (start, end), task = chunk
+            if start > position:
+                yield text[position:start]
+            if task is not None:
+                yield await task
+            else:
+                async for part in _astream_chunk(
+                    ai_backend, pre_prompt, text[start:end]
+                ):
+                    yield part
+            position = end
+        # Raise any error from splitting the text.
+        await splitter
+        if position < len(text):
+            yield text[position:]
+    finally:
+        _cancel_tasks(tasks)
+
+
+def _append_handler(*, prompt: Prompt, text: str) -> Iterator[str]:
     ai_backend = ai.get_backend()
     length_calculator = ai_backend.get_splitter_length_calculator()
     if length_calculator.get_splitter_length(text) > ai_backend.config.token_limit:
         raise AIHandlerException("Cannot run completion on text this long")
 
-    response = _process_backend_request(
-        ai_backend, pre_prompt=prompt.prompt_value, context=text
-    )
-    # Remove extra blank lines returned by the API
-    message = os.linesep.join([s for s in response.text().splitlines() if s])
+    return _stream_chunk(ai_backend, pre_prompt=prompt.prompt_value, context=text)
 
-    return message
+
+def _aappend_handler(*, prompt: Prompt, text: str) -> AsyncIterator[str]:
+    ai_backend = ai.get_backend()
+    length_calculator = ai_backend.get_splitter_length_calculator()
+    if length_calculator.get_splitter_length(text) > ai_backend.config.token_limit:
+        raise AIHandlerException("Cannot run completion on text this long")
+
+    return _astream_chunk(ai_backend, pre_prompt=prompt.prompt_value, context=text)
 
 
 def ErrorJsonResponse(error_message, status=500):
     return JsonResponse({"error": error_message}, status=status)
 
 
-def text_completion(request) -> JsonResponse:
+def _event_stream(messages: Iterator[str]) -> Iterator[str]:
+    """
+    Send the response as server-sent events: a "message" event for each part of
+    the response, followed by either a "done" or an "error" event.
+    """
+    # Translate eagerly, the generator runs after the view has returned.
+    unexpected_error = _("An unexpected error occurred.")
+    try:
+        for message in messages:
+            yield server_sent_event({"message": message})
+    except AIHandlerException as e:
+        yield server_sent_event({"error": str(e)}, event="error")
+    except Exception:
+        logger.exception("An unexpected error occurred.")
+        yield server_sent_event({"error": unexpected_error}, event="error")
+    else:
+        yield server_sent_event({}, event="done")
+
+
+async def _aevent_stream(messages: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    The async counterpart of ``_event_stream``.
+    """
+    unexpected_error = _("An unexpected error occurred.")
+    try:
+        async for message in messages:
+            yield server_sent_event({"message": message})
+    except AIHandlerException as e:
+        yield server_sent_event({"error": str(e)}, event="error")
+    except Exception:
+        logger.exception("An unexpected error occurred.")
+        yield server_sent_event({"error": unexpected_error}, event="error")
+    else:
+        yield server_sent_event({}, event="done")
+
+
+def text_completion(request) -> HttpResponse:
     prompt_form = PromptForm(request.POST)
 
     if not prompt_form.is_valid():
@@ -99,14 +490,91 @@ def text_completion(request) -> JsonResponse:
     handler = handlers[Prompt.Method(prompt.method)]
 
     try:
-        response = handler(prompt=prompt, text=prompt_form.cleaned_data["text"])
+        messages = handler(prompt=prompt, text=prompt_form.cleaned_data["text"])
+        if prompt_form.cleaned_data["stream"]:
+            return event_stream_response(_event_stream(messages))
+        message = "".join(messages)
+    except AIHandlerException as e:
+        return ErrorJsonResponse(str(e), status=400)
+    except Exception:
+        logger.exception("An unexpected error occurred.")
+        return ErrorJsonResponse(_("An unexpected error occurred."))
+
+    return JsonResponse({"message": message})
+
+
+def _agent_job_response(job: dict) -> JsonResponse:
+    if job["status"] == JobStatus.COMPLETED:
+        return JsonResponse({"status": job["status"], "data": job["data"]})
+    if job["status"] == JobStatus.FAILED:
+        return JsonResponse(
+            {"status": job["status"], "error": _(job["error"])}, status=500
+        )
+    return JsonResponse({"status": job["status"]})
+
+
+def agent_job(request, job_id: str) -> JsonResponse:
+    """
+    Return the status of an agent job run with ``?defer``, and its result once
+    it has completed. This view responds straight away; ``aagent_job`` waits
+    for the job to finish.
+    """
+    agent_jobs = get_agent_jobs()
+    job = agent_jobs.get(job_id) if agent_jobs is not None else None
+    if job is None or job["user_id"] != request.user.pk:
+        return ErrorJsonResponse(_("Job not found."), status=404)
+    return _agent_job_response(job)
+
+
+def _async_require_admin_access(view_func):
+    """
+    Wagtail's admin URLs only support sync views, so the async views are served
+    from ``wagtail_ai.async_urls`` and check for admin access themselves.
+    """
+
+    def has_admin_access(user) -> bool:
+        return not user.is_anonymous and user.has_perms(["wagtailadmin.access_admin"])
+
+    @wraps(view_func)
+    async def decorated_view(request, *args, **kwargs):
+        if not await sync_to_async(has_admin_access)(request.user):
+            return ErrorJsonResponse("Access denied.", status=403)
+        return await view_func(request, *args, **kwargs)
+
+    return decorated_view
+
+
+@_async_require_admin_access
+async def atext_completion(request) -> HttpResponse:
+    """
+    The async counterpart of ``text_completion``, for ASGI deployments.
+    """
+    prompt_form = PromptForm(request.POST)
+
+    if not await sync_to_async(prompt_form.is_valid)():
+        return ErrorJsonResponse(prompt_form.errors_for_json_response(), status=400)
+
+    prompt = prompt_form.cleaned_data["prompt"]
+
+    handlers = {
+        Prompt.Method.REPLACE: _areplace_handler,
+        Prompt.Method.APPEND: _aappend_handler,
+    }
+
+    handler = handlers[Prompt.Method(prompt.method)]
+
+    try:
+        messages = handler(prompt=prompt, text=prompt_form.cleaned_data["text"])
+        if prompt_form.cleaned_data["stream"]:
+            return event_stream_response(_aevent_stream(messages))
+        message = "".join([part async for part in messages])
     except AIHandlerException as e:
         return ErrorJsonResponse(str(e), status=400)
     except Exception:
         logger.exception("An unexpected error occurred.")
         return ErrorJsonResponse(_("An unexpected error occurred."))
 
-    return JsonResponse({"message": response})
+    return JsonResponse({"message": message})
 
 
 def user_has_permission_for_image(user, image):
@@ -115,6 +583,33 @@ def user_has_permission_for_image(user, image):
     return permission_policy.user_has_permission_for_instance(user, "choose", image)
 
 
+def _get_image_description_prompt(maxlength: int | None) -> str:
+    wagtail_ai_settings = getattr(settings, "WAGTAIL_AI", {})
+    prompt = wagtail_ai_settings.get("IMAGE_DESCRIPTION_PROMPT")
+
+    if prompt is None:
+        prompt = (
+            "Describe this image. Make the description suitable for use as an alt-text."
+        )
+        if maxlength is not None:
+            prompt += f" Make the description less than {maxlength} characters long."
+
+    return prompt
+
+
+def _get_image_description_rendition_filter() -> str:
+    wagtail_ai_settings = getattr(settings, "WAGTAIL_AI", {})
+    return wagtail_ai_settings.get("IMAGE_DESCRIPTION_RENDITION_FILTER", "max-800x600")
+
+
+def _image_description_backend_not_found() -> JsonResponse:
+    return ErrorJsonResponse(
+        "No backend is configured for image description. Please set"
+        " `IMAGE_DESCRIPTION_BACKEND` in `settings.WAGTAIL_AI`.",
+        status=400,
+    )
+
+
 def describe_image(request) -> JsonResponse:
     form = DescribeImageApiForm(request.POST)
     if not form.is_valid():
@@ -129,27 +624,12 @@ def describe_image(request) -> JsonResponse:
     try:
         backend = ai.get_backend(BackendFeature.IMAGE_DESCRIPTION)
     except ai.BackendNotFound:
-        return ErrorJsonResponse(
-            "No backend is configured for image description. Please set"
-            " `IMAGE_DESCRIPTION_BACKEND` in `settings.WAGTAIL_AI`.",
-            status=400,
-        )
+        return _image_description_backend_not_found()
 
-    wagtail_ai_settings = getattr(settings, "WAGTAIL_AI", {})
-    rendition_filter = wagtail_ai_settings.get(
-        "IMAGE_DESCRIPTION_RENDITION_FILTER", "max-800x600"
-    )
-    rendition = image.get_rendition(rendition_filter)
+    rendition = image.get_rendition(_get_image_description_rendition_filter())
 
     maxlength = form.cleaned_data["maxlength"]
-    prompt = wagtail_ai_settings.get("IMAGE_DESCRIPTION_PROMPT")
-
-    if prompt is None:
-        prompt = (
-            "Describe this image. Make the description suitable for use as an alt-text."
-        )
-        if maxlength is not None:
-            prompt += f" Make the description less than {maxlength} characters long."
+    prompt = _get_image_description_prompt(maxlength)
 
     try:
         ai_response = backend.describe_image(image_file=rendition.file, prompt=prompt)
@@ -167,6 +647,53 @@ def describe_image(request) -> JsonResponse:
     return JsonResponse({"message": description})
 
 
+@_async_require_admin_access
+async def adescribe_image(request) -> JsonResponse:
+    """
+    The async counterpart of ``describe_image``, for ASGI deployments.
+    """
+    form = DescribeImageApiForm(request.POST)
+    if not await sync_to_async(form.is_valid)():
+        return ErrorJsonResponse(form.errors_for_json_response(), status=400)
+
+    model = cast(Type[AbstractImage], get_image_model())
+    image = await sync_to_async(get_object_or_404)(
+        model, pk=form.cleaned_data["image_id"]
+    )
+
+    if not await sync_to_async(user_has_permission_for_image)(request.user, image):
+        return ErrorJsonResponse("Access denied.", status=403)
+
+    try:
+        backend = ai.get_backend(BackendFeature.IMAGE_DESCRIPTION)
+    except ai.BackendNotFound:
+        return _image_description_backend_not_found()
+
+    rendition = await sync_to_async(image.get_rendition)(
+        _get_image_description_rendition_filter()
+    )
+
+    maxlength = form.cleaned_data["maxlength"]
+    prompt = _get_image_description_prompt(maxlength)
+
+    try:
+        ai_response = await backend.adescribe_image(
+            image_file=rendition.file, prompt=prompt
+        )
+        description = await ai_response.text()
+    except Exception:
+        logger.exception("There was an issue describing the image.")
+        return ErrorJsonResponse(_("There was an issue describing the image."))
+
+    if not description:
+        return ErrorJsonResponse(_("There was an issue describing the image."))
+
+    if maxlength is not None:
+        description = description[:maxlength]
+
+    return JsonResponse({"message": description})
+
+
 class PromptEditForm(forms.ModelForm):
     """
     Custom form for the model admin to allow users to view and edit default prompts
@@ -203,3 +730,20 @@ class PromptViewSet(ModelViewSet):
 
 
 prompt_viewset = PromptViewSet("prompt")
+
+
+@_async_require_admin_access
+async def aagent_job(request, job_id: str) -> JsonResponse:
+    """
+    The async counterpart of ``agent_job``, for ASGI deployments. With a
+    ``wait`` query parameter, it waits for the job to finish for up to
+    ``WAIT_TIMEOUT`` seconds before responding.
+    """
+    agent_jobs = get_agent_jobs()
+    job = await agent_jobs.aget(job_id) if agent_jobs is not None else None
+    if job is None or job["user_id"] != request.user.pk:
+        return ErrorJsonResponse(_("Job not found."), status=404)
+
+    if "wait" in request.GET and job["status"] == JobStatus.PENDING:
+        job = await agent_jobs.await_job(job_id) or job
+    return _agent_job_response(job)
@@ -1,10 +1,14 @@
+import json
 import uuid
-from typing import NotRequired, Required, TypedDict, cast
+from typing import Any, NotRequired, Required, TypedDict, cast
 
+from django.core.cache import DEFAULT_CACHE_ALIAS, BaseCache, caches
+from django.core.serializers.json import DjangoJSONEncoder
 from django.forms.utils import flatatt
 from django.template.loader import render_to_string
-from django.urls import include, path, reverse
+from django.urls import NoReverseMatch, include, path, reverse
 from django.utils.html import format_html, json_script
+from django.utils.translation import get_language
 from django.views.i18n import JavaScriptCatalog
 from django_ai_core.contrib.agents import registry
 from wagtail import hooks
@@ -12,11 +16,17 @@ from wagtail.admin.rich_text.editors.draftail.features import ControlFeature
 from wagtail.admin.staticfiles import versioned_static
 from wagtail.contrib.settings.models import register_setting
 
-from wagtail_ai.agents.base import get_agent_settings, get_agent_settings_model
+from wagtail_ai.agents.base import (
+    AgentExecutionView,
+    get_agent_settings,
+    get_agent_settings_model,
+)
 from wagtail_ai.agents.basic_prompt import BasicPromptAgent
+from wagtail_ai.agents.jobs import get_agent_jobs
 
 from .models import Prompt
-from .views import describe_image, prompt_viewset, text_completion
+from .prompt_cache import get_prompt_registry
+from .views import agent_job, describe_image, prompt_viewset, text_completion
 
 
 @hooks.register("register_admin_urls")  # type: ignore
@@ -43,19 +53,24 @@ def register_admin_urls():
         ),
         path(
             "content_feedback/",
-            content_feedback_agent.as_view(),
+            AgentExecutionView.as_view(agent_slug=content_feedback_agent.slug),
             name="content_feedback",
         ),
         path(
             "basic_prompt/",
-            basic_prompt_agent.as_view(),
+            AgentExecutionView.as_view(agent_slug=basic_prompt_agent.slug),
             name="basic_prompt",
         ),
         path(
             "suggested_content/",
-            suggested_content_agent.as_view(),
+            AgentExecutionView.as_view(agent_slug=suggested_content_agent.slug),
             name="suggested_content",
         ),
+        path(
+            "agent_jobs/<str:job_id>/",
+            agent_job,
+            name="agent_job",
+        ),
     ]
 
     return [
@@ -130,6 +145,50 @@ def get_setting_prompts():
     ]
 
 
+ADMIN_CONFIG_CACHE_TIMEOUT = 60 * 5
+ADMIN_CONFIG_VERSION_CACHE_KEY = "wagtail_ai:admin_config:version"
+
+
+def get_admin_config_cache() -> BaseCache:
+    """
+    Return the cache of the admin config: the ``PROMPT_CACHE`` cache if it is
+    configured, so that saving a prompt refreshes the config of every process
+    sharing it, or the default cache.
+    """
+    return caches[get_prompt_registry().cache_alias or DEFAULT_CACHE_ALIAS]
+
+
+def get_admin_prompts_config() -> dict[str, Any]:
+    """
+    Return the prompts for the admin JS config.
+
+    The serialized prompts are cached, so that admin pages don't need to query
+    the prompts and agent settings on every request. The cache key includes a
+    version that changes whenever a prompt, the agent settings or a site are
+    saved. Admin hooks don't get the request, so the setting prompts are those
+    of the default site.
+    """
+    cache = get_admin_config_cache()
+    version = cache.get_or_set(ADMIN_CONFIG_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+    key = f"wagtail_ai:admin_config:{version}:{get_language()}"
+    config = cache.get(key)
+    if config is None:
+        config = json.dumps(
+            {"aiPrompts": get_prompts(), "settingPrompts": get_setting_prompts()},
+            cls=DjangoJSONEncoder,
+        )
+        cache.set(key, config, ADMIN_CONFIG_CACHE_TIMEOUT)
+    return json.loads(config)
+
+
+def invalidate_admin_config(sender, **kwargs):
+    """
+    Connected to saving and deleting prompts, agent settings and sites in
+    ``wagtail_ai.signal_handlers``.
+    """
+    get_admin_config_cache().set(ADMIN_CONFIG_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
 @hooks.register("insert_global_admin_css")  # type: ignore
 def ai_admin_css():
     return format_html(
@@ -137,14 +196,25 @@ def ai_admin_css():
     )
 
 
+def _get_view_url(name: str) -> str:
+    """
+    Use the async version of a view if the project includes
+    ``wagtail_ai.async_urls``.
+    """
+    try:
+        return reverse(f"wagtail_ai_async:{name}")
+    except NoReverseMatch:
+        return reverse(f"wagtail_ai:{name}")
+
+
 @hooks.register("insert_global_admin_js")  # type: ignore
 def ai_admin_js():
     config = {
-        "aiPrompts": get_prompts(),
-        "settingPrompts": get_setting_prompts(),
+        **get_admin_prompts_config(),
+        "deferAgents": get_agent_jobs() is not None,
         "urls": {
-            "TEXT_COMPLETION": reverse("wagtail_ai:text_completion"),
-            "DESCRIBE_IMAGE": reverse("wagtail_ai:describe_image"),
+            "TEXT_COMPLETION": _get_view_url("text_completion"),
+            "DESCRIBE_IMAGE": _get_view_url("describe_image"),
             "CONTENT_FEEDBACK": reverse("wagtail_ai:content_feedback"),
             "BASIC_PROMPT": reverse("wagtail_ai:basic_prompt"),
             "SUGGESTED_CONTENT": reverse("wagtail_ai:suggested_content"),
@@ -2,8 +2,16 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 from django.core.exceptions import ImproperlyConfigured
+from testapp.models import SiteAgentSettings
+from wagtail.models import Page, Site
 
-from wagtail_ai.agents.base import get_llm_service, get_provider
+from wagtail_ai.agents.base import (
+    clear_agent_settings_cache,
+    get_agent_settings,
+    get_llm_service,
+    get_provider,
+)
+from wagtail_ai.models import AgentSettings
 
 
 class TestGetProvider:
@@ -182,3 +190,58 @@ class TestGetLLMService:
                 model="gpt-4o-mini",
                 api_base="https://api.example.com",
             )
+
+
+@pytest.mark.django_db
+class TestGetAgentSettings:
+    def test_generic_settings_are_cached(self, django_assert_num_queries):
+        agent_settings = get_agent_settings()
+        assert isinstance(agent_settings, AgentSettings)
+
+        with django_assert_num_queries(0):
+            assert get_agent_settings() is agent_settings
+
+    def test_cache_is_cleared_when_settings_are_saved(self):
+        agent_settings = get_agent_settings()
+        agent_settings.page_title_prompt = "A new prompt"
+        agent_settings.save()
+
+        cached = get_agent_settings()
+        assert cached is not agent_settings
+        assert cached.page_title_prompt == "A new prompt"
+
+    def test_cache_is_kept_when_other_models_are_saved(self):
+        agent_settings = get_agent_settings()
+        root = Page.objects.get(depth=1)
+        root.add_child(instance=Page(title="Other", slug="other"))
+
+        assert get_agent_settings() is agent_settings
+
+    def test_settings_are_cached_on_the_request(self, rf):
+        request = rf.get("/")
+        agent_settings = get_agent_settings(request)
+        clear_agent_settings_cache()
+
+        assert get_agent_settings(request) is agent_settings
+
+    def test_site_settings_for_the_request_site(self, settings, rf):
+        settings.WAGTAIL_AI = {
+            "AGENT_SETTINGS_MODEL": "testapp.models.SiteAgentSettings"
+        }
+        default_site = Site.objects.get(is_default_site=True)
+        other_site = Site.objects.create(
+            hostname="other.example.com", root_page=default_site.root_page
+        )
+        SiteAgentSettings.objects.create(
+            site=default_site, page_title_prompt="Default site prompt"
+        )
+        SiteAgentSettings.objects.create(
+            site=other_site, page_title_prompt="Other site prompt"
+        )
+
+        request = rf.get("/", HTTP_HOST="other.example.com")
+        assert get_agent_settings(request).page_title_prompt == "Other site prompt"
+        assert get_agent_settings(site=other_site).page_title_prompt == (
+            "Other site prompt"
+        )
+        assert get_agent_settings().page_title_prompt == "Default site prompt"
@@ -373,3 +373,38 @@ def test_provider_alias_for_image_description(
     # Verify that get_llm_service was called with the custom provider
     mock_llm_service.completion.assert_called_once()
     assert mock_llm_service.alias == "custom_provider"
+
+
+@pytest.mark.django_db
+def test_response_cache(admin_client, mock_llm_service, settings):
+    settings.CACHES = {
+        **settings.CACHES,
+        "wagtail_ai": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "wagtail_ai_basic_prompt_test",
+        },
+    }
+    settings.WAGTAIL_AI = {
+        **settings.WAGTAIL_AI,
+        "RESPONSE_CACHE": {"CACHE_ALIAS": "wagtail_ai"},
+    }
+    agent_settings = AgentSettings.load()
+    data = json.dumps(
+        {
+            "arguments": {
+                "prompt": agent_settings.page_title_prompt,
+                "context": {"content_html": "<p>This is some page content.</p>"},
+            }
+        }
+    )
+
+    for _ in range(2):
+        response = admin_client.post(
+            reverse("wagtail_ai:basic_prompt"),
+            data=data,
+            content_type="application/json",
+        )
+        assert response.status_code == 200
+        assert response.json()["data"] == "Generated content from AI"
+
+    mock_llm_service.completion.assert_called_once()
@@ -0,0 +1,103 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from wagtail_ai.agents.compaction import HTMLCompactor, compact_html
+from wagtail_ai.text_splitters.dummy import DummyLengthCalculator
+
+
+@pytest.fixture
+def compactor():
+    return HTMLCompactor(
+        max_tokens={"small": 14}, length_calculator=DummyLengthCalculator()
+    )
+
+
+def test_keeps_structure_without_attributes(compactor):
+    html = (
+        '<h2 id="title" class="heading">A   title</h2>'
+        '<p style="color: red">Some <a href="/foo/" class="link">linked</a> '
+        "<strong>text</strong>.</p>"
+        '<ul class="list"><li>One</li><li>Two</li></ul>'
+        '<img src="/cat.jpg" alt="A cat"><img src="/spacer.gif">'
+    )
+    assert compactor.compact(html) == (
+        "<h2>A title</h2>\n<p>Some <a>linked</a> <strong>text</strong>.</p>\n"
+        '<ul><li>One</li><li>Two</li></ul>\n<img alt="A cat">'
+    )
+
+
+def test_drops_non_content_nodes(compactor):
+    html = """
+        <nav><a href="/">Home</a></nav>
+        <div class="content">
+            <!-- A comment -->
+            <script>track();</script>
+            <style>p { color: red; }</style>
+            <section><p>Content</p></section>
+            <form><input name="q"><button>Search</button></form>
+        </div>
+        <div>More</div><div>content</div>
+    """
+    assert compactor.compact(html) == "<p>Content</p>\nMore content"
+
+
+def test_keeps_whitespace_in_pre(compactor):
+    html = "<pre>  def foo():\n      return 1</pre>"
+    assert compactor.compact(html) == html
+
+
+def test_closes_implicitly_closed_elements(compactor):
+    html = "<ul><li>One<li>Two<ul><li>Nested</ul></ul><p>Open"
+    assert compactor.compact(html) == (
+        "<ul><li>One</li><li>Two<ul><li>Nested</li></ul></li></ul>\n<p>Open</p>"
+    )
+
+
+def test_block_elements_close_open_paragraphs(compactor):
+    html = (
+        "<p>Intro<ul><li>One</li></ul>"
+        "<p>Before<table><tr><td>Cell</td></tr></table>"
+        "<p>Then<div>Wrapped</div>"
+        "<blockquote><p>Quoted<h2>Heading</h2></blockquote>"
+    )
+    assert compactor.compact(html) == (
+        "<p>Intro</p>\n<ul><li>One</li></ul>\n"
+        "<p>Before</p>\n<table><tr><td>Cell</td></tr></table>\n"
+        "<p>Then</p>\nWrapped"
+        "<blockquote><p>Quoted</p><h2>Heading</h2></blockquote>"
+    )
+
+
+def test_truncates_to_the_token_budget(compactor):
+    html = "<h1>Title</h1><p>First paragraph.</p><ul><li>One</li><li>Two</li></ul>"
+    # The dummy length calculator counts characters.
+    assert compactor.compact(html, agent_slug="small") == "<h1>Title</h1>"
+
+    compactor.max_tokens["small"] = 62
+    assert compactor.compact(html, agent_slug="small") == (
+        "<h1>Title</h1>\n<p>First paragraph.</p>\n<ul><li>One</li></ul>"
+    )
+
+
+def test_truncates_long_text_between_words(compactor):
+    compactor.max_tokens["small"] = 300
+    html = "<p>" + "word " * 100 + "</p>"
+    compacted = compactor.compact(html, agent_slug="small")
+    assert compacted == "<p>" + " ".join(["word"] * 50) + "</p>"
+
+
+def test_max_tokens_setting(settings):
+    html = "<p>" + "word " * 5000 + "</p>"
+    assert compact_html(html, agent_slug="wai_basic_prompt") != html.strip()
+
+    settings.WAGTAIL_AI = {
+        "HTML_COMPACTION": {"MAX_TOKENS": {"wai_basic_prompt": None}}
+    }
+    assert compact_html(html, agent_slug="wai_basic_prompt") == (
+        "<p>" + " ".join(["word"] * 5000) + "</p>"
+    )
+
+
+def test_invalid_max_tokens():
+    with pytest.raises(ImproperlyConfigured, match='"MAX_TOKENS"'):
+        HTMLCompactor.from_settings({"MAX_TOKENS": {"wai_basic_prompt": 0}})
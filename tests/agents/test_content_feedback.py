@@ -2,11 +2,20 @@ import json
 from unittest.mock import MagicMock
 
 import pytest
+from django.core.exceptions import ImproperlyConfigured
 from django.http import HttpResponse
 from django.urls import reverse
 from django_ai_core.contrib.agents import registry
+from pydantic import ValidationError
 
-from wagtail_ai.agents.content_feedback import ContentFeedbackAgent
+from wagtail_ai.agents.content_feedback import (
+    CombinedFeedbackSchema,
+    ContentFeedbackAgent,
+)
+from wagtail_ai.agents.feedback_cache import (
+    ContentFeedbackCache,
+    get_content_feedback_cache,
+)
 from wagtail_ai.models import AgentSettings
 
 
@@ -145,3 +154,355 @@ def test_prompt_with_html_and_custom_prompt(
     assert messages[3]["content"] == "Content to review:\n\n<p>Some content</p>"
     assert content["status"] == "completed"
     assert content["data"] == mock_result
+
+
+@pytest.mark.django_db
+def test_html_is_compacted(mock_llm_service):
+    agent = ContentFeedbackAgent()
+    agent.execute(
+        content_text="Some content",
+        content_html=(
+            '<div class="block"><p class="intro" style="color: red">Some   '
+            "content</p><!-- comment --><script>track()</script></div>"
+        ),
+        content_language="English",
+        editor_language="English",
+    )
+
+    messages = mock_llm_service.completion.call_args.kwargs["messages"]
+    assert messages[-1]["content"] == "Content to review:\n\n<p>Some content</p>"
+
+
+@pytest.mark.django_db
+def test_long_content_is_reviewed_in_chunks(monkeypatch):
+    def completion(messages, response_format):
+        if response_format is CombinedFeedbackSchema:
+            content = {
+                "quality_score": 2,
+                "qualitative_feedback": ["Combined 1", "Combined 2", "Combined 3"],
+            }
+        else:
+            part = messages[-1]["content"].split()[-1]
+            content = {
+                "quality_score": 3,
+                "qualitative_feedback": [f"Feedback on {part}"] * 3,
+                "specific_improvements": [
+                    {
+                        "original_text": part,
+                        "suggested_text": part.upper(),
+                        "explanation": "Louder",
+                    },
+                    {
+                        "original_text": "everywhere",
+                        "suggested_text": "EVERYWHERE",
+                        "explanation": "Louder",
+                    },
+                ],
+            }
+        return MagicMock(
+            choices=[MagicMock(message=MagicMock(content=json.dumps(content)))]
+        )
+
+    mock_service = MagicMock()
+    mock_service.completion.side_effect = completion
+    monkeypatch.setattr(
+        "wagtail_ai.agents.content_feedback.get_llm_service", lambda alias: mock_service
+    )
+    settings = AgentSettings.load()
+    settings.content_feedback_content_type = settings.ContentFeedbackContentType.TEXT
+    settings.save()
+
+    agent = ContentFeedbackAgent()
+    agent.chunk_size = 6
+    result = agent.execute(
+        content_text="First paragraph one\n\nSecond paragraph two",
+        content_html="",
+        content_language="English",
+        editor_language="French",
+    )
+
+    assert agent.split_content("First paragraph one\n\nSecond paragraph two") == [
+        "First paragraph one",
+        "Second paragraph two",
+    ]
+    assert result == {
+        "quality_score": 2,
+        "qualitative_feedback": ["Combined 1", "Combined 2", "Combined 3"],
+        "specific_improvements": [
+            {"original_text": "one", "suggested_text": "ONE", "explanation": "Louder"},
+            {
+                "original_text": "everywhere",
+                "suggested_text": "EVERYWHERE",
+                "explanation": "Louder",
+            },
+            {"original_text": "two", "suggested_text": "TWO", "explanation": "Louder"},
+        ],
+    }
+    assert mock_service.completion.call_count == 3
+    reduce_messages = mock_service.completion.call_args.kwargs["messages"]
+    assert (
+        "Part 2: quality score 3\n- Feedback on two" in reduce_messages[-1]["content"]
+    )
+
+
+def test_max_concurrency_defaults_to_the_backend_setting(settings):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "default": {
+                "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+                "CONFIG": {
+                    "MODEL_ID": "echo",
+                    "TOKEN_LIMIT": 100,
+                    "MAX_CONCURRENCY": 2,
+                },
+            },
+        },
+    }
+    assert ContentFeedbackAgent().get_max_concurrency() == 2
+
+    agent = ContentFeedbackAgent()
+    agent.max_concurrency = 8
+    assert agent.get_max_concurrency() == 8
+
+    settings.WAGTAIL_AI = {"PROVIDERS": {"default": {"provider": "foo"}}}
+    assert ContentFeedbackAgent().get_max_concurrency() == 4
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {"MODEL_ID": "echo", "TOKEN_LIMIT": "many"},
+        {"MODEL_ID": "echo", "TOKEN_LIMIT": 100, "MAX_CONCURRENCY": [2]},
+    ],
+)
+def test_max_concurrency_with_misconfigured_backend(settings, config):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "default": {"CLASS": "wagtail_ai.ai.echo.EchoBackend", "CONFIG": config},
+        },
+    }
+    assert ContentFeedbackAgent().get_max_concurrency() == 4
+
+
+@pytest.mark.django_db
+def test_stream_long_content_is_split_once(monkeypatch, mock_paragraph_llm_service):
+    settings = AgentSettings.load()
+    settings.content_feedback_content_type = settings.ContentFeedbackContentType.TEXT
+    settings.save()
+    agent = ContentFeedbackAgent()
+    agent.chunk_size = 6
+    split_content = MagicMock(wraps=agent.split_content)
+    monkeypatch.setattr(agent, "split_content", split_content)
+
+    events = list(
+        agent.stream(
+            content_text="First paragraph one\n\nSecond paragraph two",
+            content_html="",
+            content_language="English",
+            editor_language="French",
+        )
+    )
+
+    assert split_content.call_count == 1
+    assert ("quality_score", 3) in events
+    assert mock_paragraph_llm_service.completion.call_count == 3
+
+
+@pytest.fixture
+def content_feedback_cache(settings):
+    settings.CACHES = {
+        **settings.CACHES,
+        "wagtail_ai": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "wagtail_ai_content_feedback",
+        },
+    }
+    settings.WAGTAIL_AI = {"CONTENT_FEEDBACK_CACHE": {"CACHE_ALIAS": "wagtail_ai"}}
+    feedback_cache = get_content_feedback_cache()
+    yield feedback_cache
+    feedback_cache.cache.clear()
+
+
+@pytest.fixture
+def mock_paragraph_llm_service(monkeypatch):
+    """Suggest an improvement to each paragraph of the reviewed content."""
+
+    def completion(messages, response_format):
+        if response_format is CombinedFeedbackSchema:
+            content = {
+                "quality_score": 3,
+                "qualitative_feedback": ["Combined 1", "Combined 2", "Combined 3"],
+            }
+        else:
+            paragraphs = messages[-1]["content"].split("\n\n", 1)[1].splitlines()
+            content = {
+                "quality_score": 2,
+                "qualitative_feedback": ["Feedback 1", "Feedback 2", "Feedback 3"],
+                "specific_improvements": [
+                    {
+                        "original_text": paragraph,
+                        "suggested_text": paragraph.upper(),
+                        "explanation": "Louder",
+                    }
+                    for paragraph in paragraphs
+                    if paragraph
+                ],
+            }
+        return MagicMock(
+            choices=[MagicMock(message=MagicMock(content=json.dumps(content)))]
+        )
+
+    mock_service = MagicMock()
+    mock_service.completion.side_effect = completion
+    monkeypatch.setattr(
+        "wagtail_ai.agents.content_feedback.get_llm_service", lambda alias: mock_service
+    )
+    return mock_service
+
+
+def review(content_html):
+    return ContentFeedbackAgent().execute(
+        content_text="",
+        content_html=content_html,
+        content_language="English",
+        editor_language="French",
+    )
+
+
+@pytest.mark.django_db
+def test_only_changed_paragraphs_are_reviewed_again(
+    mock_paragraph_llm_service, content_feedback_cache
+):
+    mock_service = mock_paragraph_llm_service
+
+    first = review("<p>Alpha one</p><p>Beta two</p>")
+    assert [i["original_text"] for i in first["specific_improvements"]] == [
+        "<p>Alpha one</p>",
+        "<p>Beta two</p>",
+    ]
+    assert mock_service.completion.call_count == 1
+
+    assert review("<p>Alpha one</p><p>Beta two</p>") == first
+    assert mock_service.completion.call_count == 1
+
+    second = review("<p>Alpha one</p><p>Beta three</p>")
+    assert mock_service.completion.call_count == 3
+    review_messages = mock_service.completion.call_args_list[1].kwargs["messages"]
+    assert review_messages[-1]["content"] == "Content to review:\n\n<p>Beta three</p>"
+    assert "changed paragraphs" in review_messages[-2]["content"]
+    assert second == {
+        "quality_score": 3,
+        "qualitative_feedback": ["Combined 1", "Combined 2", "Combined 3"],
+        "specific_improvements": [
+            first["specific_improvements"][0],
+            {
+                "original_text": "<p>Beta three</p>",
+                "suggested_text": "<P>BETA THREE</P>",
+                "explanation": "Louder",
+            },
+        ],
+    }
+
+    # Changing the languages invalidates the cached reviews.
+    ContentFeedbackAgent().execute(
+        content_text="",
+        content_html="<p>Alpha one</p><p>Beta three</p>",
+        content_language="English",
+        editor_language="German",
+    )
+    assert mock_service.completion.call_count == 4
+
+
+@pytest.mark.django_db
+def test_reviews_of_other_content_are_not_reused(
+    mock_paragraph_llm_service, content_feedback_cache
+):
+    review("<p>Contact us</p><p>Alpha one</p><p>Beta two</p>")
+    assert mock_paragraph_llm_service.completion.call_count == 1
+
+    # Only boilerplate is shared with the first page, so the whole page is
+    # reviewed rather than combining its feedback with the first page's.
+    other = review("<p>Contact us</p><p>Gamma three</p><p>Delta four</p>")
+    assert mock_paragraph_llm_service.completion.call_count == 2
+    messages = mock_paragraph_llm_service.completion.call_args.kwargs["messages"]
+    assert "changed paragraphs" not in messages[-2]["content"]
+    assert other["quality_score"] == 2
+
+    # Nor is the first page's review reused for content it contains.
+    review("<p>Contact us</p>")
+    assert mock_paragraph_llm_service.completion.call_count == 3
+
+
+def test_invalid_content_feedback_cache_timeout(settings):
+    with pytest.raises(ImproperlyConfigured, match='"TIMEOUT"'):
+        ContentFeedbackCache.from_settings({"TIMEOUT": [60]})
+
+
+@pytest.mark.django_db
+def test_stream(admin_client, monkeypatch, mock_result):
+    text = json.dumps(mock_result)
+    mock_service = MagicMock()
+    mock_service.completion.return_value = [
+        MagicMock(choices=[MagicMock(delta=MagicMock(content=text[i : i + 10]))])
+        for i in range(0, len(text), 10)
+    ]
+    monkeypatch.setattr(
+        "wagtail_ai.agents.content_feedback.get_llm_service", lambda alias: mock_service
+    )
+
+    response = admin_client.post(
+        reverse("wagtail_ai:content_feedback") + "?stream",
+        data=json.dumps(
+            {
+                "arguments": {
+                    "content_text": "Some content",
+                    "content_html": "<p>Some content</p>",
+                    "content_language": "English",
+                    "editor_language": "French",
+                }
+            }
+        ),
+        content_type="application/json",
+    )
+    assert response.status_code == 200
+    assert response["Content-Type"] == "text/event-stream"
+    events = b"".join(response.streaming_content).decode().split("\n\n")
+    assert mock_service.completion.call_args.kwargs["stream"] is True
+    assert events[:-1] == [
+        'data: {"key": "quality_score", "value": 2}',
+        'data: {"key": "qualitative_feedback", "value": "Strength 1"}',
+        'data: {"key": "qualitative_feedback", "value": "Strength 2"}',
+        'data: {"key": "qualitative_feedback", "value": "Strength 3"}',
+        'data: {"key": "specific_improvements", "value": '
+        '{"original_text": "foo", "suggested_text": "bar", "explanation": "baz"}}',
+        "event: done\ndata: {}",
+    ]
+
+
+@pytest.mark.django_db
+def test_stream_invalid_item(monkeypatch):
+    mock_service = MagicMock()
+    mock_service.completion.return_value = [
+        MagicMock(
+            choices=[
+                MagicMock(
+                    delta=MagicMock(
+                        content='{"quality_score": 3, "specific_improvements": [{}]}'
+                    )
+                )
+            ]
+        )
+    ]
+    monkeypatch.setattr(
+        "wagtail_ai.agents.content_feedback.get_llm_service", lambda alias: mock_service
+    )
+
+    events = ContentFeedbackAgent().stream(
+        content_text="Some content",
+        content_html="<p>Some content</p>",
+        content_language="English",
+        editor_language="French",
+    )
+    assert next(events) == ("quality_score", 3)
+    with pytest.raises(ValidationError):
+        next(events)
@@ -0,0 +1,182 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+
+from wagtail_ai.agents.jobs import (
+    AgentJobs,
+    ThreadPoolJobExecutor,
+    get_agent_jobs,
+    run_agent_job,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+class SubmittedJobExecutor:
+    """Records the submitted jobs, to run them when the test chooses."""
+
+    def __init__(self):
+        self.job_ids = []
+
+    @classmethod
+    def from_settings(cls, config):
+        return cls()
+
+    def submit(self, job_id):
+        self.job_ids.append(job_id)
+
+    def run_all(self):
+        for job_id in self.job_ids:
+            run_agent_job(job_id)
+
+
+@pytest.fixture
+def agent_jobs(settings):
+    settings.WAGTAIL_AI = {
+        "AGENT_JOBS": {
+            "EXECUTOR": {"CLASS": "agents.test_jobs.SubmittedJobExecutor"},
+        }
+    }
+    return get_agent_jobs()
+
+
+@pytest.fixture
+def mock_llm_service(monkeypatch):
+    mock_service = MagicMock()
+    mock_service.completion.return_value = MagicMock(
+        choices=[MagicMock(message=MagicMock(content="Generated content from AI"))]
+    )
+    monkeypatch.setattr(
+        "wagtail_ai.agents.basic_prompt.get_llm_service", lambda alias: mock_service
+    )
+    return mock_service
+
+
+def post_basic_prompt(client, url=None):
+    return client.post(
+        url or reverse("wagtail_ai:basic_prompt") + "?defer",
+        data=json.dumps(
+            {"arguments": {"prompt": "Write a title", "context": {"content": "AI"}}}
+        ),
+        content_type="application/json",
+    )
+
+
+def test_deferred_agent(admin_client, agent_jobs, mock_llm_service):
+    response = post_basic_prompt(admin_client)
+    assert response.status_code == 202
+    content = response.json()
+    assert content["status"] == "pending"
+    # The async view waits for jobs to finish, so it is preferred.
+    assert content["result_url"] == reverse(
+        "wagtail_ai_async:agent_job", args=[content["job_id"]]
+    )
+    mock_llm_service.completion.assert_not_called()
+
+    response = admin_client.get(content["result_url"])
+    assert response.json() == {"status": "pending"}
+
+    agent_jobs.executor.run_all()
+    response = admin_client.get(content["result_url"] + "?wait")
+    assert response.status_code == 200
+    assert response.json() == {
+        "status": "completed",
+        "data": "Generated content from AI",
+    }
+
+
+def test_sync_view_does_not_wait(admin_client, agent_jobs, mock_llm_service):
+    content = post_basic_prompt(admin_client).json()
+    url = reverse("wagtail_ai:agent_job", args=[content["job_id"]])
+
+    with patch.object(AgentJobs, "await_job") as mock_await_job:
+        response = admin_client.get(url + "?wait")
+    assert response.json() == {"status": "pending"}
+    mock_await_job.assert_not_called()
+
+    agent_jobs.executor.run_all()
+    response = admin_client.get(url)
+    assert response.json() == {
+        "status": "completed",
+        "data": "Generated content from AI",
+    }
+
+
+def test_jobs_run_once(agent_jobs, mock_llm_service):
+    job_id = agent_jobs.create(
+        agent_slug="wai_basic_prompt",
+        arguments={"prompt": "Write a title", "context": {"content": "AI"}},
+    )
+    # A task queue may deliver the same job twice.
+    agent_jobs.executor.job_ids.append(job_id)
+    agent_jobs.executor.run_all()
+    mock_llm_service.completion.assert_called_once()
+    assert agent_jobs.get(job_id)["status"] == "completed"
+
+
+def test_failed_job(admin_client, agent_jobs, mock_llm_service, monkeypatch):
+    mock_llm_service.completion.side_effect = Exception("Provider error")
+    content = post_basic_prompt(admin_client).json()
+
+    agent_jobs.executor.run_all()
+    # The error is translated when it is returned.
+    monkeypatch.setattr("wagtail_ai.views._", str.upper)
+    response = admin_client.get(content["result_url"])
+    assert response.status_code == 500
+    assert response.json() == {
+        "status": "failed",
+        "error": "THE AGENT FAILED TO COMPLETE THE REQUEST.",
+    }
+
+
+def test_jobs_of_other_users_are_not_found(
+    admin_client, client, django_user_model, agent_jobs, mock_llm_service
+):
+    content = post_basic_prompt(admin_client).json()
+    other_user = django_user_model.objects.create_superuser(
+        username="other", email="other@example.com", password="password"
+    )
+    client.force_login(other_user)
+
+    response = client.get(content["result_url"])
+    assert response.status_code == 404
+    response = client.get(reverse("wagtail_ai:agent_job", args=["unknown"]))
+    assert response.status_code == 404
+    response = client.get(reverse("wagtail_ai_async:agent_job", args=["unknown"]))
+    assert response.status_code == 404
+
+
+def test_defer_without_agent_jobs(admin_client, mock_llm_service):
+    response = post_basic_prompt(admin_client)
+    assert response.status_code == 200
+    assert response.json() == {
+        "status": "completed",
+        "data": "Generated content from AI",
+    }
+
+
+def test_wait_times_out(agent_jobs):
+    job_id = agent_jobs.create(agent_slug="wai_basic_prompt", arguments={})
+    job = async_to_sync(agent_jobs.await_job)(job_id, timeout=0)
+    assert job["status"] == "pending"
+
+
+def test_thread_pool_executor():
+    executor = ThreadPoolJobExecutor.from_settings({"MAX_WORKERS": 2})
+    with patch("wagtail_ai.agents.jobs.run_agent_job") as mock_run_agent_job:
+        executor.submit("job")
+        executor.pool.shutdown(wait=True)
+    mock_run_agent_job.assert_called_once_with("job")
+
+
+def test_invalid_settings(settings):
+    with pytest.raises(ImproperlyConfigured, match='"CACHE_ALIAS"'):
+        AgentJobs.from_settings({"CACHE_ALIAS": "missing"})
+    with pytest.raises(ImproperlyConfigured, match="executor"):
+        AgentJobs.from_settings({"EXECUTOR": {"CLASS": "missing.Executor"}})
+    with pytest.raises(ImproperlyConfigured, match='"MAX_WORKERS"'):
+        ThreadPoolJobExecutor.from_settings({"MAX_WORKERS": 0})
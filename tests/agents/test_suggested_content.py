@@ -1,39 +1,82 @@
 import json
-from dataclasses import dataclass
 from unittest.mock import MagicMock, patch
 
 import pytest
 from django.http import HttpResponse
 from django.urls import reverse
+from django_ai_core.contrib.index import CachedEmbeddingTransformer
 from django_ai_core.contrib.index import registry as index_registry
-from wagtail.admin.admin_url_finder import AdminURLFinder
+from django_ai_core.contrib.index.schema import Document
+from testapp.models import ExamplePage
+from wagtail.models import Page
 
-
-@dataclass
-class MockPage:
-    pk: int
-    title: str
+from wagtail_ai.agents.suggested_content import (
+    SuggestedContentAgent,
+    iter_pages,
+    mean_vector,
+    select_chunks,
+)
+from wagtail_ai.index.embedding_cache import LocalEmbeddingCacheBackend
 
 
 @pytest.fixture
 def mock_vector_index():
+    """
+    A mock index, whose ``query`` is called with the query embedding and
+    returns the search results.
+    """
     mock_instance = MagicMock()
+    mock_instance.embedding_transformer.embed_documents.side_effect = (
+        lambda documents, batch_size: [
+            document.add_embedding([1.0, float(i)])
+            for i, document in enumerate(documents)
+        ]
+    )
     MockVectorIndexClass = MagicMock(return_value=mock_instance)
 
     with (
         patch.object(index_registry, "get", return_value=MockVectorIndexClass),
-        patch.object(AdminURLFinder, "get_edit_url", return_value="/admin/"),
+        patch(
+            "wagtail_ai.agents.suggested_content.DocumentResultMixin.build"
+        ) as mock_build,
     ):
+        mock_instance.query = mock_build.return_value.return_value.filter
         yield mock_instance
 
 
-@pytest.mark.django_db
-def test_responds_with_data(admin_client, mock_vector_index):
-    pages = [MockPage(pk=0, title="Foo")]
-    expected_data = [{"id": "0", "title": "Foo", "editUrl": "/admin/"}]
-    mock_vector_index.search_sources.return_value = pages
+@pytest.fixture
+def pages(db):
+    root = Page.objects.get(depth=1)
+    return [
+        root.add_child(
+            instance=ExamplePage(title=title, body="<p>Body</p>", slug=title.lower())
+        )
+        for title in ["Foo", "Bar", "Baz", "Quz", "Buz"]
+    ]
+
+
+def make_documents(pks, model="testapp.ExamplePage"):
+    return [
+        Document(
+            document_key=f"{model}:{pk}:0",
+            content="",
+            metadata={"model": model, "pk": pk},
+        )
+        for pk in pks
+    ]
+
 
-    response: HttpResponse = admin_client.post(
+def suggestion(page):
+    return {
+        "id": str(page.pk),
+        "key": f"wagtailcore.page:{page.pk}",
+        "title": page.title,
+        "editUrl": reverse("wagtailadmin_pages:edit", args=[page.pk]),
+    }
+
+
+def post_arguments(client, **arguments):
+    return client.post(
         reverse("wagtail_ai:suggested_content"),
         data=json.dumps(
             {
@@ -41,124 +84,268 @@ def test_responds_with_data(admin_client, mock_vector_index):
                     "vector_index": "PageIndex",
                     "chunk_size": 1000,
                     "content": "foo",
-                    "exclude_pks": [1],
                     "limit": 3,
+                    **arguments,
                 }
             }
         ),
         content_type="application/json",
     )
+
+
+@pytest.mark.django_db
+def test_responds_with_data(admin_client, mock_vector_index, pages):
+    mock_vector_index.query.return_value = make_documents([pages[0].pk])
+
+    response: HttpResponse = post_arguments(admin_client, exclude_pks=[1])
     assert response.status_code == 200
     content = json.loads(response.content.decode())
-    assert content["data"] == expected_data
+    assert content["data"] == [suggestion(pages[0])]
 
 
 @pytest.mark.django_db
-def test_excludes_current_pk(admin_client, mock_vector_index):
-    pages = [MockPage(pk=0, title="Foo"), MockPage(pk=1, title="Bar")]
-    expected_data = [{"id": "0", "title": "Foo", "editUrl": "/admin/"}]
-    mock_vector_index.search_sources.return_value = pages
+def test_excludes_current_pk(admin_client, mock_vector_index, pages):
+    mock_vector_index.query.return_value = make_documents([pages[0].pk, pages[1].pk])
 
-    response: HttpResponse = admin_client.post(
-        reverse("wagtail_ai:suggested_content"),
-        data=json.dumps(
-            {
-                "arguments": {
-                    "vector_index": "PageIndex",
-                    "chunk_size": 1000,
-                    "content": "foo",
-                    "exclude_pks": ["1"],
-                    "limit": 3,
-                }
-            }
-        ),
-        content_type="application/json",
+    # All page types share the keys of the base Page model.
+    response: HttpResponse = post_arguments(
+        admin_client, exclude=[f"testapp.examplepage:{pages[1].pk}", "invalid"]
     )
     assert response.status_code == 200
     content = json.loads(response.content.decode())
-    assert content["data"] == expected_data
+    assert content["data"] == [suggestion(pages[0])]
+
+    response = post_arguments(admin_client, exclude_pks=[str(pages[1].pk)])
+    assert json.loads(response.content.decode())["data"] == [suggestion(pages[0])]
 
 
 @pytest.mark.django_db
-def test_applies_limit(admin_client, mock_vector_index):
-    pages = [
-        MockPage(pk=0, title="Foo"),
-        MockPage(pk=1, title="Bar"),
-        MockPage(pk=2, title="Baz"),
-        MockPage(pk=3, title="Quz"),
+def test_objects_of_other_models_with_the_same_pk(
+    admin_client, django_user_model, mock_vector_index, pages
+):
+    user = django_user_model.objects.create_user(username="foo", pk=pages[0].pk)
+    mock_vector_index.query.return_value = [
+        *make_documents([pages[0].pk]),
+        *make_documents([user.pk], model="auth.user"),
     ]
-    mock_vector_index.search_sources.return_value = pages
 
-    response: HttpResponse = admin_client.post(
-        reverse("wagtail_ai:suggested_content"),
-        data=json.dumps(
-            {
-                "arguments": {
-                    "vector_index": "PageIndex",
-                    "chunk_size": 1000,
-                    "content": "foo",
-                    "exclude_pks": ["10"],
-                    "limit": 3,
-                }
-            }
-        ),
-        content_type="application/json",
+    response: HttpResponse = post_arguments(
+        admin_client, exclude=[f"wagtailcore.page:{pages[0].pk}"]
     )
+    content = json.loads(response.content.decode())
+    assert [(item["key"], item["title"]) for item in content["data"]] == [
+        (f"auth.user:{user.pk}", "foo")
+    ]
+
+    # Objects with the same pk aren't duplicates either.
+    response = post_arguments(admin_client, exclude=[])
+    content = json.loads(response.content.decode())
+    assert [item["key"] for item in content["data"]] == [
+        f"wagtailcore.page:{pages[0].pk}",
+        f"auth.user:{user.pk}",
+    ]
+
+
+@pytest.mark.django_db
+def test_applies_limit(admin_client, mock_vector_index, pages):
+    mock_vector_index.query.return_value = make_documents(
+        [page.pk for page in pages[:4]]
+    )
+
+    response: HttpResponse = post_arguments(admin_client, exclude_pks=["10000"])
     assert response.status_code == 200
     content = json.loads(response.content.decode())
     assert len(content["data"]) == 3
 
 
 @pytest.mark.django_db
-def test_applies_limit_excluding_current_pk(admin_client, mock_vector_index):
-    pages = [
-        MockPage(pk=0, title="Foo"),
-        MockPage(pk=1, title="Bar"),
-        MockPage(pk=2, title="Baz"),
-        MockPage(pk=3, title="Quz"),
-        MockPage(pk=4, title="Buz"),
+def test_applies_limit_excluding_current_pk(admin_client, mock_vector_index, pages):
+    mock_vector_index.query.return_value = make_documents([page.pk for page in pages])
+
+    response: HttpResponse = post_arguments(
+        admin_client, exclude_pks=[str(pages[1].pk)]
+    )
+    assert response.status_code == 200
+    content = json.loads(response.content.decode())
+    assert content["data"] == [
+        suggestion(pages[0]),
+        suggestion(pages[2]),
+        suggestion(pages[3]),
     ]
-    mock_vector_index.search_sources.return_value = pages
 
-    response: HttpResponse = admin_client.post(
-        reverse("wagtail_ai:suggested_content"),
-        data=json.dumps(
-            {
-                "arguments": {
-                    "vector_index": "PageIndex",
-                    "chunk_size": 1000,
-                    "content": "foo",
-                    "exclude_pks": ["1"],
-                    "limit": 3,
-                }
-            }
-        ),
-        content_type="application/json",
+
+@pytest.mark.django_db
+def test_skips_duplicate_and_deleted_objects(admin_client, mock_vector_index, pages):
+    mock_vector_index.query.return_value = [
+        *make_documents([pages[0].pk, pages[0].pk, 10000, pages[1].pk]),
+        Document(document_key="other:1", content="", metadata={}),
+    ]
+
+    response: HttpResponse = post_arguments(admin_client, exclude_pks=[])
+    assert response.status_code == 200
+    content = json.loads(response.content.decode())
+    assert content["data"] == [suggestion(pages[0]), suggestion(pages[1])]
+
+
+@pytest.mark.django_db
+def test_skips_documents_of_removed_models(admin_client, mock_vector_index, pages):
+    mock_vector_index.query.return_value = [
+        *make_documents([pages[0].pk], model="removed.OldPage"),
+        *make_documents([pages[1].pk]),
+    ]
+
+    response: HttpResponse = post_arguments(admin_client, exclude_pks=[])
+    assert response.status_code == 200
+    content = json.loads(response.content.decode())
+    assert content["data"] == [suggestion(pages[1])]
+
+
+class SlicedResults(list):
+    """Search results that record the slices they are queried with."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.slices = []
+
+    def __getitem__(self, key):
+        self.slices.append((key.start, key.stop))
+        return super().__getitem__(key)
+
+
+@pytest.mark.django_db
+def test_many_excluded_pks(admin_client, mock_vector_index, pages):
+    excluded_pks = range(10000, 10150)
+    documents = SlicedResults(
+        make_documents([*excluded_pks, *(page.pk for page in pages)])
+    )
+    mock_vector_index.query.return_value = documents
+
+    response: HttpResponse = post_arguments(
+        admin_client, exclude=[f"wagtailcore.page:{pk}" for pk in excluded_pks]
     )
     assert response.status_code == 200
     content = json.loads(response.content.decode())
-    assert len(content["data"]) == 3
-    assert content["data"][1]["id"] == "2"
+    assert content["data"] == [suggestion(page) for page in pages[:3]]
+    # The first page is sized for the limit, and the pages grow until all
+    # the excluded pages are skipped.
+    assert documents.slices == [(0, 9), (9, 27), (27, 63), (63, 135), (135, 279)]
+
+
+@pytest.mark.django_db
+def test_pages_through_results(admin_client, mock_vector_index, pages):
+    # Excluded pages that aren't in the results don't count towards the size
+    # of the first page.
+    documents = SlicedResults(make_documents([10000, 10001, 10002, pages[0].pk]))
+    mock_vector_index.query.return_value = documents
+
+    response: HttpResponse = post_arguments(
+        admin_client,
+        exclude=[f"wagtailcore.page:{pk}" for pk in [10000, 10001, 10002, 20000]],
+        limit=1,
+    )
+    assert response.status_code == 200
+    content = json.loads(response.content.decode())
+    assert content["data"] == [suggestion(pages[0])]
+    assert documents.slices == [(0, 3), (3, 9)]
+
+
+def test_iter_pages():
+    pages = SlicedResults(range(10))
+    assert list(iter_pages(pages, page_size=3)) == list(range(10))
+    assert pages.slices == [(0, 3), (3, 9), (9, 21)]
+
+    pages = SlicedResults(range(10))
+    assert list(iter_pages(pages, page_size=3, max_results=5)) == list(range(5))
+    assert pages.slices == [(0, 3), (3, 5)]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("limit", [1, 5])
+def test_query_count_does_not_depend_on_limit(
+    mock_vector_index, pages, limit, django_assert_num_queries
+):
+    mock_vector_index.query.return_value = make_documents([page.pk for page in pages])
+    agent = SuggestedContentAgent()
+
+    # All the suggested pages are loaded in a single query.
+    with django_assert_num_queries(1):
+        suggestions = agent.execute(
+            vector_index="PageIndex", exclude_pks=[], content="foo", limit=limit
+        )
+    assert suggestions == [suggestion(page) for page in pages[:limit]]
 
 
 @pytest.mark.django_db
 def test_content_is_chunked(admin_client, mock_vector_index):
     content = "word " * 1000
 
-    response: HttpResponse = admin_client.post(
-        reverse("wagtail_ai:suggested_content"),
-        data=json.dumps(
-            {
-                "arguments": {
-                    "vector_index": "PageIndex",
-                    "chunk_size": 1000,
-                    "content": content,
-                    "exclude_pks": ["1"],
-                    "limit": 3,
-                }
-            }
-        ),
-        content_type="application/json",
+    response: HttpResponse = post_arguments(
+        admin_client, content=content, exclude_pks=["1"], max_chunks=1
     )
     assert response.status_code == 200
-    mock_vector_index.search_sources.assert_called_with(content[:1000])
+    embed_documents = mock_vector_index.embedding_transformer.embed_documents
+    documents = embed_documents.call_args.args[0]
+    assert [document.content for document in documents] == [content[:1000]]
+
+
+@pytest.mark.django_db
+def test_all_chunks_are_embedded_in_one_batch(admin_client, mock_vector_index, pages):
+    content = "word " * 1000
+    mock_vector_index.query.return_value = make_documents([pages[0].pk])
+
+    response: HttpResponse = post_arguments(
+        admin_client, content=content, exclude_pks=["1"], max_chunks=3
+    )
+
+    assert response.status_code == 200
+    assert json.loads(response.content)["data"] == [suggestion(pages[0])]
+    embed_documents = mock_vector_index.embedding_transformer.embed_documents
+    embed_documents.assert_called_once()
+    documents = embed_documents.call_args.args[0]
+    assert [document.content for document in documents] == [
+        content[:1000],
+        content[1800:2800],
+        content[4500:],
+    ]
+    # The mean of [1, 0], [1, 1] and [1, 2], scaled to unit length.
+    query_embedding = mock_vector_index.query.call_args.kwargs["embedding"]
+    assert query_embedding == pytest.approx([0.7071, 0.7071], abs=1e-4)
+
+
+@pytest.mark.django_db
+def test_query_embeddings_are_read_from_the_embedding_cache(
+    tmp_path, mock_vector_index, pages
+):
+    base_transformer = MagicMock(transformer_id="fake_text-embedding")
+    base_transformer.embed_documents.side_effect = lambda documents, batch_size: [
+        document.add_embedding([1.0, 0.0]) for document in documents
+    ]
+    transformer = CachedEmbeddingTransformer(
+        base_transformer=base_transformer,
+        cache_backend=LocalEmbeddingCacheBackend(path=tmp_path / "embeddings.sqlite3"),
+    )
+    # The page's content was embedded when it was indexed.
+    transformer.embed_documents(
+        [Document(document_key="page:1:0", content="Some content", metadata={})]
+    )
+    mock_vector_index.embedding_transformer = transformer
+    mock_vector_index.query.return_value = make_documents([pages[0].pk])
+
+    suggestions = SuggestedContentAgent().execute(
+        vector_index="PageIndex", content="Some content"
+    )
+    assert suggestions == [suggestion(pages[0])]
+    base_transformer.embed_documents.assert_called_once()
+    assert mock_vector_index.query.call_args.kwargs["embedding"] == [1.0, 0.0]
+
+
+def test_select_chunks():
+    chunks = [str(i) for i in range(10)]
+    assert select_chunks(chunks, 20) == chunks
+    assert select_chunks(chunks, 1) == ["0"]
+    assert select_chunks(chunks, 4) == ["0", "3", "6", "9"]
+
+
+def test_mean_vector():
+    assert mean_vector([[3.0, 0.0], [0.0, 4.0]]) == pytest.approx([0.6, 0.8])
+    assert mean_vector([[1.0, 0.0], [-1.0, 0.0]]) == [0.0, 0.0]
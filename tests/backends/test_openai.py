@@ -1,16 +1,27 @@
+import asyncio
 import base64
+import json
+from collections.abc import Generator
 from io import BytesIO
 from typing import cast
-from unittest.mock import ANY, Mock
+from unittest.mock import ANY, AsyncMock, Mock
 
+import httpx
 import pytest
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ImproperlyConfigured
 from django.core.files import File
 from wagtail.images.models import Image
 from wagtail_factories import ImageFactory
 
 from wagtail_ai.ai import get_ai_backend, get_backend
 from wagtail_ai.ai.base import BackendFeature
-from wagtail_ai.ai.openai import OpenAIBackend
+from wagtail_ai.ai.openai import (
+    OpenAIBackend,
+    OpenAIStreamingResponse,
+    get_async_client,
+    get_session,
+)
 
 pytestmark = pytest.mark.django_db
 
@@ -26,10 +37,24 @@ def stub_image_title_signal(monkeypatch: pytest.MonkeyPatch):
 @pytest.fixture
 def mock_post(monkeypatch: pytest.MonkeyPatch):
     mock = Mock()
-    monkeypatch.setattr("requests.post", mock)
+    monkeypatch.setattr("requests.Session.post", mock)
     return mock
 
 
+@pytest.fixture
+def mock_send(monkeypatch: pytest.MonkeyPatch):
+    mock = AsyncMock()
+    monkeypatch.setattr("httpx.AsyncClient.send", mock)
+    return mock
+
+
+def _httpx_response(**kwargs) -> httpx.Response:
+    return httpx.Response(
+        request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"),
+        **kwargs,
+    )
+
+
 def test_get_as_image_backend(settings):
     settings.WAGTAIL_AI = {
         "BACKENDS": {
@@ -302,3 +327,344 @@ def test_api_key_in_settings(settings):
 
     backend = cast(OpenAIBackend, get_ai_backend("openai"))
     assert backend.get_openai_api_key() == test_key
+
+
+def test_pool_settings(settings):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "openai": {
+                "CLASS": "wagtail_ai.ai.openai.OpenAIBackend",
+                "CONFIG": {
+                    "MODEL_ID": "gpt-4",
+                    "POOL_CONNECTIONS": 4,
+                    "POOL_MAXSIZE": 32,
+                    "POOL_BLOCK": True,
+                },
+            },
+        },
+    }
+
+    backend = cast(OpenAIBackend, get_ai_backend("openai"))
+    assert backend.config.pool_connections == 4
+    assert backend.config.pool_maxsize == 32
+    assert backend.config.pool_block is True
+    assert backend.config.keep_alive is True
+
+    adapter = backend.get_session().get_adapter("https://api.openai.com/v1")
+    assert adapter._pool_connections == 4  # type: ignore
+    assert adapter._pool_maxsize == 32  # type: ignore
+    assert adapter._pool_block is True  # type: ignore
+
+
+def test_session_is_shared_between_backend_instances(settings):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "openai": {
+                "CLASS": "wagtail_ai.ai.openai.OpenAIBackend",
+                "CONFIG": {
+                    "MODEL_ID": "gpt-4",
+                },
+            },
+            "other": {
+                "CLASS": "wagtail_ai.ai.openai.OpenAIBackend",
+                "CONFIG": {
+                    "MODEL_ID": "gpt-4",
+                    "POOL_MAXSIZE": 2,
+                },
+            },
+        },
+    }
+
+    backend = cast(OpenAIBackend, get_ai_backend("openai"))
+    same_backend = cast(OpenAIBackend, get_ai_backend("openai"))
+    other_backend = cast(OpenAIBackend, get_ai_backend("other"))
+
+    assert backend.get_session() is same_backend.get_session()
+    assert backend.get_session() is get_session(backend.config)
+    assert backend.get_session() is not other_backend.get_session()
+
+
+def test_keep_alive_disabled(settings):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "openai": {
+                "CLASS": "wagtail_ai.ai.openai.OpenAIBackend",
+                "CONFIG": {
+                    "MODEL_ID": "gpt-4",
+                    "KEEP_ALIVE": False,
+                },
+            },
+        },
+    }
+
+    backend = cast(OpenAIBackend, get_ai_backend("openai"))
+    assert backend.config.keep_alive is False
+    assert backend.get_session().headers["Connection"] == "close"
+
+
+def test_invalid_pool_maxsize(settings):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "openai": {
+                "CLASS": "wagtail_ai.ai.openai.OpenAIBackend",
+                "CONFIG": {
+                    "MODEL_ID": "gpt-4",
+                    "POOL_MAXSIZE": "lots",
+                },
+            },
+        },
+    }
+
+    with pytest.raises(ImproperlyConfigured, match="POOL_MAXSIZE"):
+        get_ai_backend("openai")
+
+
+def _stream_lines(*deltas: str) -> list[str]:
+    lines = [": keep-alive", ""]
+    for delta in deltas:
+        chunk = {"choices": [{"index": 0, "delta": {"content": delta}}]}
+        lines += [f"data: {json.dumps(chunk)}", ""]
+    lines += ['data: {"choices": [{"index": 0, "delta": {}}]}', "", "data: [DONE]"]
+    return lines
+
+
+def test_text_completion_streaming(settings, mock_post):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "openai": {
+                "CLASS": "wagtail_ai.ai.openai.OpenAIBackend",
+                "CONFIG": {
+                    "MODEL_ID": "gpt-4",
+                    "STREAM": True,
+                },
+            },
+        },
+    }
+
+    mock_post.return_value.iter_lines.return_value = iter(
+        _stream_lines("mock", " ai", " output")
+    )
+    backend = cast(OpenAIBackend, get_ai_backend("openai"))
+    assert backend.config.stream is True
+
+    response = backend.prompt_with_context(pre_prompt="test", context="test")
+    assert isinstance(response, OpenAIStreamingResponse)
+    assert list(response) == ["mock", " ai", " output"]
+    mock_post.return_value.close.assert_called_once()
+
+    assert mock_post.call_args.kwargs["stream"] is True
+    assert mock_post.call_args.kwargs["json"]["stream"] is True
+    mock_post.return_value.json.assert_not_called()
+
+
+def test_text_completion_streaming_text(settings, mock_post):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "openai": {
+                "CLASS": "wagtail_ai.ai.openai.OpenAIBackend",
+                "CONFIG": {
+                    "MODEL_ID": "gpt-4",
+                    "STREAM": True,
+                },
+            },
+        },
+    }
+
+    mock_post.return_value.iter_lines.return_value = iter(
+        _stream_lines("mock", " ai", " output")
+    )
+    backend = get_ai_backend("openai")
+
+    response = backend.prompt_with_context(pre_prompt="test", context="test")
+    assert response.text() == MOCK_OUTPUT
+    # The text is kept once the stream has been read.
+    assert response.text() == MOCK_OUTPUT
+    assert list(response) == [MOCK_OUTPUT]
+
+
+def test_text_completion_streaming_stops_early(settings, mock_post):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "openai": {
+                "CLASS": "wagtail_ai.ai.openai.OpenAIBackend",
+                "CONFIG": {
+                    "MODEL_ID": "gpt-4",
+                    "STREAM": True,
+                },
+            },
+        },
+    }
+
+    mock_post.return_value.iter_lines.return_value = iter(
+        _stream_lines("mock", " ai", " output")
+    )
+    backend = get_ai_backend("openai")
+
+    response = backend.prompt_with_context(pre_prompt="test", context="test")
+    tokens = iter(response)
+    assert next(tokens) == "mock"
+    cast(Generator, tokens).close()
+    mock_post.return_value.close.assert_called_once()
+
+    with pytest.raises(RuntimeError, match="already been read"):
+        response.text()
+
+
+def test_text_completion_not_streamed_by_default(settings, mock_post):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "openai": {
+                "CLASS": "wagtail_ai.ai.openai.OpenAIBackend",
+                "CONFIG": {
+                    "MODEL_ID": "gpt-4",
+                },
+            },
+        },
+    }
+
+    mock_post.return_value.json.return_value = {
+        "choices": [{"message": {"content": MOCK_OUTPUT}}],
+    }
+    backend = get_ai_backend("openai")
+
+    backend.prompt_with_context(pre_prompt="test", context="test")
+    assert mock_post.call_args.kwargs["stream"] is False
+    assert "stream" not in mock_post.call_args.kwargs["json"]
+
+
+def test_async_text_completion(settings, mock_send):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "openai": {
+                "CLASS": "wagtail_ai.ai.openai.OpenAIBackend",
+                "CONFIG": {
+                    "MODEL_ID": "gpt-4",
+                },
+            },
+        },
+    }
+
+    mock_send.return_value = _httpx_response(
+        status_code=200, json={"choices": [{"message": {"content": MOCK_OUTPUT}}]}
+    )
+    backend = get_ai_backend("openai")
+
+    async def prompt():
+        response = await backend.aprompt_with_context(
+            pre_prompt="test", context="Some mock content."
+        )
+        return await response.text()
+
+    assert async_to_sync(prompt)() == MOCK_OUTPUT
+
+    request = mock_send.call_args.args[0]
+    assert str(request.url) == "https://api.openai.com/v1/chat/completions"
+    assert request.headers["Authorization"] == f"Bearer {MOCK_API_KEY}"
+    assert json.loads(request.content)["messages"] == [
+        {"content": [{"type": "text", "text": "test"}], "role": "system"},
+        {"content": [{"type": "text", "text": "Some mock content."}], "role": "user"},
+    ]
+    assert mock_send.call_args.kwargs["stream"] is False
+
+
+def test_async_text_completion_streaming(settings, mock_send):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "openai": {
+                "CLASS": "wagtail_ai.ai.openai.OpenAIBackend",
+                "CONFIG": {
+                    "MODEL_ID": "gpt-4",
+                    "STREAM": True,
+                },
+            },
+        },
+    }
+
+    mock_send.return_value = _httpx_response(
+        status_code=200,
+        content="\n".join(_stream_lines("mock", " ai", " output")).encode(),
+    )
+    backend = get_ai_backend("openai")
+
+    async def prompt():
+        response = await backend.aprompt_with_context(pre_prompt="test", context="test")
+        return [part async for part in response]
+
+    assert async_to_sync(prompt)() == ["mock", " ai", " output"]
+    assert mock_send.call_args.kwargs["stream"] is True
+    assert json.loads(mock_send.call_args.args[0].content)["stream"] is True
+
+
+def test_async_describe_image(settings, mock_send):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "openai": {
+                "CLASS": "wagtail_ai.ai.openai.OpenAIBackend",
+                "CONFIG": {
+                    "MODEL_ID": "gpt-4",
+                },
+            },
+        },
+    }
+
+    mock_send.return_value = _httpx_response(
+        status_code=200, json={"choices": [{"message": {"content": MOCK_OUTPUT}}]}
+    )
+    backend = get_ai_backend("openai")
+    image_file = File(BytesIO(b"fake-png-data"), name="image.png")
+
+    async def describe():
+        response = await backend.adescribe_image(
+            image_file=image_file, prompt="what do you see?"
+        )
+        return await response.text()
+
+    assert async_to_sync(describe)() == MOCK_OUTPUT
+
+    messages = json.loads(mock_send.call_args.args[0].content)["messages"]
+    url = messages[0]["content"][1]["image_url"]["url"]
+    assert url == f"data:image/png;base64,{base64.b64encode(b'fake-png-data').decode()}"
+
+
+def test_async_text_completion_error(settings, mock_send):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "openai": {
+                "CLASS": "wagtail_ai.ai.openai.OpenAIBackend",
+                "CONFIG": {
+                    "MODEL_ID": "gpt-4",
+                },
+            },
+        },
+    }
+
+    mock_send.return_value = _httpx_response(status_code=500, json={})
+    backend = get_ai_backend("openai")
+
+    async def prompt():
+        await backend.aprompt_with_context(pre_prompt="test", context="test")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        async_to_sync(prompt)()
+
+
+def test_async_clients_are_closed_with_their_event_loop(settings):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "openai": {
+                "CLASS": "wagtail_ai.ai.openai.OpenAIBackend",
+                "CONFIG": {"MODEL_ID": "gpt-4"},
+            },
+        },
+    }
+    backend = get_ai_backend("openai")
+
+    async def get_clients():
+        return await backend.get_async_client(), await get_async_client(backend.config)
+
+    client, same_client = asyncio.run(get_clients())
+    assert client is same_client
+    assert client.is_closed
+
+    other_client, _ = asyncio.run(get_clients())
+    assert other_client is not client
@@ -0,0 +1,55 @@
+"""
+Micro-benchmark for the scaling of the default text splitter.
+
+Run with ``python tests/benchmark_text_splitter.py``. The time per megabyte
+should stay roughly flat as the input grows; a growing figure means the
+splitter has become super-linear in the number of splits.
+"""
+
+import random
+import timeit
+from functools import partial
+
+from wagtail_ai.text_splitters.langchain import LangchainRecursiveCharacterTextSplitter
+from wagtail_ai.text_splitters.length import NaiveTextSplitterCalculator
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet,", "consectetur", "elit."]
+SIZES = [128 * 1024, 256 * 1024, 512 * 1024, 1024 * 1024]
+
+
+def make_text(size: int, *, paragraphs: bool) -> str:
+    rng = random.Random(size)
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        if paragraphs and rng.random() < 0.01:
+            word += "\n\n"
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def main() -> None:
+    length_function = NaiveTextSplitterCalculator().get_splitter_length
+    for chunk_size in (1024, 8192):
+        splitter = LangchainRecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, length_function=length_function
+        )
+        for paragraphs in (True, False):
+            for size in SIZES:
+                text = make_text(size, paragraphs=paragraphs)
+                seconds = min(
+                    timeit.repeat(
+                        partial(splitter.split_text, text), number=1, repeat=3
+                    )
+                )
+                print(
+                    f"chunk_size={chunk_size:<5} paragraphs={paragraphs!s:<5} "
+                    f"size={size // 1024:>4} KB  {seconds:.3f}s  "
+                    f"{seconds / size * 1024 * 1024:.3f}s/MB"
+                )
+
+
+if __name__ == "__main__":
+    main()
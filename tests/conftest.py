@@ -49,3 +49,14 @@ def image_data_url():
         "data:image/gif;base64,"
         "R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7"
     )
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    # Database changes are rolled back between tests without sending signals.
+    yield
+    from wagtail_ai.agents.base import clear_agent_settings_cache
+    from wagtail_ai.prompt_cache import get_prompt_registry
+
+    clear_agent_settings_cache()
+    get_prompt_registry.cache_clear()
@@ -1,19 +1,24 @@
 import re
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
 
 import pytest
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ImproperlyConfigured
 from test_utils.settings import (
     custom_ai_backend_class,
     custom_ai_backend_settings,
 )
 
+from wagtail_ai import ai
 from wagtail_ai.ai import (
     BackendNotFound,
     InvalidAIBackendError,
     get_ai_backend,
     get_backend,
 )
-from wagtail_ai.ai.base import BackendFeature
-from wagtail_ai.ai.echo import EchoBackend
+from wagtail_ai.ai.base import BackendFeature, SyncToAsyncResponse
+from wagtail_ai.ai.echo import EchoBackend, EchoResponse
 
 
 @custom_ai_backend_class("wagtail_ai.ai.echo.EchoBackend")
@@ -89,16 +94,69 @@ def test_prompt_with_context_iterator():
     )
     assert list(response) == [
         "This",
-        "is",
-        "an",
-        "echo",
-        "backend:",
-        "I",
-        "like",
-        "trains.",
+        " is",
+        " an",
+        " echo",
+        " backend:",
+        " I",
+        " like",
+        " trains.",
     ]
 
 
+@custom_ai_backend_settings(
+    new_value={
+        "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+        "CONFIG": {
+            "MODEL_ID": "echo",
+            "TOKEN_LIMIT": 123123,
+            "MAX_WORD_SLEEP_SECONDS": 0,  # type: ignore
+        },
+    }
+)
+def test_aprompt_with_context():
+    backend = get_ai_backend("default")
+
+    async def prompt():
+        response = await backend.aprompt_with_context(
+            pre_prompt="Translate the following context to French.",
+            context="I like trains.",
+        )
+        return [part async for part in response]
+
+    assert async_to_sync(prompt)() == [
+        "This",
+        " is",
+        " an",
+        " echo",
+        " backend:",
+        " I",
+        " like",
+        " trains.",
+    ]
+
+
+def test_aprompt_with_context_falls_back_to_sync_backend(monkeypatch):
+    # Backends without native async support use the base implementation.
+    monkeypatch.setattr(
+        EchoBackend, "aprompt_with_context", ai.AIBackend.aprompt_with_context
+    )
+    prompt_with_context = Mock(return_value=EchoResponse(iter(["Some", " text"])))
+    monkeypatch.setattr(EchoBackend, "prompt_with_context", prompt_with_context)
+    backend = get_ai_backend("default")
+
+    async def prompt():
+        response = await backend.aprompt_with_context(pre_prompt="Fix", context="Text")
+        return response, [part async for part in response]
+
+    response, parts = async_to_sync(prompt)()
+    assert isinstance(response, SyncToAsyncResponse)
+    assert parts == ["Some", " text"]
+    prompt_with_context.assert_called_once_with(
+        pre_prompt="Fix", context="Text", post_prompt=None
+    )
+
+
 def test_get_backend_with_feature(settings):
     settings.WAGTAIL_AI = {
         "BACKENDS": {
@@ -130,3 +188,105 @@ def test_get_backend_not_found(settings):
     with pytest.raises(BackendNotFound) as exception:
         get_backend(BackendFeature.IMAGE_DESCRIPTION)
     assert exception.match(r"No backend found for IMAGE_DESCRIPTION")
+
+
+def test_max_concurrency(settings):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "default": {
+                "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+                "CONFIG": {"MODEL_ID": "default", "TOKEN_LIMIT": 123123},
+            },
+            "serial": {
+                "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+                "CONFIG": {
+                    "MODEL_ID": "serial",
+                    "TOKEN_LIMIT": 123123,
+                    "MAX_CONCURRENCY": 1,
+                },
+            },
+        },
+    }
+    assert get_ai_backend("default").config.max_concurrency == 4
+    assert get_ai_backend("serial").config.max_concurrency == 1
+
+
+@pytest.mark.parametrize("value", ["many", 0, [2]])
+def test_invalid_max_concurrency(settings, value):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "default": {
+                "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+                "CONFIG": {
+                    "MODEL_ID": "default",
+                    "TOKEN_LIMIT": 123123,
+                    "MAX_CONCURRENCY": value,
+                },
+            },
+        },
+    }
+    with pytest.raises(ImproperlyConfigured, match="MAX_CONCURRENCY"):
+        get_ai_backend("default")
+
+
+def test_backend_is_built_once_per_alias(settings):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "default": {
+                "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+                "CONFIG": {"MODEL_ID": "default", "TOKEN_LIMIT": 123123},
+            },
+            "other": {
+                "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+                "CONFIG": {"MODEL_ID": "other", "TOKEN_LIMIT": 123123},
+            },
+        },
+    }
+    backend = get_ai_backend("default")
+    assert get_ai_backend("default") is backend
+    assert get_backend() is backend
+    assert get_ai_backend("other") is not backend
+    assert get_ai_backend("other").alias == "other"
+
+
+def test_backend_is_built_once_across_threads(settings, monkeypatch):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "default": {
+                "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+                "CONFIG": {"MODEL_ID": "default", "TOKEN_LIMIT": 123123},
+            },
+        },
+    }
+    build = Mock(side_effect=ai._build_ai_backend)
+    monkeypatch.setattr(ai, "_build_ai_backend", build)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        backends = list(executor.map(get_ai_backend, ["default"] * 32))
+
+    build.assert_called_once_with("default")
+    assert all(backend is backends[0] for backend in backends)
+
+
+def test_backends_are_cleared_on_setting_change(settings):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "default": {
+                "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+                "CONFIG": {"MODEL_ID": "before", "TOKEN_LIMIT": 123123},
+            },
+        },
+    }
+    backend = get_ai_backend("default")
+    assert backend.config.model_id == "before"
+
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "default": {
+                "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+                "CONFIG": {"MODEL_ID": "after", "TOKEN_LIMIT": 123123},
+            },
+        },
+    }
+    assert get_ai_backend("default") is not backend
+    assert get_ai_backend("default").config.model_id == "after"
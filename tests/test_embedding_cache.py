@@ -0,0 +1,124 @@
+import time
+
+import pytest
+from django_ai_core.contrib.index import CachedEmbeddingTransformer
+from django_ai_core.contrib.index.schema import Document
+
+from wagtail_ai.index import embedding_cache
+from wagtail_ai.index.embedding_cache import (
+    USED_AT_INTERVAL,
+    LocalEmbeddingCacheBackend,
+)
+
+
+class FakeEmbeddingTransformer:
+    transformer_id = "fake_text-embedding"
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, documents, *, batch_size=100):
+        self.embedded.extend(document.content for document in documents)
+        return [
+            document.add_embedding([float(len(document.content)), 0.5])
+            for document in documents
+        ]
+
+
+@pytest.fixture
+def cache_backend(tmp_path):
+    return LocalEmbeddingCacheBackend(path=tmp_path / "embeddings.sqlite3")
+
+
+def make_documents(*contents):
+    return [
+        Document(document_key=f"page:1:{i}", content=content, metadata={})
+        for i, content in enumerate(contents)
+    ]
+
+
+def test_stores_embeddings(cache_backend, tmp_path):
+    cache_backend.store_embedding("foo", "model-a", [1.0, 0.5])
+    assert cache_backend.get_embedding("foo", "model-a") == [1.0, 0.5]
+    assert cache_backend.get_embedding("foo", "model-b") is None
+    assert cache_backend.get_embedding("bar", "model-a") is None
+
+    other_process = LocalEmbeddingCacheBackend(path=tmp_path / "embeddings.sqlite3")
+    assert other_process.get_embeddings_batch(["foo", "bar"], "model-a") == {
+        "foo": [1.0, 0.5]
+    }
+
+
+def test_evicts_least_recently_used(tmp_path, monkeypatch):
+    now = 0
+    monkeypatch.setattr(embedding_cache.time, "time_ns", lambda: now)
+    cache_backend = LocalEmbeddingCacheBackend(
+        path=tmp_path / "embeddings.sqlite3", max_entries=2
+    )
+    cache_backend.store_embeddings_batch({"foo": [1.0], "bar": [2.0]}, "model")
+    now += USED_AT_INTERVAL
+    cache_backend.get_embedding("foo", "model")
+    now += 1
+    cache_backend.store_embedding("baz", "model", [3.0])
+
+    assert cache_backend.get_embeddings_batch(["foo", "bar", "baz"], "model") == {
+        "foo": [1.0],
+        "baz": [3.0],
+    }
+
+    # Storing embeddings again doesn't count them twice.
+    cache_backend.store_embeddings_batch({"foo": [4.0], "baz": [5.0]}, "model")
+    assert cache_backend.get_embeddings_batch(["foo", "baz"], "model") == {
+        "foo": [4.0],
+        "baz": [5.0],
+    }
+
+
+def test_reads_only_record_use_once_per_interval(cache_backend, monkeypatch):
+    cache_backend.store_embedding("foo", "model", [1.0])
+    statements = []
+    cache_backend.connection.set_trace_callback(statements.append)
+
+    cache_backend.get_embedding("foo", "model")
+    assert not [statement for statement in statements if "UPDATE" in statement]
+
+    now = time.time_ns() + USED_AT_INTERVAL
+    monkeypatch.setattr(embedding_cache.time, "time_ns", lambda: now)
+    cache_backend.get_embedding("foo", "model")
+    assert [statement for statement in statements if "UPDATE" in statement]
+
+
+def test_counts_existing_embeddings(tmp_path):
+    path = tmp_path / "embeddings.sqlite3"
+    LocalEmbeddingCacheBackend(path=path).store_embeddings_batch(
+        {"foo": [1.0], "bar": [2.0]}, "model"
+    )
+
+    # A backend with a lower limit evicts the embeddings stored before.
+    cache_backend = LocalEmbeddingCacheBackend(path=path, max_entries=2)
+    cache_backend.store_embedding("baz", "model", [3.0])
+    assert len(cache_backend.get_embeddings_batch(["foo", "bar", "baz"], "model")) == 2
+
+
+def test_clear_cache(cache_backend):
+    cache_backend.store_embedding("foo", "model", [1.0])
+    cache_backend.clear_cache()
+    assert cache_backend.get_embedding("foo", "model") is None
+
+
+def test_only_changed_chunks_are_embedded(cache_backend):
+    base_transformer = FakeEmbeddingTransformer()
+    transformer = CachedEmbeddingTransformer(
+        base_transformer=base_transformer, cache_backend=cache_backend
+    )
+    transformer.embed_documents(make_documents("one", "two"))
+    embedded_documents = transformer.embed_documents(
+        make_documents("one", "two", "three")
+    )
+
+    assert base_transformer.embedded == ["one", "two", "three"]
+    assert [document.vector for document in embedded_documents] == [
+        [3.0, 0.5],
+        [3.0, 0.5],
+        [5.0, 0.5],
+    ]
@@ -0,0 +1,178 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.signals import post_delete
+from django_ai_core.contrib.index import ModelSource, VectorIndex
+from django_ai_core.contrib.index import registry as index_registry
+from django_ai_core.contrib.index.storage.base import StorageProvider
+from testapp.models import ExamplePage
+from wagtail.models import Page
+
+from wagtail_ai.index.local import LocalVectorProvider
+from wagtail_ai.index.updates import (
+    IndexUpdateQueue,
+    enqueue_page_removal,
+    get_index_update_queue,
+    update_indexes,
+)
+from wagtail_ai.models import Prompt
+
+pytestmark = pytest.mark.django_db
+
+
+class FakeEmbeddingTransformer:
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, documents, *, batch_size=100):
+        self.embedded.extend(document.document_key for document in documents)
+        return [document.add_embedding([1.0, 0.0]) for document in documents]
+
+
+@pytest.fixture
+def page_index(tmp_path):
+    class PageIndex(VectorIndex):
+        sources = [
+            ModelSource(queryset=ExamplePage.objects.live(), content_fields=["title"])
+        ]
+        storage_provider = LocalVectorProvider(path=tmp_path)
+        embedding_transformer = FakeEmbeddingTransformer()
+
+    with patch.object(index_registry, "list", return_value={"PageIndex": PageIndex}):
+        yield PageIndex()
+
+
+@pytest.fixture
+def page():
+    root = Page.objects.get(depth=1)
+    return root.add_child(
+        instance=ExamplePage(title="Foo", body="<p>Body</p>", slug="foo", live=False)
+    )
+
+
+def indexed_keys(index):
+    return index.storage_provider.store.keys()
+
+
+@pytest.fixture
+def immediate_updates(settings):
+    settings.WAGTAIL_AI = {"INDEX_UPDATES": {"DELAY": 0}}
+
+
+@pytest.mark.usefixtures("immediate_updates")
+def test_published_pages_are_indexed(
+    page_index, page, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        page.save_revision().publish()
+    assert indexed_keys(page_index) == [f"testapp.ExamplePage:{page.pk}:0"]
+
+
+@pytest.mark.usefixtures("immediate_updates")
+def test_unpublished_pages_are_removed(
+    page_index, page, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        page.save_revision().publish()
+    page.refresh_from_db()
+    assert indexed_keys(page_index) == [f"testapp.ExamplePage:{page.pk}:0"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        page.unpublish()
+    assert indexed_keys(page_index) == []
+
+
+@pytest.mark.usefixtures("immediate_updates")
+def test_deleted_pages_are_removed(
+    page_index, page, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        page.save_revision().publish()
+    assert indexed_keys(page_index) == [f"testapp.ExamplePage:{page.pk}:0"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        page.delete()
+    assert indexed_keys(page_index) == []
+
+
+def test_page_removal_is_only_connected_to_pages():
+    sync_receivers, _ = post_delete._live_receivers(Page)
+    assert enqueue_page_removal in sync_receivers
+    sync_receivers, _ = post_delete._live_receivers(Prompt)
+    assert enqueue_page_removal not in sync_receivers
+
+
+def test_updates_are_disabled_by_default(
+    page_index, page, django_capture_on_commit_callbacks
+):
+    assert get_index_update_queue() is None
+    with django_capture_on_commit_callbacks(execute=True):
+        page.save_revision().publish()
+    assert indexed_keys(page_index) == []
+
+
+def test_changes_are_coalesced(settings, page_index, page):
+    settings.WAGTAIL_AI = {"INDEX_UPDATES": {"DELAY": 60}}
+    queue = get_index_update_queue()
+    for _ in range(3):
+        queue._add(ExamplePage, page.pk)
+    page.save_revision().publish()
+    assert indexed_keys(page_index) == []
+    assert queue._timer is not None
+
+    queue.flush()
+    assert page_index.embedding_transformer.embedded == [
+        f"testapp.ExamplePage:{page.pk}:0"
+    ]
+    assert indexed_keys(page_index) == [f"testapp.ExamplePage:{page.pk}:0"]
+    assert queue._timer is None
+
+
+def test_updates_are_not_delayed_past_max_delay(page):
+    queue = IndexUpdateQueue(delay=10, max_delay=0, batch_size=10)
+    with patch("wagtail_ai.index.updates.threading.Timer") as mock_timer:
+        queue._add(Page, page.pk)
+    assert mock_timer.call_args.args[0] == 0
+
+
+def test_stale_chunks_are_deleted_without_delete_objects(page):
+    page.save_revision().publish()
+    storage_provider = MagicMock(spec=StorageProvider)
+
+    class PageIndex(VectorIndex):
+        sources = [ModelSource(model=ExamplePage, content_fields=["title"])]
+        embedding_transformer = FakeEmbeddingTransformer()
+
+    PageIndex.storage_provider = storage_provider
+    with patch.object(index_registry, "list", return_value={"PageIndex": PageIndex}):
+        update_indexes({Page: {page.pk, 10000}}, batch_size=10)
+
+    deleted_keys = [
+        key for call in storage_provider.delete.call_args_list for key in call.args[0]
+    ]
+    assert f"testapp.ExamplePage:{page.pk}:0" not in deleted_keys
+    assert f"testapp.ExamplePage:{page.pk}:1" in deleted_keys
+    assert "testapp.ExamplePage:10000:0" in deleted_keys
+    storage_provider.add.assert_called_once()
+
+
+def test_objects_stay_indexed_if_embedding_fails(page_index, page):
+    page.save_revision().publish()
+    update_indexes({Page: {page.pk}}, batch_size=20)
+    keys = indexed_keys(page_index)
+    assert keys
+
+    with patch.object(
+        page_index.embedding_transformer,
+        "embed_documents",
+        side_effect=Exception("Embedding API error"),
+    ):
+        with pytest.raises(Exception, match="Embedding API error"):
+            update_indexes({Page: {page.pk}}, batch_size=20)
+    assert indexed_keys(page_index) == keys
+
+
+def test_invalid_settings():
+    with pytest.raises(ImproperlyConfigured, match='"DELAY" is not a "float"'):
+        IndexUpdateQueue.from_settings({"DELAY": "soon"})
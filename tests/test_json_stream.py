@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from wagtail_ai.utils.json_stream import IncrementalJSONParser
+
+RESULT = {
+    "quality_score": 2,
+    "qualitative_feedback": ['Quotes ("), commas, and brackets ]} in strings', "Two"],
+    "specific_improvements": [
+        {"original_text": "{foo}", "suggested_text": "bar", "explanation": "baz"},
+    ],
+    "empty": [],
+    "nested": {"items": [1, {"a": [2]}]},
+}
+
+
+def parse(text, part_size):
+    parser = IncrementalJSONParser()
+    items = []
+    for start in range(0, len(text), part_size):
+        items.extend(parser.feed(text[start : start + part_size]))
+    parser.close()
+    return items
+
+
+@pytest.mark.parametrize("part_size", [1, 5, 1000])
+def test_yields_members_and_array_items(part_size):
+    text = "```json\n" + json.dumps(RESULT, indent=2) + "\n```"
+    assert parse(text, part_size) == [
+        ("quality_score", 2),
+        ("qualitative_feedback", 'Quotes ("), commas, and brackets ]} in strings'),
+        ("qualitative_feedback", "Two"),
+        (
+            "specific_improvements",
+            {"original_text": "{foo}", "suggested_text": "bar", "explanation": "baz"},
+        ),
+        ("nested", {"items": [1, {"a": [2]}]}),
+    ]
+
+
+def test_yields_items_as_soon_as_they_are_complete():
+    parser = IncrementalJSONParser()
+    assert list(parser.feed('{"quality_score": 3, "qualitative_feedback": ["On')) == [
+        ("quality_score", 3)
+    ]
+    assert list(parser.feed('e", "Tw')) == [("qualitative_feedback", "One")]
+    assert list(parser.feed('o"]')) == [("qualitative_feedback", "Two")]
+    # The text that was parsed is not kept.
+    assert parser.buffer == ""
+
+
+def test_incomplete_object():
+    parser = IncrementalJSONParser()
+    list(parser.feed('{"quality_score": 3'))
+    with pytest.raises(ValueError, match="incomplete"):
+        parser.close()
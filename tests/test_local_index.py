@@ -0,0 +1,140 @@
+import threading
+
+import pytest
+from django_ai_core.contrib.index.query import DocumentResultMixin
+from django_ai_core.contrib.index.schema import EmbeddedDocument
+
+from wagtail_ai.index.local import LocalVectorProvider
+
+
+def make_document(key, vector, **metadata):
+    return EmbeddedDocument(
+        document_key=key, content=f"Content of {key}", metadata=metadata, vector=vector
+    )
+
+
+def search(provider, embedding, **filters):
+    queryset_cls = DocumentResultMixin.build(sources=[], storage_provider=provider)
+    return queryset_cls().filter(embedding=embedding, **filters)
+
+
+@pytest.fixture(params=[False, True], ids=["float32", "int8"])
+def provider(request, tmp_path):
+    provider = LocalVectorProvider(path=tmp_path, quantize=request.param)
+    provider.index_name = "test_index"
+    provider.add(
+        [
+            make_document("page:1:0", [1.0, 0.0, 0.0], model="page", pk=1),
+            make_document("page:2:0", [0.8, 0.6, 0.0], model="page", pk=2),
+            make_document("page:2:1", [0.0, 1.0, 0.0], model="page", pk=2),
+            make_document("image:1:0", [0.0, 0.0, 1.0], model="image", pk=1),
+        ]
+    )
+    return provider
+
+
+def keys(results):
+    return [document.document_key for document in results]
+
+
+def test_search(provider):
+    results = list(search(provider, [1.0, 0.1, 0.0])[:3])
+    assert keys(results) == ["page:1:0", "page:2:0", "page:2:1"]
+    assert results[0].content == "Content of page:1:0"
+    assert results[0].metadata == {"model": "page", "pk": 1}
+    assert results[0].score == pytest.approx(0.995, abs=0.01)
+
+
+def test_search_slices(provider):
+    assert keys(search(provider, [1.0, 0.1, 0.0])[1:3]) == ["page:2:0", "page:2:1"]
+    assert len(list(search(provider, [1.0, 0.1, 0.0])[:100])) == 4
+
+
+def test_search_metadata_filters(provider):
+    assert keys(search(provider, [1.0, 0.0, 0.0], model="image")[:3]) == ["image:1:0"]
+
+
+def test_search_results_are_read_with_the_search(provider):
+    results = iter(search(provider, [1.0, 0.1, 0.0])[:4])
+    first = next(results)
+    provider.delete(["page:2:0", "page:2:1", "image:1:0"])
+    assert [first.document_key, *keys(results)] == [
+        "page:1:0",
+        "page:2:0",
+        "page:2:1",
+        "image:1:0",
+    ]
+
+
+def test_add_replaces_documents(provider):
+    provider.add([make_document("page:1:0", [0.0, 0.0, -1.0], model="page", pk=1)])
+    assert keys(search(provider, [1.0, 0.1, 0.0])[:2]) == ["page:2:0", "page:2:1"]
+    assert len(provider.store.rows) == 4
+
+
+def test_delete_objects(provider):
+    provider.delete_objects("page", [2])
+    assert keys(search(provider, [1.0, 0.1, 0.0])[:4]) == ["page:1:0", "image:1:0"]
+
+    # Deleted rows are reused.
+    provider.add([make_document("page:3:0", [0.0, 1.0, 0.0], model="page", pk=3)])
+    assert provider.store.size == 4
+
+
+def test_prune_to(provider):
+    provider.prune_to(["page:1:0"])
+    assert keys(search(provider, [1.0, 0.1, 0.0])[:4]) == ["page:1:0"]
+
+
+def test_clear(provider, tmp_path):
+    provider.clear()
+    assert list(search(provider, [1.0, 0.0, 0.0])[:4]) == []
+    assert not (tmp_path / "test_index" / "manifest.json").exists()
+
+
+def test_grows_past_initial_capacity(tmp_path):
+    provider = LocalVectorProvider(path=tmp_path)
+    provider.index_name = "test_index"
+    provider.add(
+        [make_document(f"page:{i}:0", [1.0, i / 100]) for i in range(100)]
+        + [make_document("page:100:0", [1.0, 50.0])]
+    )
+    assert provider.store.capacity == 128
+    assert keys(search(provider, [0.0, 1.0])[:1]) == ["page:100:0"]
+
+
+def test_changes_are_seen_by_other_processes(provider, tmp_path):
+    other_process = LocalVectorProvider(path=tmp_path, quantize=provider.quantize)
+    other_process.index_name = "test_index"
+    assert keys(search(other_process, [0.0, 0.0, 1.0])[:1]) == ["image:1:0"]
+
+    provider.add([make_document("image:2:0", [0.0, 0.1, 1.0], model="image", pk=2)])
+    provider.delete(["image:1:0"])
+    assert keys(search(other_process, [0.0, 0.0, 1.0])[:1]) == ["image:2:0"]
+
+
+def test_concurrent_updates_from_other_processes(provider, tmp_path):
+    other_process = LocalVectorProvider(path=tmp_path, quantize=provider.quantize)
+    other_process.index_name = "test_index"
+
+    def add_documents(provider, model):
+        for pk in range(20):
+            provider.add([make_document(f"{model}:{pk}:0", [1.0, 0.0, 0.0])])
+
+    threads = [
+        threading.Thread(target=add_documents, args=(provider, "foo")),
+        threading.Thread(target=add_documents, args=(other_process, "bar")),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    new_process = LocalVectorProvider(path=tmp_path, quantize=provider.quantize)
+    new_process.index_name = "test_index"
+    assert len(new_process.store.keys()) == 44
+
+
+def test_rejects_vectors_of_another_size(provider):
+    with pytest.raises(ValueError, match="Expected a vector with 3 dimensions"):
+        provider.add([make_document("page:3:0", [1.0, 0.0])])
@@ -0,0 +1,104 @@
+import time
+import uuid
+
+import pytest
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+
+from wagtail_ai.models import Prompt
+from wagtail_ai.prompt_cache import PromptRegistry, get_prompt, get_prompt_registry
+from wagtail_ai.prompts import DEFAULT_PROMPTS
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def shared_cache_settings(settings):
+    settings.CACHES = {
+        **settings.CACHES,
+        "wagtail_ai": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "wagtail_ai_prompts_test",
+        },
+    }
+    settings.WAGTAIL_AI = {"PROMPT_CACHE": {"CACHE_ALIAS": "wagtail_ai"}}
+    yield settings
+    caches["wagtail_ai"].clear()
+
+
+def test_prompts_are_looked_up_once(setup_prompt_object, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        assert get_prompt(setup_prompt_object.uuid) == setup_prompt_object
+        assert get_prompt(setup_prompt_object.uuid) == setup_prompt_object
+
+
+def test_unknown_prompts_are_looked_up_in_the_database(
+    test_prompt_values, django_assert_num_queries
+):
+    other_process = PromptRegistry()
+    assert other_process.get(uuid.uuid4()) is None
+
+    # A prompt created in another process is found without a reload.
+    prompt = Prompt.objects.bulk_create([Prompt(**test_prompt_values)])[0]
+    with django_assert_num_queries(1):
+        assert other_process.get(prompt.uuid) == prompt
+        assert other_process.get(prompt.uuid) == prompt
+
+
+def test_prompts_expire(setup_prompt_object, monkeypatch):
+    other_process = PromptRegistry(timeout=60)
+    assert other_process.get(setup_prompt_object.uuid).prompt == "Prompt Text"  # type: ignore
+    Prompt.objects.filter(pk=setup_prompt_object.pk).update(prompt="Updated prompt")
+    assert other_process.get(setup_prompt_object.uuid).prompt == "Prompt Text"  # type: ignore
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 60)
+    assert other_process.get(setup_prompt_object.uuid).prompt == "Updated prompt"  # type: ignore
+
+
+def test_default_prompt_values_are_resolved():
+    default_prompt = Prompt.objects.get(default_prompt_id=1)
+    assert default_prompt.prompt is None
+
+    prompt = get_prompt(default_prompt.uuid)
+    assert prompt is not None
+    # The cached prompt isn't changed, the value is resolved when it is read.
+    assert prompt.prompt is None
+    assert prompt.prompt_value == DEFAULT_PROMPTS[0]["prompt"]
+
+
+def test_saving_a_prompt_invalidates_the_registry(test_prompt_values):
+    prompt = Prompt.objects.create(**test_prompt_values)
+    assert get_prompt(prompt.uuid).prompt == "Prompt Text"  # type: ignore
+
+    prompt.prompt = "Updated prompt"
+    prompt.save()
+    assert get_prompt(prompt.uuid).prompt == "Updated prompt"  # type: ignore
+
+    prompt.delete()
+    assert get_prompt(prompt.uuid) is None
+
+
+def test_shared_cache_invalidates_other_processes(
+    shared_cache_settings, setup_prompt_object
+):
+    assert get_prompt_registry().cache_alias == "wagtail_ai"
+    other_process = PromptRegistry(cache_alias="wagtail_ai")
+    assert other_process.get(setup_prompt_object.uuid).prompt == "Prompt Text"  # type: ignore
+
+    # Saving in this process changes the shared version.
+    Prompt.objects.filter(pk=setup_prompt_object.pk).update(prompt="Updated prompt")
+    get_prompt_registry().invalidate()
+
+    assert other_process.get(setup_prompt_object.uuid).prompt == "Updated prompt"  # type: ignore
+
+
+def test_unknown_cache_alias(settings):
+    settings.WAGTAIL_AI = {"PROMPT_CACHE": {"CACHE_ALIAS": "missing"}}
+    with pytest.raises(ImproperlyConfigured, match="is not a configured cache"):
+        get_prompt_registry()
+
+
+def test_invalid_timeout():
+    with pytest.raises(ImproperlyConfigured, match='"TIMEOUT"'):
+        PromptRegistry.from_settings({"TIMEOUT": "soon"})
@@ -1,9 +1,16 @@
 import pytest
+from django.core.cache import cache, caches
 from django.core.exceptions import ValidationError
+from wagtail.models import Page
 
-from wagtail_ai.models import Prompt
+from wagtail_ai.models import AgentSettings, Prompt
 from wagtail_ai.prompts import DEFAULT_PROMPTS
-from wagtail_ai.wagtail_hooks import get_prompts
+from wagtail_ai.wagtail_hooks import (
+    ADMIN_CONFIG_VERSION_CACHE_KEY,
+    ai_admin_js,
+    get_admin_prompts_config,
+    get_prompts,
+)
 
 
 @pytest.mark.django_db
@@ -96,3 +103,95 @@ def test_prompts_can_not_save_and_invalid_method(test_prompt_values):
             method="foo",
         )
         prompt.full_clean()
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "wagtail_ai_admin_config",
+        }
+    }
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_admin_prompts_config_is_cached(locmem_cache, django_assert_num_queries):
+    # Loading the settings for the first time creates them, which would
+    # invalidate the config.
+    AgentSettings.load()
+
+    config = get_admin_prompts_config()
+    assert {prompt["label"] for prompt in config["aiPrompts"]} == {
+        prompt["label"] for prompt in DEFAULT_PROMPTS
+    }
+    assert config["settingPrompts"]
+
+    with django_assert_num_queries(0):
+        assert get_admin_prompts_config() == config
+        ai_admin_js()
+
+
+@pytest.mark.django_db
+def test_admin_prompts_config_is_invalidated_on_prompt_change(
+    locmem_cache, test_prompt_values
+):
+    get_admin_prompts_config()
+
+    prompt = Prompt.objects.create(**test_prompt_values)
+    config = get_admin_prompts_config()
+    assert str(prompt.uuid) in [p["uuid"] for p in config["aiPrompts"]]
+
+    prompt.delete()
+    config = get_admin_prompts_config()
+    assert str(prompt.uuid) not in [p["uuid"] for p in config["aiPrompts"]]
+
+
+@pytest.mark.django_db
+def test_admin_prompts_config_is_invalidated_on_agent_settings_change(locmem_cache):
+    get_admin_prompts_config()
+
+    agent_settings = AgentSettings.load()
+    agent_settings.page_title_prompt = "A new prompt"
+    agent_settings.save()
+
+    config = get_admin_prompts_config()
+    setting_prompts = {p["name"]: p["prompt"] for p in config["settingPrompts"]}
+    assert setting_prompts["page_title_prompt"] == "A new prompt"
+
+
+@pytest.mark.django_db
+def test_admin_prompts_config_is_kept_when_other_models_change(locmem_cache):
+    AgentSettings.load()
+    get_admin_prompts_config()
+    version = cache.get(ADMIN_CONFIG_VERSION_CACHE_KEY)
+
+    root = Page.objects.get(depth=1)
+    root.add_child(instance=Page(title="Other", slug="other"))
+    assert cache.get(ADMIN_CONFIG_VERSION_CACHE_KEY) == version
+
+
+@pytest.mark.django_db
+def test_admin_prompts_config_uses_the_prompt_cache(settings, test_prompt_values):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "wagtail_ai_admin_config",
+        },
+        "shared": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "wagtail_ai_admin_config_shared",
+        },
+    }
+    settings.WAGTAIL_AI = {"PROMPT_CACHE": {"CACHE_ALIAS": "shared"}}
+    AgentSettings.load()
+    get_admin_prompts_config()
+    version = caches["shared"].get(ADMIN_CONFIG_VERSION_CACHE_KEY)
+    assert version is not None
+    assert cache.get(ADMIN_CONFIG_VERSION_CACHE_KEY) is None
+
+    Prompt.objects.create(**test_prompt_values)
+    assert caches["shared"].get(ADMIN_CONFIG_VERSION_CACHE_KEY) != version
+    caches["shared"].clear()
@@ -0,0 +1,162 @@
+from unittest.mock import MagicMock
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ImproperlyConfigured
+
+from wagtail_ai.ai import get_ai_backend
+from wagtail_ai.ai.echo import EchoBackend
+from wagtail_ai.ai.response_cache import (
+    AsyncCachedResponse,
+    CachedResponse,
+    aprompt_with_context,
+    get_response_cache,
+    prompt_with_context,
+)
+
+BACKENDS = {
+    "default": {
+        "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+        "CONFIG": {"MODEL_ID": "echo", "TOKEN_LIMIT": 100},
+    },
+    "other": {
+        "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+        "CONFIG": {"MODEL_ID": "echo", "TOKEN_LIMIT": 100},
+    },
+}
+
+
+@pytest.fixture
+def response_cache_settings(settings):
+    settings.CACHES = {
+        **settings.CACHES,
+        "wagtail_ai": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "wagtail_ai_test",
+        },
+    }
+    settings.WAGTAIL_AI = {
+        "BACKENDS": BACKENDS,
+        "RESPONSE_CACHE": {"CACHE_ALIAS": "wagtail_ai"},
+    }
+    yield settings
+    get_response_cache().cache.clear()  # type: ignore
+
+
+@pytest.fixture
+def spy_prompt_with_context(monkeypatch):
+    spy = MagicMock(side_effect=EchoBackend.prompt_with_context)
+
+    def prompt_with_context(self, **kwargs):
+        return spy(self, **kwargs)
+
+    monkeypatch.setattr(EchoBackend, "prompt_with_context", prompt_with_context)
+    return spy
+
+
+def test_disabled_by_default(settings, spy_prompt_with_context):
+    settings.WAGTAIL_AI = {"BACKENDS": BACKENDS}
+    assert get_response_cache() is None
+
+    backend = get_ai_backend("default")
+    for _ in range(2):
+        response = prompt_with_context(backend, pre_prompt="Fix", context="Some text")
+        assert response.text() == "This is an echo backend: Some text"
+
+    assert spy_prompt_with_context.call_count == 2
+
+
+def test_cached_response(response_cache_settings, spy_prompt_with_context):
+    backend = get_ai_backend("default")
+
+    response = prompt_with_context(backend, pre_prompt="Fix", context="Some text")
+    assert response.text() == "This is an echo backend: Some text"
+
+    response = prompt_with_context(backend, pre_prompt="Fix", context="Some text")
+    assert isinstance(response, CachedResponse)
+    assert response.text() == "This is an echo backend: Some text"
+
+    assert spy_prompt_with_context.call_count == 1
+
+
+@pytest.mark.parametrize(
+    "alias,kwargs",
+    [
+        ("other", {"pre_prompt": "Fix", "context": "Some text"}),
+        ("default", {"pre_prompt": "Improve", "context": "Some text"}),
+        ("default", {"pre_prompt": "Fix", "context": "Other text"}),
+        ("default", {"pre_prompt": "Fix", "context": "Some text", "post_prompt": "!"}),
+    ],
+)
+def test_cache_key(response_cache_settings, spy_prompt_with_context, alias, kwargs):
+    prompt_with_context(
+        get_ai_backend("default"), pre_prompt="Fix", context="Some text"
+    ).text()
+
+    response = prompt_with_context(get_ai_backend(alias), **kwargs)
+    assert not isinstance(response, CachedResponse)
+    assert spy_prompt_with_context.call_count == 2
+
+
+def test_response_is_only_cached_once_read(
+    response_cache_settings, spy_prompt_with_context
+):
+    backend = get_ai_backend("default")
+
+    prompt_with_context(backend, pre_prompt="Fix", context="Some text")
+    response = prompt_with_context(backend, pre_prompt="Fix", context="Some text")
+    assert not isinstance(response, CachedResponse)
+
+
+def test_max_response_size(response_cache_settings, spy_prompt_with_context):
+    response_cache_settings.WAGTAIL_AI = {
+        "BACKENDS": BACKENDS,
+        "RESPONSE_CACHE": {"CACHE_ALIAS": "wagtail_ai", "MAX_RESPONSE_SIZE": 10},
+    }
+    backend = get_ai_backend("default")
+
+    for _ in range(2):
+        response = prompt_with_context(backend, pre_prompt="Fix", context="Some text")
+        assert not isinstance(response, CachedResponse)
+        response.text()
+
+    assert spy_prompt_with_context.call_count == 2
+
+
+def test_invalid_cache_alias(settings):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": BACKENDS,
+        "RESPONSE_CACHE": {"CACHE_ALIAS": "missing"},
+    }
+    with pytest.raises(ImproperlyConfigured, match="CACHE_ALIAS"):
+        get_response_cache()
+
+
+def test_async_cached_response(response_cache_settings, monkeypatch):
+    spy = MagicMock(side_effect=EchoBackend.aprompt_with_context)
+
+    async def spy_aprompt_with_context(self, **kwargs):
+        return await spy(self, **kwargs)
+
+    monkeypatch.setattr(EchoBackend, "aprompt_with_context", spy_aprompt_with_context)
+    backend = get_ai_backend("default")
+
+    async def prompt():
+        response = await aprompt_with_context(
+            backend, pre_prompt="Fix", context="Some text"
+        )
+        return response, "".join([part async for part in response])
+
+    response, text = async_to_sync(prompt)()
+    assert text == "This is an echo backend: Some text"
+    assert not isinstance(response, AsyncCachedResponse)
+
+    response, text = async_to_sync(prompt)()
+    assert text == "This is an echo backend: Some text"
+    assert isinstance(response, AsyncCachedResponse)
+    assert spy.call_count == 1
+    # The sync and async APIs share the cache.
+    assert isinstance(
+        prompt_with_context(backend, pre_prompt="Fix", context="Some text"),
+        CachedResponse,
+    )
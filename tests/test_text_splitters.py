@@ -1,12 +1,22 @@
+import base64
+
 import pytest
+from django.core.exceptions import ImproperlyConfigured
 from test_utils.settings import custom_text_splitting
+from test_utils.text_splitters import ParagraphTextSplitter
 
 from wagtail_ai.ai import (
     get_ai_backend,
 )
+from wagtail_ai.text_splitters import iter_split_text_spans, split_text_spans
+from wagtail_ai.text_splitters.bpe import BytePairEncoding
 from wagtail_ai.text_splitters.dummy import DummyLengthCalculator, DummyTextSplitter
 from wagtail_ai.text_splitters.langchain import LangchainRecursiveCharacterTextSplitter
-from wagtail_ai.text_splitters.length import NaiveTextSplitterCalculator
+from wagtail_ai.text_splitters.length import (
+    BPETextSplitterCalculator,
+    NaiveTextSplitterCalculator,
+)
+from wagtail_ai.types import TextSplitterProtocol
 
 
 @custom_text_splitting({})
@@ -88,3 +98,211 @@ def test_dummy_text_splitter_length_calculator(test_input, expected):
     """
     length_calculator = DummyLengthCalculator()
     assert length_calculator.get_splitter_length(test_input) == expected
+
+
+SPLITTER_SAMPLE_TEXT = "\n\n".join(
+    f"Paragraph {i}. " + " ".join(["Lorem ipsum dolor sit amet."] * 12)
+    for i in range(4)
+)
+
+
+def test_langchain_text_splitter_spans():
+    splitter = LangchainRecursiveCharacterTextSplitter(
+        chunk_size=100,
+        length_function=NaiveTextSplitterCalculator().get_splitter_length,
+    )
+    spans = splitter.split_text_spans(SPLITTER_SAMPLE_TEXT)
+
+    assert [SPLITTER_SAMPLE_TEXT[start:end] for start, end in spans] == (
+        SPLITTER_SAMPLE_TEXT.split("\n\n")
+    )
+
+
+def test_langchain_text_splitter_spans_do_not_overlap():
+    splitter = LangchainRecursiveCharacterTextSplitter(
+        chunk_size=10, length_function=len
+    )
+    text = " ".join(["word"] * 50)
+    spans = splitter.split_text_spans(text)
+
+    position = 0
+    for start, end in spans:
+        assert position <= start < end
+        assert text[start:end] == text[start:end].strip()
+        position = end
+    # Only whitespace is left out of the chunks.
+    chunks = "".join(text[start:end] for start, end in spans)
+    assert chunks.replace(" ", "") == "word" * 50
+
+
+def test_dummy_text_splitter_spans():
+    splitter = DummyTextSplitter(chunk_size=10, length_function=len)
+    assert splitter.split_text_spans("Some text") == [(0, 9)]
+    assert splitter.split_text_spans("") == []
+
+
+class SentenceTextSplitter(TextSplitterProtocol):
+    """
+    A splitter which only implements ``split_text``, to test the fallback.
+    """
+
+    def __init__(self, *, chunk_size, length_function, chunks=None):
+        self.chunks = chunks
+
+    def split_text(self, text):
+        return self.chunks
+
+
+def test_text_splitter_spans_fallback():
+    text = "Same. Same. Other."
+    splitter = SentenceTextSplitter(
+        chunk_size=10, length_function=len, chunks=["Same.", "Same.", "Other."]
+    )
+    assert splitter.split_text_spans(text) == [(0, 5), (6, 11), (12, 18)]
+
+
+def test_text_splitter_spans_fallback_with_overlap():
+    text = "One two three four"
+    splitter = SentenceTextSplitter(
+        chunk_size=10, length_function=len, chunks=["One two three", "three four"]
+    )
+    assert splitter.split_text_spans(text) == [(0, 13), (13, 18)]
+
+
+def test_text_splitter_spans_fallback_with_unknown_chunk():
+    splitter = SentenceTextSplitter(
+        chunk_size=10, length_function=len, chunks=["Not in the text"]
+    )
+    with pytest.raises(ValueError):
+        splitter.split_text_spans("Some text")
+
+
+def test_text_splitter_spans_of_splitters_that_only_implement_split_text():
+    text = "First\n\nSecond\n\nThird"
+    splitter = ParagraphTextSplitter(chunk_size=10, length_function=len)
+    assert not hasattr(splitter, "split_text_spans")
+    assert split_text_spans(splitter, text) == [(0, 5), (7, 13), (15, 20)]
+    assert list(iter_split_text_spans(splitter, text)) == [(0, 5), (7, 13), (15, 20)]
+
+
+BPE_MERGES = [b"he", b"ll", b"hell", b"hello", b" w", b"or", b" wor", b"ld"]
+
+
+@pytest.fixture
+def bpe_encoding_file(tmp_path):
+    tokens = [bytes([i]) for i in range(256)] + BPE_MERGES
+    path = tmp_path / "test.tiktoken"
+    path.write_bytes(
+        b"\n".join(
+            base64.b64encode(token) + b" " + str(rank).encode()
+            for rank, token in enumerate(tokens)
+        )
+    )
+    return path
+
+
+def test_bpe_pre_tokenizer():
+    encoding = BytePairEncoding({})
+    assert encoding.pattern.findall("Hello world! It's 12345 times.\n\nOk") == [
+        "Hello",
+        " world",
+        "!",
+        " It",
+        "'s",
+        " ",
+        "123",
+        "45",
+        " times",
+        ".\n\n",
+        "Ok",
+    ]
+
+
+def test_bpe_encoding(bpe_encoding_file):
+    encoding = BytePairEncoding.from_file(bpe_encoding_file)
+    assert encoding._merge(b"hello") == [b"hello"]
+    assert encoding._merge(b" world") == [b" wor", b"ld"]
+    assert encoding._merge(b"help") == [b"he", b"l", b"p"]
+    assert encoding.count_tokens("hello world") == 3
+    assert encoding.count_tokens("") == 0
+
+
+def test_bpe_encoding_memoizes_pieces(bpe_encoding_file):
+    encoding = BytePairEncoding.from_file(bpe_encoding_file)
+    encoding.count_tokens("hello hello hello")
+    # "hello" once, then " hello" twice, the second time from the cache.
+    assert encoding.count_piece_tokens.cache_info().misses == 2
+    assert encoding.count_piece_tokens.cache_info().hits == 1
+
+    encoding.count_tokens("hello")
+    assert encoding.count_piece_tokens.cache_info().misses == 2
+    assert encoding.count_piece_tokens.cache_info().hits == 2
+
+
+def test_bpe_length_calculator(bpe_encoding_file):
+    class TestBPELengthCalculator(BPETextSplitterCalculator):
+        encoding_file = bpe_encoding_file
+
+    length_calculator = TestBPELengthCalculator()
+    assert length_calculator.get_splitter_length("hello world") == 3
+    # Multi-byte characters that aren't in the table count one token per byte.
+    assert length_calculator.get_splitter_length("é") == 2
+
+
+def test_bpe_length_calculator_without_encoding_file():
+    with pytest.raises(ImproperlyConfigured, match="encoding_file"):
+        BPETextSplitterCalculator().get_splitter_length("hello")
+
+
+def test_langchain_splitter_measures_each_split_once():
+    calls = 0
+
+    def length_function(text: str) -> int:
+        nonlocal calls
+        calls += 1
+        return len(text.split())
+
+    # A single paragraph, so it is split on spaces straight away.
+    word_count = 100_000
+    text = " ".join(["word"] * word_count)
+    splitter = LangchainRecursiveCharacterTextSplitter(
+        chunk_size=100, length_function=length_function
+    )
+
+    spans = splitter.split_text_spans(text)
+
+    assert len(spans) == word_count // 100
+    # Each word is measured once, plus the separator once per merge.
+    assert calls == word_count + 1
+
+
+def test_langchain_splitter_yields_chunks_lazily():
+    calls = 0
+
+    def length_function(text: str) -> int:
+        nonlocal calls
+        calls += 1
+        return len(text.split())
+
+    text = "\n\n".join([" ".join(["word"] * 60)] * 1000)
+    splitter = LangchainRecursiveCharacterTextSplitter(
+        chunk_size=100, length_function=length_function
+    )
+
+    chunks = splitter.iter_split_text(text)
+    assert next(chunks) == " ".join(["word"] * 60)
+    # Only the start of the text has been looked at so far.
+    assert calls < 10
+    assert len(list(chunks)) == 999
+
+
+@pytest.mark.parametrize(
+    "splitter_class", [LangchainRecursiveCharacterTextSplitter, DummyTextSplitter]
+)
+def test_iter_split_text_matches_split_text(splitter_class):
+    splitter = splitter_class(
+        chunk_size=20, length_function=NaiveTextSplitterCalculator().get_splitter_length
+    )
+    text = "\n\n".join(LENGTH_CALCULATOR_SAMPLE_TEXTS)
+    assert list(splitter.iter_split_text(text)) == splitter.split_text(text)
+    assert list(splitter.iter_split_text_spans(text)) == splitter.split_text_spans(text)
@@ -0,0 +1,11 @@
+class ParagraphTextSplitter:
+    """
+    A splitter that satisfies ``TextSplitterProtocol`` without subclassing it,
+    so it only has ``split_text``.
+    """
+
+    def __init__(self, *, chunk_size, length_function, **kwargs):
+        pass
+
+    def split_text(self, text):
+        return [paragraph for paragraph in text.split("\n\n") if paragraph]
@@ -2,6 +2,7 @@ from django.apps import AppConfig
 
 
 class WagtailAiTestAppConfig(AppConfig):
+    default_auto_field = "django.db.models.AutoField"
     label = "testapp"
     name = "testapp"
     verbose_name = "Wagtail AI tests"
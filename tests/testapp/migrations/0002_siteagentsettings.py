@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import wagtail_ai.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("testapp", "0001_initial"),
+        ("wagtailcore", "0098_apitoken"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SiteAgentSettings",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "page_title_prompt",
+                    models.TextField(
+                        blank=True,
+                        default=wagtail_ai.models.AgentPromptDefaults.page_title_prompt,
+                    ),
+                ),
+                (
+                    "page_description_prompt",
+                    models.TextField(
+                        blank=True,
+                        default=wagtail_ai.models.AgentPromptDefaults.page_description_prompt,
+                    ),
+                ),
+                (
+                    "image_title_prompt",
+                    models.TextField(
+                        blank=True,
+                        default=wagtail_ai.models.AgentPromptDefaults.image_title_prompt,
+                    ),
+                ),
+                (
+                    "image_description_prompt",
+                    models.TextField(
+                        blank=True,
+                        default=wagtail_ai.models.AgentPromptDefaults.image_description_prompt,
+                    ),
+                ),
+                (
+                    "contextual_alt_text_prompt",
+                    models.TextField(
+                        blank=True,
+                        default=wagtail_ai.models.AgentPromptDefaults.contextual_alt_text_prompt,
+                    ),
+                ),
+                ("content_feedback_prompt", models.TextField(blank=True)),
+                (
+                    "content_feedback_content_type",
+                    models.CharField(
+                        choices=[("text", "Plain text"), ("html", "HTML")],
+                        default="html",
+                        max_length=64,
+                    ),
+                ),
+                (
+                    "site",
+                    models.OneToOneField(
+                        editable=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="wagtailcore.site",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Agents",
+                "abstract": False,
+            },
+        ),
+    ]
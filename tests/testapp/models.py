@@ -1,7 +1,9 @@
 from wagtail.admin.panels import FieldPanel
+from wagtail.contrib.settings.models import BaseSiteSetting
 from wagtail.fields import RichTextField
 from wagtail.models import Page
 
+from wagtail_ai.models import AgentSettingsMixin
 from wagtail_ai.panels import AIDescriptionFieldPanel, AITitleFieldPanel
 
 # Replace the default TitleFieldPanel with an AITitleFieldPanel.
@@ -14,3 +16,8 @@ class ExamplePage(Page):
     body = RichTextField()
 
     content_panels = [*Page.content_panels, FieldPanel("body")]
+
+
+class SiteAgentSettings(AgentSettingsMixin, BaseSiteSetting):
+    class Meta(AgentSettingsMixin.Meta):  # type: ignore
+        abstract = False
@@ -4,6 +4,7 @@ from typing import cast
 from unittest.mock import ANY, Mock, call
 
 import pytest
+from asgiref.sync import async_to_sync
 from bs4 import BeautifulSoup
 from django.contrib.auth.models import Permission, User
 from django.forms import Textarea
@@ -268,3 +269,49 @@ def test_image_description_widget_with_textarea(get_soup):
         [ImageDescriptionPrompt.name]
     )
     assert textarea.text.strip() == "A portrait of a Wagtail."
+
+
+def test_async_success(async_client, admin_user, settings):
+    settings.WAGTAIL_AI = {
+        "BACKENDS": {
+            "echo": {
+                "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+                "CONFIG": {
+                    "MODEL_ID": "echo",
+                    "TOKEN_LIMIT": 123123,
+                },
+            },
+        },
+        "IMAGE_DESCRIPTION_BACKEND": "echo",
+    }
+    async_client.force_login(admin_user)
+
+    image = cast(Image, ImageFactory())
+    response = async_to_sync(async_client.post)(
+        reverse("wagtail_ai_async:describe_image"), data={"image_id": image.pk}
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "message": "This is an echo backend: images/example.max-800x600.jpg"
+    }
+
+
+def test_async_access_denied(async_client):
+    user = User.objects.create_user(username="test")
+    user.user_permissions.add(Permission.objects.get(codename="access_admin"))
+    async_client.force_login(user)
+    image = cast(Image, ImageFactory())
+    response = async_to_sync(async_client.post)(
+        reverse("wagtail_ai_async:describe_image"), data={"image_id": image.pk}
+    )
+    assert response.status_code == 403
+    assert response.json() == {"error": "Access denied."}
+
+
+def test_async_invalid_form(async_client, admin_user):
+    async_client.force_login(admin_user)
+    response = async_to_sync(async_client.post)(
+        reverse("wagtail_ai_async:describe_image"), data={"maxlength": "-1"}
+    )
+    assert response.status_code == 400
+    assert "This field is required." in response.json()["error"]
@@ -1,9 +1,18 @@
+import asyncio
+import json
+import os
+import threading
+import time
 import uuid
 
 import pytest
+from asgiref.sync import async_to_sync
 from django.urls import reverse
+from test_utils.settings import custom_ai_backend_settings
 
-from wagtail_ai.views import PromptEditForm, prompt_viewset
+from wagtail_ai.ai.echo import AsyncEchoResponse, EchoResponse
+from wagtail_ai.text_splitters.langchain import LangchainRecursiveCharacterTextSplitter
+from wagtail_ai.views import PromptEditForm, _strip_blank_lines, prompt_viewset
 
 pytestmark = pytest.mark.django_db
 
@@ -80,3 +89,555 @@ def test_process_view_with_correct_prompt(admin_client, setup_prompt_object):
     assert response.status_code == 200
     # correct, the tests default is the echo backend
     assert response.json() == {"message": "This is an echo backend: test"}
+
+
+PARAGRAPHS = [
+    f"Paragraph {i}. " + " ".join(["Lorem ipsum dolor sit amet."] * 12)
+    for i in range(4)
+]
+
+
+@custom_ai_backend_settings(
+    new_value={
+        "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+        "CONFIG": {
+            "MODEL_ID": "echo",
+            "TOKEN_LIMIT": 100,
+            "MAX_CONCURRENCY": 4,
+        },
+    }
+)
+def test_replace_sends_chunks_concurrently(
+    admin_client, setup_prompt_object, monkeypatch
+):
+    # Each request waits for all the others, so this only passes if the
+    # chunks are processed concurrently.
+    barrier = threading.Barrier(len(PARAGRAPHS), timeout=5)
+
+    def process_backend_request(ai_backend, pre_prompt, context):
+        barrier.wait()
+        return EchoResponse(iter([context.split(".")[0].upper()]))
+
+    monkeypatch.setattr(
+        "wagtail_ai.views._process_backend_request", process_backend_request
+    )
+
+    response = admin_client.post(
+        reverse("wagtail_ai:text_completion"),
+        data={
+            "text": "\n\n".join(PARAGRAPHS),
+            "prompt": str(setup_prompt_object.uuid),
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "message": "PARAGRAPH 0\n\nPARAGRAPH 1\n\nPARAGRAPH 2\n\nPARAGRAPH 3"
+    }
+
+
+@custom_ai_backend_settings(
+    new_value={
+        "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+        "CONFIG": {
+            "MODEL_ID": "echo",
+            "TOKEN_LIMIT": 100,
+            "MAX_CONCURRENCY": 2,
+        },
+    }
+)
+def test_replace_limits_concurrency_in_the_shared_pool(
+    admin_client, setup_prompt_object, monkeypatch
+):
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def process_backend_request(ai_backend, pre_prompt, context):
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        return EchoResponse(iter([context.split(".")[0].upper()]))
+
+    close_all_threads = set()
+    monkeypatch.setattr(
+        "wagtail_ai.views._process_backend_request", process_backend_request
+    )
+    monkeypatch.setattr(
+        "wagtail_ai.views.connections.close_all",
+        lambda: close_all_threads.add(threading.current_thread().name),
+    )
+
+    response = admin_client.post(
+        reverse("wagtail_ai:text_completion"),
+        data={
+            "text": "\n\n".join(PARAGRAPHS),
+            "prompt": str(setup_prompt_object.uuid),
+        },
+    )
+
+    assert response.json() == {
+        "message": "PARAGRAPH 0\n\nPARAGRAPH 1\n\nPARAGRAPH 2\n\nPARAGRAPH 3"
+    }
+    assert max_running <= 2
+    # The pool threads close their database connections.
+    assert any(name.startswith("wagtail_ai_chunk") for name in close_all_threads)
+
+
+@custom_ai_backend_settings(
+    new_value={
+        "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+        "CONFIG": {
+            "MODEL_ID": "echo",
+            "TOKEN_LIMIT": 100,
+            "MAX_CONCURRENCY": 1,
+        },
+    }
+)
+def test_replace_with_max_concurrency_of_one(
+    admin_client, setup_prompt_object, monkeypatch
+):
+    threads = set()
+
+    def process_backend_request(ai_backend, pre_prompt, context):
+        threads.add(threading.get_ident())
+        return EchoResponse(iter([context.split(".")[0].upper()]))
+
+    monkeypatch.setattr(
+        "wagtail_ai.views._process_backend_request", process_backend_request
+    )
+
+    response = admin_client.post(
+        reverse("wagtail_ai:text_completion"),
+        data={
+            "text": "\n\n".join(PARAGRAPHS),
+            "prompt": str(setup_prompt_object.uuid),
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "message": "PARAGRAPH 0\n\nPARAGRAPH 1\n\nPARAGRAPH 2\n\nPARAGRAPH 3"
+    }
+    assert threads == {threading.get_ident()}
+
+
+@custom_ai_backend_settings(
+    new_value={
+        "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+        "CONFIG": {
+            "MODEL_ID": "echo",
+            "TOKEN_LIMIT": 100,
+            "MAX_CONCURRENCY": 1,
+        },
+    }
+)
+def test_replace_with_repeated_chunks(admin_client, setup_prompt_object, monkeypatch):
+    responses = iter(["First", "Second", "Third"])
+
+    def process_backend_request(ai_backend, pre_prompt, context):
+        return EchoResponse(iter([next(responses)]))
+
+    monkeypatch.setattr(
+        "wagtail_ai.views._process_backend_request", process_backend_request
+    )
+
+    response = admin_client.post(
+        reverse("wagtail_ai:text_completion"),
+        data={
+            "text": "\n\n".join([PARAGRAPHS[0], PARAGRAPHS[0], PARAGRAPHS[1]]),
+            "prompt": str(setup_prompt_object.uuid),
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"message": "First\n\nSecond\n\nThird"}
+
+
+@custom_ai_backend_settings(
+    new_value={
+        "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+        "CONFIG": {
+            "MODEL_ID": "echo",
+            "TOKEN_LIMIT": 100,
+            "MAX_CONCURRENCY": 1,
+        },
+    }
+)
+def test_replace_sends_first_chunk_before_text_is_split(
+    admin_client, setup_prompt_object, monkeypatch
+):
+    first_request_sent = threading.Event()
+    iter_split_text_spans = (
+        LangchainRecursiveCharacterTextSplitter.iter_split_text_spans
+    )
+
+    def slow_iter_split_text_spans(self, text):
+        spans = iter_split_text_spans(self, text)
+        yield next(spans)
+        # The rest of the text is only split once the first chunk has been sent.
+        assert first_request_sent.wait(timeout=5)
+        yield from spans
+
+    def process_backend_request(ai_backend, pre_prompt, context):
+        first_request_sent.set()
+        return EchoResponse(iter([context.split(".")[0].upper()]))
+
+    monkeypatch.setattr(
+        LangchainRecursiveCharacterTextSplitter,
+        "iter_split_text_spans",
+        slow_iter_split_text_spans,
+    )
+    monkeypatch.setattr(
+        "wagtail_ai.views._process_backend_request", process_backend_request
+    )
+
+    response = admin_client.post(
+        reverse("wagtail_ai:text_completion"),
+        data={
+            "text": "\n\n".join(PARAGRAPHS),
+            "prompt": str(setup_prompt_object.uuid),
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "message": "PARAGRAPH 0\n\nPARAGRAPH 1\n\nPARAGRAPH 2\n\nPARAGRAPH 3"
+    }
+
+
+@custom_ai_backend_settings(
+    new_value={
+        "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+        "CONFIG": {"MODEL_ID": "echo", "TOKEN_LIMIT": 100},
+        "TEXT_SPLITTING": {
+            "SPLITTER_CLASS": "test_utils.text_splitters.ParagraphTextSplitter"
+        },
+    }
+)
+def test_replace_with_splitter_that_only_implements_split_text(
+    admin_client, setup_prompt_object, monkeypatch
+):
+    def process_backend_request(ai_backend, pre_prompt, context):
+        return EchoResponse(iter([context.upper()]))
+
+    monkeypatch.setattr(
+        "wagtail_ai.views._process_backend_request", process_backend_request
+    )
+
+    response = admin_client.post(
+        reverse("wagtail_ai:text_completion"),
+        data={
+            "text": "First\n\nSecond\n\nThird",
+            "prompt": str(setup_prompt_object.uuid),
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"message": "FIRST\n\nSECOND\n\nTHIRD"}
+
+
+def test_replace_with_text_splitting_error(
+    admin_client, setup_prompt_object, monkeypatch
+):
+    def iter_split_text_spans(self, text):
+        raise ValueError("Cannot split")
+        yield
+
+    monkeypatch.setattr(
+        LangchainRecursiveCharacterTextSplitter,
+        "iter_split_text_spans",
+        iter_split_text_spans,
+    )
+
+    response = admin_client.post(
+        reverse("wagtail_ai:text_completion"),
+        data={"text": "test", "prompt": str(setup_prompt_object.uuid)},
+    )
+
+    assert response.status_code == 500
+    assert response.json() == {"error": "An unexpected error occurred."}
+
+
+def _read_events(response) -> list[tuple[str, dict]]:
+    if response.is_async:
+
+        async def read():
+            return [part async for part in response.streaming_content]
+
+        content = b"".join(async_to_sync(read)()).decode()
+    else:
+        content = b"".join(response.streaming_content).decode()
+    return _parse_events(content)
+
+
+def _parse_events(content: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in content.split("\n\n"):
+        if not block:
+            continue
+        event = "message"
+        data = {}
+        for line in block.split("\n"):
+            if line.startswith("event: "):
+                event = line.removeprefix("event: ")
+            elif line.startswith("data: "):
+                data = json.loads(line.removeprefix("data: "))
+        events.append((event, data))
+    return events
+
+
+@custom_ai_backend_settings(
+    new_value={
+        "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+        "CONFIG": {
+            "MODEL_ID": "echo",
+            "TOKEN_LIMIT": 100,
+        },
+    }
+)
+def test_streaming_response(admin_client, setup_prompt_object):
+    response = admin_client.post(
+        reverse("wagtail_ai:text_completion"),
+        data={
+            "text": "test some text",
+            "prompt": str(setup_prompt_object.uuid),
+            "stream": "true",
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "text/event-stream"
+    events = _read_events(response)
+    assert events[-1] == ("done", {})
+    messages = [data["message"] for event, data in events[:-1]]
+    assert all(event == "message" for event, data in events[:-1])
+    assert len(messages) > 1
+    assert "".join(messages) == "This is an echo backend: test some text"
+
+
+@custom_ai_backend_settings(
+    new_value={
+        "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+        "CONFIG": {
+            "MODEL_ID": "echo",
+            "TOKEN_LIMIT": 100,
+        },
+    }
+)
+@pytest.mark.parametrize(
+    "method,text",
+    [
+        ("replace", "\n\n".join(PARAGRAPHS)),
+        ("append", PARAGRAPHS[0]),
+    ],
+)
+def test_streaming_response_is_the_same_as_json_response(
+    admin_client, setup_prompt_object, method, text
+):
+    setup_prompt_object.method = method
+    setup_prompt_object.save()
+    data = {"text": text, "prompt": str(setup_prompt_object.uuid)}
+
+    response = admin_client.post(reverse("wagtail_ai:text_completion"), data=data)
+    events = _read_events(
+        admin_client.post(
+            reverse("wagtail_ai:text_completion"), data={**data, "stream": "true"}
+        )
+    )
+
+    assert "".join(data["message"] for event, data in events[:-1]) == (
+        response.json()["message"]
+    )
+
+
+def test_streaming_response_error(admin_client, setup_prompt_object, monkeypatch):
+    def prompt_with_context(*args, **kwargs):
+        raise ValueError("Some API error")
+
+    monkeypatch.setattr(
+        "wagtail_ai.ai.echo.EchoBackend.prompt_with_context", prompt_with_context
+    )
+
+    response = admin_client.post(
+        reverse("wagtail_ai:text_completion"),
+        data={
+            "text": "test",
+            "prompt": str(setup_prompt_object.uuid),
+            "stream": "true",
+        },
+    )
+
+    assert response.status_code == 200
+    assert _read_events(response) == [
+        ("error", {"error": "Error processing request, Please try again later."})
+    ]
+
+
+def test_streaming_response_with_invalid_form(admin_client):
+    response = admin_client.post(
+        reverse("wagtail_ai:text_completion"), data={"stream": "true"}
+    )
+    assert response.status_code == 400
+    assert response.json() == {
+        "error": "No text provided - please enter some text before using AI features. "
+        "\nInvalid prompt provided."
+    }
+
+
+@pytest.mark.parametrize(
+    "tokens",
+    [
+        ["Some text"],
+        ["\n\nSome", " text\n", "\n\nMore", "\r\n", "text\n\n"],
+        ["Line\r", "\n", "  \n", "Line", "\n"],
+        ["\n", "\n"],
+        [],
+    ],
+)
+def test_strip_blank_lines(tokens):
+    text = "".join(tokens)
+    assert "".join(_strip_blank_lines(tokens)) == os.linesep.join(
+        [s for s in text.splitlines() if s]
+    )
+
+
+@pytest.fixture
+def admin_async_client(async_client, admin_user):
+    async_client.force_login(admin_user)
+    return async_client
+
+
+def test_async_view_requires_admin_access(async_client):
+    response = async_to_sync(async_client.post)(
+        reverse("wagtail_ai_async:text_completion"), data={"text": "test"}
+    )
+    assert response.status_code == 403
+    assert response.json() == {"error": "Access denied."}
+
+
+def test_async_view_with_invalid_form(admin_async_client):
+    response = async_to_sync(admin_async_client.post)(
+        reverse("wagtail_ai_async:text_completion"), data={"text": "test"}
+    )
+    assert response.status_code == 400
+    assert response.json() == {"error": "Invalid prompt provided."}
+
+
+@custom_ai_backend_settings(
+    new_value={
+        "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+        "CONFIG": {
+            "MODEL_ID": "echo",
+            "TOKEN_LIMIT": 100,
+        },
+    }
+)
+@pytest.mark.parametrize(
+    "method,text",
+    [
+        ("replace", "\n\n".join(PARAGRAPHS)),
+        ("append", PARAGRAPHS[0]),
+    ],
+)
+@pytest.mark.parametrize("stream", [False, True])
+def test_async_view_is_the_same_as_sync_view(
+    admin_client, admin_async_client, setup_prompt_object, method, text, stream
+):
+    setup_prompt_object.method = method
+    setup_prompt_object.save()
+    data = {"text": text, "prompt": str(setup_prompt_object.uuid)}
+
+    expected = admin_client.post(reverse("wagtail_ai:text_completion"), data=data)
+    response = async_to_sync(admin_async_client.post)(
+        reverse("wagtail_ai_async:text_completion"),
+        data={**data, "stream": "true"} if stream else data,
+    )
+
+    assert response.status_code == 200
+    if stream:
+        assert response["Content-Type"] == "text/event-stream"
+        events = _read_events(response)
+        assert events[-1] == ("done", {})
+        message = "".join(data["message"] for event, data in events[:-1])
+    else:
+        message = response.json()["message"]
+    assert message == expected.json()["message"]
+
+
+@custom_ai_backend_settings(
+    new_value={
+        "CLASS": "wagtail_ai.ai.echo.EchoBackend",
+        "CONFIG": {
+            "MODEL_ID": "echo",
+            "TOKEN_LIMIT": 100,
+            "MAX_CONCURRENCY": 4,
+        },
+    }
+)
+def test_async_replace_sends_chunks_concurrently(
+    admin_async_client, setup_prompt_object, monkeypatch
+):
+    started = 0
+    all_started = asyncio.Event()
+
+    async def aprocess_backend_request(ai_backend, pre_prompt, context):
+        nonlocal started
+        started += 1
+        if started == len(PARAGRAPHS):
+            all_started.set()
+        # Only passes if all the chunks are being processed at the same time.
+        await asyncio.wait_for(all_started.wait(), timeout=5)
+        return AsyncEchoResponse(_aiter([context.split(".")[0].upper()]))
+
+    monkeypatch.setattr(
+        "wagtail_ai.views._aprocess_backend_request", aprocess_backend_request
+    )
+
+    response = async_to_sync(admin_async_client.post)(
+        reverse("wagtail_ai_async:text_completion"),
+        data={
+            "text": "\n\n".join(PARAGRAPHS),
+            "prompt": str(setup_prompt_object.uuid),
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "message": "PARAGRAPH 0\n\nPARAGRAPH 1\n\nPARAGRAPH 2\n\nPARAGRAPH 3"
+    }
+
+
+async def _aiter(parts):
+    for part in parts:
+        yield part
+
+
+def test_async_streaming_response_error(
+    admin_async_client, setup_prompt_object, monkeypatch
+):
+    async def aprompt_with_context(*args, **kwargs):
+        raise ValueError("Some API error")
+
+    monkeypatch.setattr(
+        "wagtail_ai.ai.echo.EchoBackend.aprompt_with_context", aprompt_with_context
+    )
+
+    response = async_to_sync(admin_async_client.post)(
+        reverse("wagtail_ai_async:text_completion"),
+        data={
+            "text": "test",
+            "prompt": str(setup_prompt_object.uuid),
+            "stream": "true",
+        },
+    )
+
+    assert response.status_code == 200
+    assert _read_events(response) == [
+        ("error", {"error": "Error processing request, Please try again later."})
+    ]